@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
 # ============================================================
 # File: kraken_sol.py
-# Version: v2.8.2 — Centralized Sell Policy via usd_allocator
+# Version: v2.8.4 — Telegram via leo_telegram gateway
+#
+# v2.8.4 changes:
+#   • leo_telegram found through PYTHONPATH set by the unit instead
+#     of a ~/leo-services path appended at import
+#
+# v2.8.3 changes:
+#   • tg_send() queues to the leo_telegram outbox instead of a
+#     blocking urllib POST (direct send, now with a 10s timeout,
+#     only if the gateway is not installed)
+#   • Heartbeats keyed → one digest per timer round for all assets
 #
 # v2.8.2 changes:
 #   • Removed hard-coded SELL_FRACTION
@@ -14,7 +24,7 @@ from datetime import datetime
 from kraken_nonce import get_nonce
 from usd_allocator import get_allocatable_usd, get_sell_fraction
 
-ENGINE_VERSION = "v2.8.2"
+ENGINE_VERSION = "v2.8.3"
 
 print("[kraken] using shared nonce file /tmp/kraken_nonce.txt")
 
@@ -54,7 +64,18 @@ def log_event(ev: dict):
     except Exception as e:
         print(f"[WARN] Log write failed: {e}")
 
-def tg_send(msg: str):
+# Telegram goes through the leo_telegram outbox (leo_telegram.service
+# delivers it); leo_telegram comes from PYTHONPATH (kraken_*.service),
+# direct send if it is not importable or the gateway is not running
+try:
+    from leo_telegram import send as tg_outbox
+except Exception:
+    tg_outbox = None
+
+def tg_send(msg: str, key: str = None, hold_s: float = None):
+    if tg_outbox is not None:
+        tg_outbox(TG_TOKEN, TG_CHAT, msg, key=key, hold_s=hold_s)
+        return
     try:
         data = json.dumps({"chat_id": TG_CHAT, "text": msg}).encode()
         req = urllib.request.Request(
@@ -62,7 +83,7 @@ def tg_send(msg: str):
             data,
             headers={"Content-Type": "application/json"}
         )
-        urllib.request.urlopen(req).read()
+        urllib.request.urlopen(req, timeout=10).read()
     except Exception as e:
         print(f"[WARN] Telegram send failed: {e}")
 
@@ -191,6 +212,7 @@ SELL_TARGET    =  5.0
 SELL_APPROACH  =  4.0
 DRAWDOWN_RESET = -12.0
 HEARTBEAT_INTERVAL_HOURS = 6
+HEARTBEAT_DIGEST_S = 300        # one timer period: heartbeats of a round → one digest
 
 # ------------------------------------------------------------
 # Heartbeat
@@ -233,7 +255,7 @@ def maybe_send_heartbeat(state, price, sol_bal, usd_bal):
     if sh and sl:
         msg += f"\nSwing H/L: {sh:,.2f} / {sl:,.2f}"
 
-    tg_send(msg)
+    tg_send(msg, key="kraken-heartbeat", hold_s=HEARTBEAT_DIGEST_S)
 
     state["last_heartbeat"] = now
 
@@ -34,6 +34,26 @@ MES_RUN = LEO_BASE / "leo" / "bin" / ".mes-run"
 MES_RUNTIME_FILES = [
     "mes_scalp.py",
     "mes_swing.py",
+    "mes_htf_cache.py",
+    "mes_stream.py",
+    "mes_indicators.py",
+    "mes_decisions.py",
+    "mes_observations.py",
+    "mes_scheduler.py",
+    "mes_metrics.py",
+    "mes_orders.py",
+    "mes_prefilter.py",
+    "mes_account.py",
+    "mes_instruments.py",
+    "mes_sizing.py",
+    "mes_runner.py",
+    "mes_planner.py",
+    "mes_resample.py",
+    "mes_incremental.py",
+    "mes_market.py",
+    "mes_deadline.py",
+    "mes_http.py",
+    "mes_ledger.py",
 ]
 
 MES_SERVICES = [
@@ -43,6 +63,15 @@ MES_SERVICES = [
     "mes_swing_live.service",
 ]
 
+# Long-running units — restarted on deploy only if already running
+MES_RESIDENT_SERVICES = [
+    "mes_scheduler_demo.service",
+    "mes_scheduler_live.service",
+    "mes_stream_demo.service",
+    "mes_stream_live.service",
+    "mes_runner.service",
+]
+
 # ============================================================
 # Deploy logic (matches legacy behavior)
 # ============================================================
@@ -95,6 +124,22 @@ def deploy_mes(demo_only=False):
             if out.strip():
                 print(f" → {out.strip()}")
 
+    resident = (
+        [s for s in MES_RESIDENT_SERVICES if "demo" in s]
+        if demo_only else MES_RESIDENT_SERVICES
+    )
+    for svc in resident:
+        ok, _ = run(f"systemctl is-active --quiet {svc}", capture=True)
+        if not ok:
+            continue
+        ok, out = run(f"sudo systemctl try-restart {svc}", capture=True)
+        if ok:
+            green(f" ✔ {svc}")
+        else:
+            red(f" ✖ {svc}")
+            if out.strip():
+                print(f" → {out.strip()}")
+
 # ============================================================
 # Internal MES backend wrapper
 # ============================================================
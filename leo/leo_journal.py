@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: leo_journal.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Shared systemd journal reader for the dashboard, mes-run and the
+#   mining / server reports. Each of them used to spawn journalctl
+#   and re-read the same tail on every call (every dashboard
+#   refresh, every status line).
+#   • One Reader per consumer ("dashboard-errors", "mes-run", ...)
+#     with its own match set: units, priority range, message regex
+#   • refresh() reads only what was logged after the consumer's
+#     persisted cursor; the first run backfills keep_s / initial
+#   • Queries (unit, priority, since, grep, limit) are served from
+#     the in-memory index — per unit, newest last, bounded by
+#     max_entries per unit and keep_s
+#   • Index + cursor saved to <consumer>.json, so oneshot consumers
+#     (reports, mes-run) also read only new entries
+#
+# Design goals:
+#   • Native journal API (python3-systemd) when importable, else
+#     `journalctl -o json --after-cursor` — same entries either way
+#   • A long-running consumer (dashboard) refreshes at most every
+#     refresh_s: a page render is a lookup, not a process
+#   • Standard library only besides the optional systemd module
+#   • Never raises into a caller: a failed read serves the index
+#
+# Known limits:
+#   • A cursor vacuumed out of the journal restarts the backfill
+#   • Unit matches follow `journalctl -u`: the unit's own processes
+#     plus systemd's messages about it (UNIT=, logged by PID 1 from
+#     init.scope) — both indexed under the unit asked for
+#
+# Usage:
+#   errors = open_reader("dashboard-errors", priority=3, keep_s=6 * 3600)
+#   for e in errors.query(since=time.time() - 7200):
+#       print(e.line())
+#
+#   python3 leo_journal.py -u mes_auto.service -n 50 | --check
+# ============================================================
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    from systemd import journal as _native      # python3-systemd (optional)
+except Exception:
+    _native = None
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("LEO_JOURNAL_DIR", str(Path.home() / "leo-services" / "journal")))
+NATIVE = _native is not None and os.getenv("LEO_JOURNAL_NATIVE", "ON").upper() != "OFF"
+
+MAX_ENTRIES = 500           # per unit kept in the index
+INITIAL = 1000              # backfill of a consumer without cursor / keep_s
+REFRESH_S = 5.0             # min seconds between two reads (long-running consumers)
+TIMEOUT_S = 10.0
+INDEX_FORMAT = 2            # bump when indexing changes: saved indexes rebuilt
+
+FIELDS = ("MESSAGE", "PRIORITY", "_SYSTEMD_UNIT", "UNIT", "SYSLOG_IDENTIFIER", "_PID")
+
+Priority = Union[int, Tuple[int, int], None]
+
+
+# ============================================================
+# ENTRY
+# ============================================================
+@dataclass
+class Entry:
+    ts: float               # realtime, epoch seconds
+    unit: str
+    priority: int
+    ident: str
+    pid: str
+    message: str
+
+    def line(self) -> str:
+        """journalctl -o short-iso without the host name."""
+        stamp = datetime.fromtimestamp(self.ts).astimezone().strftime("%Y-%m-%dT%H:%M:%S%z")
+        who = f"{self.ident}[{self.pid}]" if self.pid else self.ident
+        return f"{stamp} {who}: {self.message}"
+
+    def to_row(self) -> list:
+        return [round(self.ts, 6), self.unit, self.priority, self.ident, self.pid, self.message]
+
+    @classmethod
+    def from_row(cls, r: list) -> "Entry":
+        return cls(float(r[0]), r[1], int(r[2]), r[3], r[4], r[5])
+
+
+def _text(v) -> str:
+    if isinstance(v, list):                      # journalctl: non-UTF-8 as byte array
+        v = bytes(v).decode("utf-8", "replace")
+    elif isinstance(v, bytes):
+        v = v.decode("utf-8", "replace")
+    return "" if v is None else str(v)
+
+
+def _entry(f: dict, units: Sequence[str] = ()) -> Entry:
+    ts = f.get("__REALTIME_TIMESTAMP")
+    if isinstance(ts, datetime):                 # native reader converts fields
+        ts = ts.timestamp()
+    else:
+        ts = int(ts or 0) / 1e6
+    own, about = _text(f.get("_SYSTEMD_UNIT")), _text(f.get("UNIT"))
+    unit = own or about
+    if units and unit not in units and about in units:
+        unit = about            # "Started" / "Failed" of a unit: PID 1, init.scope
+    return Entry(
+        ts=ts,
+        unit=unit,
+        priority=int(f.get("PRIORITY", 6) or 6),
+        ident=_text(f.get("SYSLOG_IDENTIFIER")),
+        pid=_text(f.get("_PID")),
+        message=_text(f.get("MESSAGE")),
+    )
+
+
+def _bounds(priority: Priority) -> Tuple[int, int]:
+    if priority is None:
+        return 0, 7
+    if isinstance(priority, tuple):
+        return priority
+    return 0, int(priority)
+
+
+# ============================================================
+# READER
+# ============================================================
+class Reader:
+    def __init__(self, consumer: str, units: Sequence[str] = (), priority: Priority = None,
+                 match: Optional[str] = None, keep_s: Optional[float] = None,
+                 max_entries: int = MAX_ENTRIES, initial: int = INITIAL,
+                 refresh_s: float = REFRESH_S, state_dir: Path = STATE_DIR,
+                 native: bool = NATIVE, journalctl: str = "journalctl"):
+        self.consumer = consumer
+        self.units = list(units)
+        self.priority = _bounds(priority)
+        self.match = re.compile(match) if match else None
+        self.keep_s = keep_s
+        self.max_entries = max_entries
+        self.initial = initial
+        self.refresh_s = refresh_s
+        self.path = Path(state_dir) / f"{consumer}.json"
+        self.native = native
+        self.journalctl = journalctl
+        self.cursor: Optional[str] = None
+        self.index: Dict[str, List[Entry]] = {}
+        self.read_at = 0.0
+        self.stats = {"reads": 0, "new": 0, "backend": "native" if native else "journalctl"}
+        self._load()
+
+    # ---------------- persistence ----------------
+    def _load(self):
+        try:
+            d = json.loads(self.path.read_text())
+        except Exception:
+            return
+        if d.get("match") != self._signature():
+            return                      # consumer's filters changed → backfill again
+        self.cursor = d.get("cursor")
+        for unit, rows in d.get("index", {}).items():
+            self.index[unit] = [Entry.from_row(r) for r in rows]
+
+    def _signature(self) -> list:
+        return [sorted(self.units), list(self.priority), self.match.pattern if self.match else None,
+                INDEX_FORMAT]
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({
+                "cursor": self.cursor,
+                "match": self._signature(),
+                "index": {u: [e.to_row() for e in es] for u, es in self.index.items()},
+            }, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    # ---------------- reading ----------------
+    def _wanted(self, e: Entry) -> bool:
+        lo, hi = self.priority
+        if not lo <= e.priority <= hi:
+            return False
+        return self.match is None or bool(self.match.search(e.message))
+
+    def _read_native(self) -> Tuple[List[Entry], Optional[str]]:
+        j = _native.Reader(flags=_native.LOCAL_ONLY)
+        for u in self.units:
+            j.add_match(_SYSTEMD_UNIT=u)
+        if self.units:
+            j.add_disjunction()
+            for u in self.units:
+                j.add_match(UNIT=u)
+        else:
+            lo, hi = self.priority
+            for p in range(lo, hi + 1):
+                j.add_match(PRIORITY=str(p))
+        if self.cursor:
+            j.seek_cursor(self.cursor)
+            first = j.get_next()
+            if first and not j.test_cursor(self.cursor):
+                j.get_previous()        # cursor gone: resume at the nearest entry
+        elif self.keep_s:
+            j.seek_realtime(time.time() - self.keep_s)
+        else:
+            j.seek_tail()
+            j.get_previous(self.initial)
+        out, cursor = [], self.cursor
+        for f in j:
+            cursor = f.get("__CURSOR", cursor)
+            out.append(_entry(f, self.units))
+        j.close()
+        return out, cursor
+
+    def _read_journalctl(self) -> Tuple[List[Entry], Optional[str]]:
+        cmd = [self.journalctl, "-o", "json", "--no-pager",
+               "--output-fields=" + ",".join(FIELDS)]
+        for u in self.units:
+            cmd += ["-u", u]
+        lo, hi = self.priority
+        if (lo, hi) != (0, 7):
+            cmd += ["-p", f"{lo}..{hi}"]
+        if self.cursor:
+            cmd += ["--after-cursor", self.cursor]
+        elif self.keep_s:
+            cmd += ["--since", f"@{int(time.time() - self.keep_s)}"]
+        else:
+            cmd += ["-n", str(self.initial)]
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUT_S)
+        if res.returncode != 0 and self.cursor:
+            raise LookupError(res.stderr.strip() or "cursor rejected")
+        out, cursor = [], self.cursor
+        for line in res.stdout.splitlines():
+            try:
+                f = json.loads(line)
+            except ValueError:
+                continue
+            cursor = f.get("__CURSOR", cursor)
+            out.append(_entry(f, self.units))
+        return out, cursor
+
+    def refresh(self, force: bool = False) -> int:
+        """Fold entries logged since the cursor into the index. New entries kept."""
+        now = time.time()
+        if not force and now - self.read_at < self.refresh_s:
+            return 0
+        self.read_at = now
+        try:
+            entries, cursor = (self._read_native if self.native else self._read_journalctl)()
+        except LookupError:
+            self.cursor = None          # vacuumed / rotated away → backfill afresh
+            self.index.clear()
+            return self.refresh(force=True)
+        except Exception:
+            return 0
+        self.stats["reads"] += 1
+        kept = self._fold(entries, now)
+        if cursor != self.cursor or kept:
+            self.cursor = cursor
+            self.save()
+        self.stats["new"] += kept
+        return kept
+
+    def _fold(self, entries: List[Entry], now: float) -> int:
+        kept = [e for e in entries if self._wanted(e)]
+        for e in kept:
+            self.index.setdefault(e.unit, []).append(e)
+        self._trim(now)
+        return len(kept)
+
+    def _trim(self, now: float):
+        oldest = now - self.keep_s if self.keep_s else None
+        for unit in list(self.index):
+            es = self.index[unit][-self.max_entries:]
+            if oldest is not None:
+                es = [e for e in es if e.ts >= oldest]
+            if es:
+                self.index[unit] = es
+            else:
+                del self.index[unit]
+
+    # ---------------- queries ----------------
+    def query(self, unit: Optional[str] = None, priority: Priority = None,
+              since: Optional[float] = None, grep: Optional[str] = None,
+              limit: Optional[int] = None, refresh: bool = True) -> List[Entry]:
+        """Entries oldest first; `limit` keeps the newest."""
+        if refresh:
+            self.refresh()
+        pool: Iterable[Entry] = (self.index.get(unit, []) if unit is not None
+                                 else sorted((e for es in self.index.values() for e in es),
+                                             key=lambda e: e.ts))
+        lo, hi = _bounds(priority)
+        rx = re.compile(grep) if grep else None
+        out = [e for e in pool
+               if lo <= e.priority <= hi
+               and (since is None or e.ts >= since)
+               and (rx is None or rx.search(e.message))]
+        return out[-limit:] if limit else out
+
+    def tail(self, unit: str, n: int = 30) -> List[Entry]:
+        return self.query(unit=unit, limit=n)
+
+    def last(self, unit: str) -> Optional[Entry]:
+        es = self.query(unit=unit, limit=1)
+        return es[0] if es else None
+
+
+def check() -> bool:
+    """
+    Indexing without a journal: systemd's own record about a unit
+    (PID 1, init.scope, UNIT=) must come back in tail(unit).
+    """
+    import tempfile
+    unit, now = "leo-journal-check.service", time.time()
+    with tempfile.TemporaryDirectory() as d:
+        reader = Reader("check", units=[unit], state_dir=Path(d), native=False)
+        reader.read_at = now                    # no read: refresh_s not elapsed
+        reader._fold([_entry({"__REALTIME_TIMESTAMP": str(int(now * 1e6)), "PRIORITY": "6",
+                              "_SYSTEMD_UNIT": "init.scope", "UNIT": unit, "_PID": "1",
+                              "SYSLOG_IDENTIFIER": "systemd", "MESSAGE": f"Started {unit}."},
+                             reader.units)], now)
+        return [e.message for e in reader.tail(unit)] == [f"Started {unit}."]
+
+
+_readers: Dict[str, Reader] = {}
+
+
+def open_reader(consumer: str, **kwargs) -> Reader:
+    """The process's Reader for `consumer` (index kept between calls)."""
+    r = _readers.get(consumer)
+    if r is None:
+        r = _readers[consumer] = Reader(consumer, **kwargs)
+    return r
+
+
+# ============================================================
+# CLI
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Leo journal reader (cursor + index)")
+    ap.add_argument("--consumer", default="cli")
+    ap.add_argument("-u", "--unit", action="append", default=[])
+    ap.add_argument("-p", "--priority", help="max priority or lo..hi")
+    ap.add_argument("--since-min", type=float, help="only the last N minutes")
+    ap.add_argument("--grep")
+    ap.add_argument("-n", "--lines", type=int, default=30)
+    ap.add_argument("--check", action="store_true", help="verify unit indexing and exit")
+    args = ap.parse_args()
+
+    if args.check:
+        ok = check()
+        print("unit indexing ok" if ok else "unit indexing FAILED: PID-1 UNIT= record not in tail(unit)")
+        raise SystemExit(0 if ok else 1)
+
+    prio: Priority = None
+    if args.priority:
+        lo, _, hi = args.priority.partition("..")
+        prio = (int(lo), int(hi)) if hi else int(lo)
+    reader = Reader(args.consumer, units=args.unit, priority=prio)
+    t0 = time.perf_counter()
+    new = reader.refresh(force=True)
+    since = time.time() - args.since_min * 60 if args.since_min else None
+    for e in reader.query(since=since, grep=args.grep, limit=args.lines, refresh=False):
+        print(e.line())
+    print(f"-- {new} new via {reader.stats['backend']} in "
+          f"{(time.perf_counter() - t0) * 1000:.0f}ms, cursor saved to {reader.path}")
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 # ------------------------------------------------------------
-# Leo Server Report — v1.2.0 (2026-01-06)
+# Leo Server Report — v1.2.2 (2026-10-18)
 # Purpose: Hourly Telegram health snapshot for Leo server
 #
+# Changes (v1.2.2):
+# • Recent errors from leo_journal (only entries since the last report
+#   read, kept for an hour) instead of a journalctl call per report
+#
+# Changes (v1.2.1):
+# • Report queued to the leo_telegram outbox (pooled, rate-limited
+#   delivery by leo_telegram.service); direct POST only as fallback
+#
 # Changes (v1.2.0):
 # • Added Bitcoin Services block
 # • bitcoind service status
@@ -36,10 +44,24 @@ LEO_TOKEN = os.getenv("LEO_TOKEN")
 TELEGRAM_ID = os.getenv("TELEGRAM_ID")
 
 
-# ---------- Telegram ----------
+# ---------- Telegram / journal (leo_telegram, leo_journal) ----------
+try:
+    from leo_telegram import send as tg_outbox
+except Exception:
+    tg_outbox = None
+
+try:
+    from leo_journal import open_reader
+except Exception:
+    open_reader = None
+
+
 def tg(msg: str) -> None:
     if not (LEO_TOKEN and TELEGRAM_ID):
         return
+    if tg_outbox is not None:
+        tg_outbox(LEO_TOKEN, TELEGRAM_ID, msg, parse_mode="HTML")
+        return
     try:
         requests.post(
             f"https://api.telegram.org/bot{LEO_TOKEN}/sendMessage",
@@ -65,6 +87,10 @@ def service_status(service_name: str) -> str:
 
 
 def get_recent_errors() -> str:
+    if open_reader is not None:
+        journal = open_reader("server-report", priority=(3, 4), keep_s=3600)
+        errors = journal.query(since=datetime.now().timestamp() - 3600, limit=10)
+        return "\n".join(e.line() for e in errors) or "None"
     cmd = [
         "journalctl",
         "-p",
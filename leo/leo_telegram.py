@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: leo_telegram.py
+# Version: v1.1.0
+#
+# Purpose:
+#   One Telegram delivery gateway for every Leo service.
+#   The kraken bots, mes_swing, the mining report and the server
+#   report used to POST to api.telegram.org inline — a new TLS
+#   connection per message (urllib without a timeout in kraken), so
+#   a slow Telegram stalled the trading tick.
+#   • send(): callers drop the message into a durable outbox (one
+#     small file, tmp + rename) and return in microseconds
+#   • Gateway (leo_telegram.service, `serve`): delivers the outbox
+#     over one kept-alive connection per API host
+#       - rate limits: 1 msg/s per chat (3s for groups), 25 msg/s
+#         per bot, Retry-After of a 429 honoured
+#       - bursts batched: ready messages of a chat leave as one
+#         message (up to 4096 chars)
+#       - keyed messages coalesced: the same `key` within `hold_s`
+#         (e.g. the kraken heartbeats of one timer round) becomes one
+#         digest
+#       - network / 5xx errors back off and retry; other 4xx and
+#         messages older than MAX_AGE_S go to dead/
+#       - heartbeat: <outbox>/gateway.alive rewritten every
+#         HEARTBEAT_S while serving, removed on stop
+#   • StandInBot (`standin`): local sendMessage endpoint with the
+#     Telegram per-chat limit, for tests without the real API
+#
+# Design goals:
+#   • Standard library only (kraken runs on the system python)
+#   • Nothing lost when the gateway is down or restarted — the
+#     outbox is the queue; delivery resumes in order
+#   • A message is queued only while the gateway's heartbeat is
+#     fresh (STALE_S): with the gateway stopped, crashed or never
+#     installed, send() delivers directly, as before — a LIVE safety
+#     abort never waits in an outbox nobody reads. A direct send that
+#     fails is queued for the gateway
+#   • LEO_TG_GATEWAY=OFF (or an unwritable outbox) sends directly
+#
+# Known limits:
+#   • A message is delivered at least once: a reply lost after
+#     Telegram accepted it is sent again
+#   • Entries hold the bot token: outbox files are 0600 in 0700 dirs
+#
+# Deploy:
+#   leo/bin/leo-install links and enables leo_telegram.service
+#
+# Usage:
+#   from leo_telegram import send
+#   send(TOKEN, CHAT, "🫀 SOL Heartbeat ...", key="kraken-heartbeat", hold_s=300)
+#
+#   python3 leo_telegram.py serve | drain [--all] | status | standin
+# ============================================================
+
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+API_URL = os.getenv("LEO_TG_API", "https://api.telegram.org")
+OUTBOX_DIR = Path(os.getenv("LEO_TG_OUTBOX", str(Path.home() / "leo-services" / "telegram")))
+GATEWAY = os.getenv("LEO_TG_GATEWAY", "ON").upper() != "OFF"
+
+HOLD_S = 60.0               # default coalescing window of a keyed message
+CHAT_INTERVAL_S = 1.0       # Telegram: ~1 msg/s per chat
+GROUP_INTERVAL_S = 3.0      # ... 20 msg/min per group
+BOT_RATE = 25.0             # ... 30 msg/s per bot, kept below
+MAX_TEXT = 4096
+MAX_AGE_S = 24 * 3600       # undelivered for a day → dead/
+MAX_BACKOFF_S = 300.0
+POLL_S = 0.2
+TIMEOUT_S = 10.0
+HEARTBEAT_S = 5.0           # gateway liveness file rewritten this often
+STALE_S = 60.0              # older heartbeat → gateway down, send directly
+
+SEPARATOR = "\n\n"
+
+
+# ============================================================
+# OUTBOX
+# ============================================================
+@dataclass
+class Entry:
+    name: str
+    token: str
+    chat_id: str
+    text: str
+    parse_mode: Optional[str] = None
+    key: Optional[str] = None
+    hold_s: float = HOLD_S
+    at: float = 0.0
+    attempts: int = 0
+
+    @property
+    def chat(self) -> Tuple[str, str]:
+        return self.token, self.chat_id
+
+
+class Outbox:
+    """Maildir-style queue: tmp/ → new/ by rename, dead/ for undeliverable."""
+
+    def __init__(self, root: Path = OUTBOX_DIR):
+        self.root = Path(root)
+        self.tmp = self.root / "tmp"
+        self.new = self.root / "new"
+        self.dead = self.root / "dead"
+        self.heartbeat = self.root / "gateway.alive"
+        self._seq = itertools.count()
+        self._made = False
+
+    def _mkdirs(self):
+        if not self._made:
+            for d in (self.tmp, self.new, self.dead):
+                d.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self._made = True
+
+    def put(self, msg: dict) -> str:
+        self._mkdirs()
+        name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._seq)}.json"
+        tmp = self.tmp / name
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.write(fd, json.dumps(msg, separators=(",", ":")).encode())
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.new / name)
+        return name
+
+    def beat(self):
+        """Gateway side: mark the gateway alive (pid, time)."""
+        self._mkdirs()
+        tmp = self.tmp / self.heartbeat.name
+        tmp.write_text(f"{os.getpid()} {time.time():.0f}\n")
+        os.replace(tmp, self.heartbeat)
+
+    def stopped(self):
+        try:
+            os.unlink(self.heartbeat)
+        except FileNotFoundError:
+            pass
+
+    def gateway_age(self) -> Optional[float]:
+        """Seconds since the last heartbeat; None if no gateway is serving."""
+        try:
+            return max(0.0, time.time() - self.heartbeat.stat().st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def gateway_alive(self, stale_s: float = STALE_S) -> bool:
+        age = self.gateway_age()
+        return age is not None and age <= stale_s
+
+    def names(self) -> List[str]:
+        try:
+            return sorted(n for n in os.listdir(self.new) if n.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def load(self, name: str) -> Optional[Entry]:
+        try:
+            d = json.loads((self.new / name).read_text())
+            return Entry(name=name, token=d["token"], chat_id=str(d["chat_id"]), text=d["text"],
+                         parse_mode=d.get("parse_mode"), key=d.get("key"),
+                         hold_s=float(d.get("hold_s") or HOLD_S), at=float(d.get("at", 0.0)))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.bury([name], f"unreadable: {e}")
+            return None
+
+    def done(self, names: List[str]):
+        for n in names:
+            try:
+                os.unlink(self.new / n)
+            except FileNotFoundError:
+                pass
+
+    def bury(self, names: List[str], reason: str):
+        self._mkdirs()
+        for n in names:
+            try:
+                os.replace(self.new / n, self.dead / n)
+            except FileNotFoundError:
+                continue
+            logging.warning(f"[TG] {n} → dead/: {reason}")
+
+
+_outbox: Optional[Outbox] = None
+_down_logged = False
+
+
+def send(token: str, chat_id, text: str, parse_mode: Optional[str] = None,
+         key: Optional[str] = None, hold_s: Optional[float] = None) -> bool:
+    """
+    Queue a message for the gateway; send directly when the gateway is
+    not running (no fresh heartbeat) or LEO_TG_GATEWAY=OFF.
+    Messages sharing `key` within `hold_s` seconds are sent as one digest.
+    """
+    global _outbox, _down_logged
+    if not (token and chat_id):
+        return False
+    msg = {"token": token, "chat_id": str(chat_id), "text": text, "parse_mode": parse_mode,
+           "key": key, "hold_s": hold_s, "at": time.time()}
+    if not GATEWAY:
+        return send_now(msg)
+    try:
+        if _outbox is None:
+            _outbox = Outbox()
+        if _outbox.gateway_alive():
+            _outbox.put(msg)
+            return True
+        if not _down_logged:
+            logging.warning(f"[TG] gateway not running (no heartbeat in {_outbox.root}) "
+                            f"— sending directly")
+            _down_logged = True
+        if send_now(msg):
+            return True
+        _outbox.put(msg)            # delivered once a gateway runs
+        return True
+    except OSError as e:
+        logging.warning(f"[TG] outbox unavailable ({e}) — sending directly")
+    return send_now(msg)
+
+
+def send_now(msg: dict, api_url: str = API_URL) -> bool:
+    payload = {"chat_id": msg["chat_id"], "text": msg["text"][:MAX_TEXT]}
+    if msg.get("parse_mode"):
+        payload["parse_mode"] = msg["parse_mode"]
+    transport = Transport(api_url)
+    try:
+        status, _ = transport.post(msg["token"], "sendMessage", payload)
+        return status == 200
+    except Exception as e:
+        logging.warning(f"[TG] send failed: {e}")
+        return False
+    finally:
+        transport.close()
+
+
+# ============================================================
+# TRANSPORT
+# ============================================================
+class Transport:
+    """One kept-alive HTTP(S) connection to the bot API."""
+
+    def __init__(self, api_url: str = API_URL, timeout: float = TIMEOUT_S):
+        u = urlsplit(api_url)
+        self.https = u.scheme == "https"
+        self.host = u.netloc
+        self.prefix = u.path.rstrip("/")
+        self.timeout = timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+        self.connects = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, timeout=self.timeout)
+            self.connects += 1
+        return self.conn
+
+    def post(self, token: str, method: str, payload: dict) -> Tuple[int, dict]:
+        body = json.dumps(payload).encode()
+        path = f"{self.prefix}/bot{token}/{method}"
+        headers = {"Content-Type": "application/json"}
+        for fresh in (self.conn is None, True):
+            conn = self._connect()
+            try:
+                conn.request("POST", path, body, headers)
+                r = conn.getresponse()
+                data = r.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # kept-alive connection closed by the server between sends
+                self.close()
+                if fresh:
+                    raise
+                continue
+            except Exception:
+                self.close()
+                raise
+            if (r.getheader("Connection") or "").lower() == "close":
+                self.close()
+            try:
+                return r.status, json.loads(data or b"{}")
+            except ValueError:
+                return r.status, {}
+        raise ConnectionError("unreachable")
+
+
+# ============================================================
+# GATEWAY
+# ============================================================
+def _interval(chat_id: str) -> float:
+    return GROUP_INTERVAL_S if chat_id.startswith("-") else CHAT_INTERVAL_S
+
+
+def _pack(entries: List[Entry]) -> Tuple[List[Entry], str]:
+    """The first entries that fit one message, as one text."""
+    key = entries[0].key
+    head = f"🗂 {key} ×{len(entries)}{SEPARATOR}" if key and len(entries) > 1 else ""
+    taken, size = [], len(head)
+    for e in entries:
+        add = len(e.text) + (len(SEPARATOR) if taken else 0)
+        if taken and size + add > MAX_TEXT:
+            break
+        taken.append(e)
+        size += add
+    if key and len(taken) > 1 and len(taken) < len(entries):
+        head = f"🗂 {key} ×{len(taken)}{SEPARATOR}"
+    text = head + SEPARATOR.join(e.text for e in taken)
+    return taken, text[:MAX_TEXT]
+
+
+class Gateway:
+    def __init__(self, outbox: Outbox, api_url: str = API_URL, clock=time.time):
+        self.outbox = outbox
+        self.transport = Transport(api_url)
+        self.clock = clock
+        self.pending: Dict[str, Entry] = {}
+        self.not_before: Dict[object, float] = {}     # bot token / (token, chat) → time
+        self.stats = {"messages": 0, "sent": 0, "limited": 0, "errors": 0, "dead": 0}
+
+    def poll(self):
+        names = self.outbox.names()
+        live = set(names)
+        for n in [n for n in self.pending if n not in live]:
+            del self.pending[n]
+        for n in names:
+            if n not in self.pending:
+                e = self.outbox.load(n)
+                if e is not None:
+                    self.pending[n] = e
+
+    def _expire(self, now: float):
+        old = [n for n, e in self.pending.items() if now - e.at > MAX_AGE_S]
+        if old:
+            self.outbox.bury(old, "expired")
+            self.stats["dead"] += len(old)
+            for n in old:
+                del self.pending[n]
+
+    def ready(self, now: float, flush: bool = False) -> List[List[Entry]]:
+        """At most one batch per chat whose rate limits allow a send now."""
+        chats: Dict[Tuple[str, str], List[Entry]] = {}
+        for n in sorted(self.pending):
+            e = self.pending[n]
+            chats.setdefault(e.chat, []).append(e)
+        out = []
+        for chat, entries in chats.items():
+            if now < self.not_before.get(chat, 0.0) or now < self.not_before.get(chat[0], 0.0):
+                continue
+            due = {}
+            for e in entries:
+                if e.key and e.key not in due:
+                    group = [g for g in entries if g.key == e.key]
+                    due[e.key] = flush or now >= min(g.at for g in group) + group[0].hold_s
+            first = next((e for e in entries if not e.key or due[e.key]), None)
+            if first is None:
+                continue
+            if first.key:
+                batch = [e for e in entries if e.key == first.key and e.parse_mode == first.parse_mode]
+            else:
+                batch = []
+                for e in entries[entries.index(first):]:
+                    if e.key and not due[e.key]:
+                        continue            # held digest: later entries may still go
+                    if e.key or e.parse_mode != first.parse_mode:
+                        break
+                    batch.append(e)
+            out.append(batch)
+        return out
+
+    def deliver(self, batch: List[Entry], now: float) -> int:
+        taken, text = _pack(batch)
+        first = taken[0]
+        names = [e.name for e in taken]
+        payload = {"chat_id": first.chat_id, "text": text}
+        if first.parse_mode:
+            payload["parse_mode"] = first.parse_mode
+        self.not_before[first.chat] = now + _interval(first.chat_id)
+        self.not_before[first.token] = now + 1.0 / BOT_RATE
+        try:
+            status, body = self.transport.post(first.token, "sendMessage", payload)
+        except Exception as e:
+            return self._retry(taken, now, f"network: {e}")
+        if status == 200:
+            self.outbox.done(names)
+            for n in names:
+                self.pending.pop(n, None)
+            self.stats["sent"] += 1
+            self.stats["messages"] += len(taken)
+            return len(taken)
+        desc = body.get("description", "")
+        if status == 429:
+            wait = float((body.get("parameters") or {}).get("retry_after", 1))
+            self.not_before[first.token] = now + wait
+            self.stats["limited"] += 1
+            return 0
+        if status == 400 and first.parse_mode and "parse" in desc.lower():
+            for e in taken:                 # broken HTML → plain text next round
+                e.parse_mode = None
+            self.not_before[first.chat] = now
+            return 0
+        if status >= 500:
+            return self._retry(taken, now, f"HTTP {status} {desc}")
+        self.outbox.bury(names, f"HTTP {status} {desc}")
+        for n in names:
+            self.pending.pop(n, None)
+        self.stats["dead"] += len(names)
+        return 0
+
+    def _retry(self, taken: List[Entry], now: float, why: str) -> int:
+        for e in taken:
+            e.attempts += 1
+        wait = min(MAX_BACKOFF_S, 2.0 ** taken[0].attempts)
+        self.not_before[taken[0].chat] = now + wait
+        self.stats["errors"] += 1
+        logging.warning(f"[TG] {why} — retry in {wait:.0f}s")
+        return 0
+
+    def step(self, flush: bool = False) -> int:
+        """One pass: read the outbox, send what is due. Messages delivered."""
+        self.poll()
+        now = self.clock()
+        self._expire(now)
+        done = 0
+        for batch in self.ready(now, flush):
+            done += self.deliver(batch, self.clock())
+        return done
+
+    def drain(self, flush: bool = False, timeout_s: float = 60.0) -> int:
+        """Deliver until nothing is due (rate limits waited out) or timeout."""
+        end = self.clock() + timeout_s
+        done = 0
+        while self.clock() < end:
+            done += self.step(flush)
+            if not self.ready(self.clock(), flush) and not self._waiting(flush):
+                break
+            time.sleep(0.05)
+        return done
+
+    def _waiting(self, flush: bool) -> bool:
+        """Due entries held back only by a rate limit / back-off."""
+        now = self.clock()
+        return any(not e.key or flush or now >= e.at + e.hold_s for e in self.pending.values())
+
+    def serve(self, poll_s: float = POLL_S):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        logging.info(f"[TG] gateway on {self.outbox.root} → {self.transport.host}")
+        beat = 0.0
+        try:
+            while not stop.is_set():
+                if time.monotonic() - beat >= HEARTBEAT_S:
+                    self.outbox.beat()
+                    beat = time.monotonic()
+                if not self.step():
+                    stop.wait(poll_s)
+        finally:
+            self.outbox.stopped()       # senders go direct until the restart
+            self.transport.close()
+        logging.info(f"[TG] gateway stopped: {self.stats}")
+
+
+def open_gateway(root: Path = OUTBOX_DIR, api_url: str = API_URL) -> Gateway:
+    return Gateway(Outbox(root), api_url)
+
+
+def status_lines(root: Path = OUTBOX_DIR) -> List[str]:
+    box = Outbox(root)
+    names = box.names()
+    dead = len(list(box.dead.glob("*.json"))) if box.dead.exists() else 0
+    line = f"outbox {len(names)} queued, {dead} dead"
+    if names:
+        oldest = int(names[0].split("-", 1)[0]) / 1e9
+        line += f", oldest {time.time() - oldest:.0f}s"
+    age = box.gateway_age()
+    if age is None:
+        gw = "gateway not running — senders send directly"
+    elif age > STALE_S:
+        gw = f"gateway STALE (heartbeat {age:.0f}s ago) — senders send directly"
+    else:
+        gw = f"gateway alive (heartbeat {age:.0f}s ago)"
+    return [line, gw]
+
+
+# ============================================================
+# STAND-IN BOT API
+# ============================================================
+class StandInBot(ThreadingHTTPServer):
+    """sendMessage with the per-chat limit of the real API (429 + retry_after)."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, chat_interval_s: float = CHAT_INTERVAL_S,
+                 latency_ms: float = 0.0):
+        super().__init__(("127.0.0.1", port), _StandInHandler)
+        self.chat_interval_s = chat_interval_s
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.messages: List[dict] = []
+        self.last: Dict[str, float] = {}
+        self.connections = 0
+        self.requests = 0
+        self.limited = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StandInBot":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        srv = self.server
+        msg = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if srv.latency_ms:
+            time.sleep(srv.latency_ms / 1000)
+        if not self.path.endswith("/sendMessage") or "/bot" not in self.path:
+            return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        if not msg.get("text"):
+            return self._reply(400, {"ok": False, "error_code": 400,
+                                     "description": "Bad Request: message text is empty"})
+        chat = str(msg.get("chat_id"))
+        with srv.lock:
+            srv.requests += 1
+            now = time.monotonic()
+            wait = srv.last.get(chat, -1e9) + srv.chat_interval_s - now
+            if wait > 0:
+                srv.limited += 1
+                retry = max(1, int(wait + 0.999))
+                return self._reply(429, {"ok": False, "error_code": 429,
+                                         "description": f"Too Many Requests: retry after {retry}",
+                                         "parameters": {"retry_after": retry}})
+            srv.last[chat] = now
+            srv.messages.append(msg)
+            mid = len(srv.messages)
+        self._reply(200, {"ok": True, "result": {"message_id": mid, "chat": {"id": chat},
+                                                  "text": msg["text"]}})
+
+
+# ============================================================
+# CLI
+# ============================================================
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Leo Telegram gateway")
+    ap.add_argument("cmd", choices=["serve", "drain", "status", "standin"])
+    ap.add_argument("--dir", type=Path, default=OUTBOX_DIR)
+    ap.add_argument("--api", default=API_URL)
+    ap.add_argument("--all", action="store_true", help="drain: ignore coalescing windows")
+    ap.add_argument("--port", type=int, default=8089, help="standin port")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        open_gateway(args.dir, args.api).serve()
+    elif args.cmd == "drain":
+        gw = open_gateway(args.dir, args.api)
+        n = gw.drain(flush=args.all)
+        print(f"delivered {n} messages in {gw.stats['sent']} sends "
+              f"({gw.transport.connects} connections)")
+    elif args.cmd == "status":
+        print("\n".join(status_lines(args.dir)))
+    else:
+        bot = StandInBot(args.port)
+        print(f"stand-in bot API on {bot.url} (LEO_TG_API={bot.url})")
+        try:
+            bot.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"{len(bot.messages)} messages, {bot.connections} connections, {bot.limited} × 429")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_account.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Incremental OANDA account state (NAV + open positions).
+#   The first run bootstraps from GET /v3/accounts/{id}; every later
+#   refresh polls /changes?sinceTransactionID=<last> and applies only
+#   the positions that changed plus the account-level NAV, so the
+#   refresh is one small request regardless of position count.
+#   State (last transaction id, NAV, positions) is persisted per
+#   MODE and shared by scalp + swing on the same account.
+#
+# Design goals:
+#   • Same shapes as before: nav float, {instrument: net units}
+#   • One refresh per cycle — NAV / positions reuse a refresh < MAX_AGE_S
+#     old, whichever of the two a cycle reads first
+#   • Any /changes failure (HTTP error, timeout, connection error,
+#     malformed body) or account switch → logged, full bootstrap
+#   • Full resync at least every RESYNC_S as a safety net
+#   • flock + atomic replace, like mes_htf_cache / mes_metrics
+# ============================================================
+
+import fcntl
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+MAX_AGE_S = 5.0
+RESYNC_S = float(os.getenv("MES_ACCOUNT_RESYNC_S", str(24 * 3600)))
+
+
+def net_units(position: dict) -> float:
+    return float(position["long"]["units"]) + float(position["short"]["units"])
+
+
+class AccountState:
+    def __init__(self, session, rest_url: str, account_id: str, path: Path):
+        self.session = session
+        self.account_id = account_id
+        self.base = f"{rest_url.rstrip('/')}/v3/accounts/{account_id}"
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.nav = 0.0
+        self.positions: Dict[str, float] = {}
+        self.last_txn: Optional[str] = None
+        self.transactions: List[dict] = []      # transactions seen by the last refresh
+        self.refreshed_at = 0.0
+        self.full_refreshes = 0
+        self.delta_refreshes = 0
+
+    # ---------------- OANDA ----------------
+    def _bootstrap(self) -> dict:
+        r = self.session.get(self.base, timeout=10)
+        r.raise_for_status()
+        acct = r.json()["account"]
+        self.full_refreshes += 1
+        self.transactions = []
+        return {
+            "account_id": self.account_id,
+            "last_txn": r.json().get("lastTransactionID") or acct["lastTransactionID"],
+            "nav": float(acct["NAV"]),
+            "positions": {p["instrument"]: net_units(p)
+                          for p in acct.get("positions", []) if net_units(p) != 0},
+            "synced_at": time.time(),
+        }
+
+    def _apply_changes(self, state: dict) -> Optional[dict]:
+        """State moved forward by /changes; None → the caller bootstraps."""
+        try:
+            r = self.session.get(f"{self.base}/changes",
+                                 params={"sinceTransactionID": state["last_txn"]}, timeout=10)
+            if r.status_code != 200:
+                logging.warning(f"[ACCOUNT] /changes HTTP {r.status_code} — full refresh")
+                return None
+            body = r.json()
+            changes = body.get("changes", {})
+            positions = dict(state["positions"])
+            for p in changes.get("positions", []):
+                units = net_units(p)
+                if units:
+                    positions[p["instrument"]] = units
+                else:
+                    positions.pop(p["instrument"], None)
+            fresh = {
+                **state,
+                "last_txn": body.get("lastTransactionID", state["last_txn"]),
+                "nav": float(body.get("state", {}).get("NAV", state["nav"])),
+                "positions": positions,
+            }
+            transactions = list(changes.get("transactions", []))
+        except (requests.RequestException, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"[ACCOUNT] /changes failed ({type(e).__name__}: {e}) — full refresh")
+            return None
+        self.delta_refreshes += 1
+        self.transactions = transactions
+        return fresh
+
+    # ---------------- refresh ----------------
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except Exception:
+            return {}
+
+    def refresh(self):
+        """Bring NAV + positions up to date (one request in steady state)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                state = self._read()
+                fresh = None
+                if (state.get("account_id") == self.account_id and state.get("last_txn")
+                        and time.time() - state.get("synced_at", 0) < RESYNC_S):
+                    fresh = self._apply_changes(state)
+                if fresh is None:
+                    fresh = self._bootstrap()
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(fresh, separators=(",", ":")))
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+        self.nav = fresh["nav"]
+        self.positions = dict(fresh["positions"])
+        self.last_txn = fresh["last_txn"]
+        self.refreshed_at = time.monotonic()
+
+    def current_nav(self) -> float:
+        """NAV from this cycle's refresh, refreshing if it is stale."""
+        if time.monotonic() - self.refreshed_at > MAX_AGE_S:
+            self.refresh()
+        return self.nav
+
+    def open_positions(self) -> Dict[str, float]:
+        """Positions from this cycle's refresh, refreshing if it is stale."""
+        if time.monotonic() - self.refreshed_at > MAX_AGE_S:
+            self.refresh()
+        return dict(self.positions)
+
+
+def open_account(session, rest_url: str, account_id: str, mode: str,
+                 state_dir: Path = STATE_DIR) -> AccountState:
+    return AccountState(session, rest_url, account_id,
+                        Path(state_dir) / f"account_{mode.lower()}.json")
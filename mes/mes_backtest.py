@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_backtest.py
+# Version: v1.1.1
+#
+# Purpose:
+#   Offline historical replay of MES decision logic.
+#   Stored H1/H4/M1 candles (mes_replay.CandleStore) are fed bar by
+#   bar through the real strategy files:
+#     • scalp — main_cycle() continuation logic on the timer grid,
+#               exits simulated at TP_PIPS / MAX_SL_PIPS on M1 bars
+#     • swing — evaluate_swing() alignment entry + early exit on
+#               every H1 close; the SL / TP attached at entry
+#               (SL_ATR_MULT / TP_ATR_MULT × ATR(H1) of the decision)
+#               simulated on M1 bars (H1 when no M1 is stored)
+#
+# Design goals:
+#   • Identical market conditions → identical trades (VERSION_POLICY)
+#   • No network calls — strategies run against a ReplayFeed
+#   • One process per instrument, all cores busy
+#
+# Known limits:
+#   • Instruments replay independently, so cross-pair caps such as
+#     swing MAX_OPEN_POSITIONS are not enforced
+#   • TP/SL in the same M1 bar is scored as SL (conservative)
+#
+# Usage:
+#   mes_backtest.py record --from 2025-01-01 --to 2026-01-01
+#   mes_backtest.py scalp  --from 2025-01-01 --to 2026-01-01 [--every 15]
+#   mes_backtest.py swing  --from 2025-01-01 --to 2026-01-01
+# ============================================================
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from mes_replay import (
+    DATA_DIR, MES_DIR, CandleStore, ReplayFeed,
+    decision_times, load_strategy, record, scalp_decisions,
+)
+
+DEFAULT_STRATEGY = {
+    "scalp": MES_DIR / "mes_scalp.py",
+    "swing": MES_DIR / "mes_swing.py",
+}
+
+# mirrors the mes_scalp_* timer calendar (Mon..Fri 13..21)
+SCALP_HOURS = range(13, 22)
+
+
+@dataclass
+class Trade:
+    instrument: str
+    direction: str
+    entry_time: str
+    entry: float
+    exit_time: str
+    exit: float
+    pips: float
+    outcome: str
+
+
+def pip_size(inst: str) -> float:
+    return 0.01 if inst.endswith("JPY") else 0.0001
+
+
+# ============================================================
+# EXIT SIMULATION
+# ============================================================
+def simulate_exit(m1, start: int, direction: str, entry: float,
+                  tp_pips: float, sl_pips: float, pip: float):
+    """
+    First bar (M1, or H1 without M1 data) from index start that touches TP or SL.
+    Returns (bar index, exit price, outcome); (None, ...) if neither.
+    """
+    hi = m1.values[start:, 1]
+    lo = m1.values[start:, 2]
+    if direction == "BUY":
+        tp, sl = entry + tp_pips * pip, entry - sl_pips * pip
+        hit_tp, hit_sl = hi >= tp, lo <= sl
+    else:
+        tp, sl = entry - tp_pips * pip, entry + sl_pips * pip
+        hit_tp, hit_sl = lo <= tp, hi >= sl
+
+    i_tp = int(np.argmax(hit_tp)) if hit_tp.any() else None
+    i_sl = int(np.argmax(hit_sl)) if hit_sl.any() else None
+    if i_sl is not None and (i_tp is None or i_sl <= i_tp):
+        return start + i_sl, sl, "SL"
+    if i_tp is not None:
+        return start + i_tp, tp, "TP"
+    return None, float(m1.values[-1, 3]), "OPEN"
+
+
+def _ts(series, i: int) -> str:
+    return datetime.fromtimestamp(series.close_time[i] / 1e9, timezone.utc).isoformat()
+
+
+# ============================================================
+# PER-INSTRUMENT REPLAY (runs in a worker process)
+# ============================================================
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(kind: str, strategy: str, data_dir: str, hours: Optional[range]):
+    store = CandleStore(Path(data_dir))
+    feed = ReplayFeed(store)
+    _worker.update(kind=kind, feed=feed, store=store, hours=hours,
+                   mod=load_strategy(Path(strategy), feed))
+
+
+def replay_scalp(inst: str, start: datetime, end: datetime, every: int) -> List[dict]:
+    feed, store, mod = _worker["feed"], _worker["store"], _worker["mod"]
+    m1 = store.load(inst, "M1")
+    pip = pip_size(inst)
+    tp_pips, sl_pips = float(mod.TP_PIPS), float(mod.MAX_SL_PIPS)
+
+    trades: List[dict] = []
+    busy_until = -1
+    for t in decision_times(m1, start, end, every, _worker["hours"]):
+        feed.set_time(t)
+        now_i = m1.available(feed.now_ns())
+        if now_i <= busy_until:
+            continue                      # one scalp position per pair
+        dec = scalp_decisions(mod, feed, [inst]).get(inst)
+        if not dec or dec["action"] != "SIGNAL":
+            continue
+        direction = dec["direction"]
+        entry = float(m1.values[now_i - 1, 3])
+        j, exit_px, outcome = simulate_exit(m1, now_i, direction, entry, tp_pips, sl_pips, pip)
+        sign = 1 if direction == "BUY" else -1
+        trades.append(asdict(Trade(
+            inst, direction, t.isoformat(), entry,
+            _ts(m1, j) if j is not None else "", exit_px,
+            round(sign * (exit_px - entry) / pip, 1), outcome,
+        )))
+        busy_until = j if j is not None else len(m1)
+    return trades
+
+
+def replay_swing(inst: str, start: datetime, end: datetime, every: int) -> List[dict]:
+    feed, store, mod = _worker["feed"], _worker["store"], _worker["mod"]
+    clock = store.load(inst, "H1")
+    bars = store.load(inst, "M1") if store.path(inst, "M1").exists() else clock
+    pip = pip_size(inst)
+
+    trades: List[dict] = []
+    pos: Optional[dict] = None
+    for t in decision_times(clock, start, end):
+        feed.set_time(t)
+        if pos and pos["stop"] is not None and bars.close_time[pos["stop"]] <= feed.now_ns():
+            # broker-side SL / TP filled before this close
+            trades.append(asdict(Trade(
+                inst, pos["direction"], pos["time"], pos["entry"],
+                _ts(bars, pos["stop"]), pos["exit"],
+                round(pos["units"] * (pos["exit"] - pos["entry"]) / pip, 1), pos["outcome"],
+            )))
+            pos = None
+        feed.positions = {inst: pos["units"]} if pos else {}
+        px = float(feed.candles(inst, "H1").iloc[-1]["close"])
+        dec = mod.evaluate_swing(inst, feed.nav, feed.open_positions())
+        if not dec:
+            continue
+        if dec.action == "CLOSE" and pos:
+            sign = pos["units"]
+            trades.append(asdict(Trade(
+                inst, pos["direction"], pos["time"], pos["entry"], t.isoformat(), px,
+                round(sign * (px - pos["entry"]) / pip, 1), "ALIGNMENT_BREAK",
+            )))
+            pos = None
+        elif dec.action == "TAKE" and not pos:
+            sign = 1 if dec.direction == "BUY" else -1
+            # as market_entry(): SL and TP distances from the fill
+            j, exit_px, outcome = simulate_exit(
+                bars, bars.available(feed.now_ns()), dec.direction, px,
+                abs(dec.tp - dec.entry) / pip, abs(dec.entry - dec.sl) / pip, pip)
+            pos = {"direction": dec.direction, "entry": px, "time": t.isoformat(),
+                   "units": sign, "stop": j, "exit": exit_px, "outcome": outcome}
+
+    if pos:
+        if pos["stop"] is not None:
+            exit_time, px, outcome = _ts(bars, pos["stop"]), pos["exit"], pos["outcome"]
+        else:
+            exit_time, px, outcome = "", float(clock.values[-1, 3]), "OPEN"
+        trades.append(asdict(Trade(
+            inst, pos["direction"], pos["time"], pos["entry"], exit_time, px,
+            round(pos["units"] * (px - pos["entry"]) / pip, 1), outcome,
+        )))
+    return trades
+
+
+def _run(inst: str, start: datetime, end: datetime, every: int) -> List[dict]:
+    fn = replay_scalp if _worker["kind"] == "scalp" else replay_swing
+    return fn(inst, start, end, every)
+
+
+def backtest(kind: str, instruments: List[str], start: datetime, end: datetime,
+             strategy: Path, data_dir: Path, every: int = 15,
+             workers: Optional[int] = None,
+             hours: Optional[range] = SCALP_HOURS) -> List[dict]:
+    workers = workers or min(len(instruments), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(kind, str(strategy), str(data_dir), hours)) as ex:
+        futures = [ex.submit(_run, inst, start, end, every) for inst in instruments]
+        trades = [t for f in futures for t in f.result()]
+    return trades
+
+
+# ============================================================
+# REPORT
+# ============================================================
+def summarize(trades: List[dict]):
+    by_inst: Dict[str, List[dict]] = {}
+    for t in trades:
+        by_inst.setdefault(t["instrument"], []).append(t)
+
+    print(f"\n{'PAIR':<9} {'TRADES':>6} {'WIN%':>6} {'NET PIPS':>9} {'AVG':>6}")
+    total = []
+    for inst in sorted(by_inst):
+        ts = by_inst[inst]
+        p = [t["pips"] for t in ts]
+        total += p
+        wins = sum(1 for x in p if x > 0)
+        print(f"{inst:<9} {len(p):>6} {100 * wins / len(p):>5.1f}% {sum(p):>9.1f} {np.mean(p):>6.2f}")
+    if total:
+        wins = sum(1 for x in total if x > 0)
+        print(f"{'TOTAL':<9} {len(total):>6} {100 * wins / len(total):>5.1f}% "
+              f"{sum(total):>9.1f} {np.mean(total):>6.2f}")
+    else:
+        print("No trades.")
+
+
+def _date(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+
+
+def _hours(s: str) -> Optional[range]:
+    if s == "all":
+        return None
+    lo, hi = s.split("-")
+    return range(int(lo), int(hi) + 1)
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES historical replay backtester")
+    ap.add_argument("kind", choices=["scalp", "swing", "record"])
+    ap.add_argument("--from", dest="start", required=True, type=_date)
+    ap.add_argument("--to", dest="end", required=True, type=_date)
+    ap.add_argument("--data", type=Path, default=DATA_DIR)
+    ap.add_argument("--strategy", type=Path, help="strategy file (default: repo copy)")
+    ap.add_argument("--instruments", nargs="*")
+    ap.add_argument("--every", type=int, default=15, help="scalp cycle spacing in minutes")
+    ap.add_argument("--hours", type=_hours, default=SCALP_HOURS,
+                    help="scalp UTC hours, e.g. 13-21 or 'all'")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--granularities", default="M1,H1,H4")
+    ap.add_argument("--out", type=Path, help="write trades CSV")
+    args = ap.parse_args()
+
+    store = CandleStore(args.data)
+
+    if args.kind == "record":
+        for inst in args.instruments or ["EUR_USD", "GBP_USD", "AUD_USD", "NZD_USD",
+                                         "USD_CAD", "USD_CHF", "EUR_GBP", "USD_JPY"]:
+            for tf in args.granularities.split(","):
+                n = record(store, inst, tf, args.start, args.end)
+                print(f"{inst} {tf}: {n} candles → {store.path(inst, tf)}")
+        sys.exit(0)
+
+    insts = args.instruments or store.instruments("M1" if args.kind == "scalp" else "H1")
+    if not insts:
+        print(f"No stored candles under {args.data} — run 'record' first")
+        sys.exit(1)
+
+    t0 = datetime.now()
+    trades = backtest(args.kind, insts, args.start, args.end,
+                      args.strategy or DEFAULT_STRATEGY[args.kind], args.data,
+                      args.every, args.workers, args.hours)
+    summarize(trades)
+    print(f"\nReplayed {len(insts)} instruments in {(datetime.now() - t0).total_seconds():.1f}s")
+
+    if args.out:
+        with args.out.open("w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(Trade.__dataclass_fields__))
+            w.writeheader()
+            w.writerows(trades)
+        print(f"Trades → {args.out}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_deadline.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Hard per-cycle decision budget for the MES strategies.
+#   The OANDA session retries 5× with exponential back-off on top
+#   of 15s timeouts, so one slow instrument could push a decision
+#   far past the candle it was based on. A Deadline is started per
+#   cycle; each phase (prefilter, bars, evaluate, sizing, ...) gets
+#   its own budget inside the cycle's.
+#   • guard(session): GET timeouts shortened to the budget left, no
+#     request sent once it is spent
+#   • DeadlineRetry: urllib3 Retry whose GET retries / back-off
+#     (Retry-After included) stop at the deadline
+#   • phase(name): a phase that ends late raises even if every
+#     request inside it was swallowed by a fallback
+#   Callers catch DeadlineExceeded, drop the cycle's decisions and
+#   record them as "deadline exceeded".
+#
+# Design goals:
+#   • Cooperative, no threads: a cycle ends at most one request
+#     timeout (itself capped at the budget left) after its deadline
+#   • Reads only: POST / PUT (orders, closes) are never cut short or
+#     abandoned mid-flight — callers check before sending instead
+#   • No-op outside an active() cycle (mes_stream, tools, imports)
+#   • The active deadline is a ContextVar, not a process global: two
+#     cycles on different threads each see their own; worker threads
+#     see it only when started in a copy of the caller's context
+#     (mes_orders does, per order)
+#   • MES_DEADLINE=OFF: unlimited budgets (replay / backtests)
+#
+# Usage:
+#   deadline = Deadline(20.0, {"evaluate": 15.0})
+#   with deadline.active():
+#       with deadline.phase("evaluate"):
+#           ...
+# ============================================================
+
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from urllib3.util.retry import Retry
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+# MES_DEADLINE=OFF disables every budget (mes_replay sets it)
+ENABLED = os.getenv("MES_DEADLINE", "ON").upper() != "OFF"
+
+MIN_TIMEOUT_S = 0.05        # smallest timeout handed to a request
+DEFAULT_TIMEOUT_S = 15.0    # GETs sent without a timeout
+
+_active: ContextVar[Optional["Deadline"]] = ContextVar("mes_deadline", default=None)
+
+
+class DeadlineExceeded(RuntimeError):
+    def __init__(self, phase: str, overrun_s: float):
+        super().__init__(f"deadline exceeded in {phase} (+{overrun_s:.2f}s)")
+        self.phase = phase
+        self.overrun_s = overrun_s
+
+
+def current() -> Optional["Deadline"]:
+    """Deadline of the running cycle (None outside one)."""
+    return _active.get()
+
+
+# ============================================================
+# DEADLINE
+# ============================================================
+class Deadline:
+    def __init__(self, budget_s: float, phases: Optional[Dict[str, float]] = None,
+                 enabled: bool = ENABLED, clock=time.monotonic):
+        self.clock = clock
+        self.budget_s = budget_s if enabled else math.inf
+        self.phases = dict(phases or {}) if enabled else {}
+        self.start = clock()
+        self.end = self.start + self.budget_s
+        self.phase_name = "cycle"
+        self.phase_end = self.end
+
+    def elapsed(self) -> float:
+        return self.clock() - self.start
+
+    def remaining(self) -> float:
+        """Seconds left in the current phase (never beyond the cycle's)."""
+        return min(self.end, self.phase_end) - self.clock()
+
+    def check(self, where: Optional[str] = None):
+        left = self.remaining()
+        if left <= 0:
+            raise DeadlineExceeded(where or self.phase_name, -left)
+
+    def timeout(self, cap):
+        """Request timeout: `cap` (float or (connect, read)) cut to the budget left."""
+        self.check()
+        left = max(self.remaining(), MIN_TIMEOUT_S)
+        if isinstance(cap, tuple):
+            return tuple(left if c is None else min(c, left) for c in cap)
+        return left if cap is None else min(cap, left)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Budget `phases[name]` from now; raises on exit if the phase ran late."""
+        outer = (self.phase_name, self.phase_end)
+        self.phase_name = name
+        self.phase_end = min(self.end, self.clock() + self.phases.get(name, math.inf))
+        try:
+            yield self
+            self.check()
+        finally:
+            self.phase_name, self.phase_end = outer
+
+    @contextmanager
+    def active(self):
+        """Make this the deadline guard() / DeadlineRetry enforce."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+
+# ============================================================
+# TRANSPORT (requests.Session / urllib3)
+# ============================================================
+def guard(session):
+    """Cap the timeout of every GET of `session` at the active deadline."""
+    original = session.request
+
+    def request(method, url, *args, **kwargs):
+        d = _active.get()
+        if d is not None and method.upper() == "GET":
+            kwargs["timeout"] = d.timeout(kwargs.get("timeout") or DEFAULT_TIMEOUT_S)
+        return original(method, url, *args, **kwargs)
+
+    session.request = request
+    return session
+
+
+class DeadlineRetry(Retry):
+    """Retry whose GET retries and back-off end at the active deadline."""
+
+    bounded = False
+
+    def increment(self, method=None, url=None, *args, **kwargs):
+        d = _active.get()
+        bounded = d is not None and (method or "").upper() == "GET"
+        if bounded:
+            d.check()
+        new = super().increment(method, url, *args, **kwargs)
+        new.bounded = bounded
+        return new
+
+    def sleep(self, response=None):
+        d = _active.get()
+        if not self.bounded or d is None:
+            return super().sleep(response)
+        wait = self.get_retry_after(response) if (response is not None and
+                                                  self.respect_retry_after_header) else None
+        if not wait:
+            wait = self.get_backoff_time()
+        time.sleep(max(0.0, min(wait, d.remaining())))
+        d.check()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_decisions.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Append-only MES decision history.
+#   Every cycle's per-pair diagnostics (the latest_diag.json payload)
+#   are appended to a compressed daily segment instead of being
+#   overwritten, so past reasons / exec_units / margin caps stay
+#   queryable. latest_diag.json is still written as the cheap
+#   "latest" view for the dashboard.
+#
+# Layout (one directory per MODE):
+#   decisions/<mode>/YYYY-MM-DD.seg   zlib blocks, each a JSON list of cycles
+#   decisions/<mode>/YYYY-MM-DD.idx   fixed 22-byte records, time ordered:
+#                                     (epoch, block offset, block length, slot)
+#   decisions/<mode>/YYYY-MM-DD.cseg/.cidx   same, after compaction
+#
+# Design goals:
+#   • Day selected from the file name, cycle by bisect over the index
+#     → O(log n) lookup by time; pair filtering happens per cycle
+#   • Live cycles are one block each (append = two small writes);
+#     compaction regroups past days into blocks of COMPACT_BLOCK cycles
+#     so the similar JSON compresses together
+#   • Preset zlib dictionary of diag field names keeps live blocks small
+#   • Retention by deleting whole day files
+#   • Crash safe: data before index, torn index tails ignored
+# ============================================================
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+RETAIN_DAYS = int(os.getenv("MES_DECISIONS_RETAIN_DAYS", "400"))
+COMPACT_AFTER_DAYS = 1
+COMPACT_BLOCK = 96                    # one compacted block ≈ one trading day
+
+INDEX = struct.Struct("<dQIH")        # epoch seconds, offset, length, slot
+BLOCK_MAGIC = b"D1"                   # format / dictionary version
+
+# Field names and common values from the scalp / swing diagnostics.
+# Changing this requires a new BLOCK_MAGIC.
+ZDICT = json.dumps({
+    "generated_at": "", "version": "MES v3.5. DEMO LIVE", "mode": "DEMO", "pairs": {},
+    "pair": "EUR_USD", "time": "", "decision": "SKIPPED", "direction": "NONE",
+    "atr_current": None, "atr_delta": None, "atr_trend": "rising falling flat unknown",
+    "macd_fast": None, "macd_slow": None, "macd_sep": None,
+    "rsi_15m": None, "rsi_1h": None, "rsi_4h": None,
+    "candle_structure": "bullish bearish", "tf_15m": None, "tf_1h": "bullish",
+    "tf_4h": "bearish", "rr": None, "rr_min": None, "reasons": ["HTF_MISALIGNED",
+    "WEAK_M1_CANDLE", "CONTINUATION_OK"], "exec_units": 0, "was_margin_capped": False,
+    "tp_pips": None, "sl_pips": None, "body_ratio": None, "strong_body_ratio": None,
+    "GBP_USD USD_JPY AUD_USD NZD_USD USD_CAD USD_CHF EUR_GBP SIGNAL BUY SELL": True,
+}).encode()
+
+
+def _compress(cycles: List[dict]) -> bytes:
+    c = zlib.compressobj(9, zdict=ZDICT)
+    raw = json.dumps(cycles, separators=(",", ":"), default=str).encode()
+    return BLOCK_MAGIC + c.compress(raw) + c.flush()
+
+
+def _decompress(blob: bytes) -> List[dict]:
+    if blob[:2] != BLOCK_MAGIC:
+        raise ValueError("unknown decision block format")
+    d = zlib.decompressobj(zdict=ZDICT)
+    return json.loads(d.decompress(blob[2:]) + d.flush())
+
+
+def _parse_time(payload: dict) -> datetime:
+    t = payload.get("generated_at")
+    return datetime.fromisoformat(t) if t else datetime.now(timezone.utc)
+
+
+# ------------------------------------------------------------
+# ONE DAY
+# ------------------------------------------------------------
+class Segment:
+    """
+    One day. Live days are <day>.seg/.idx; compaction writes
+    <day>.cseg/.cidx and only then removes the live pair, so a
+    crash at any point leaves one complete, consistent pair.
+    """
+
+    def __init__(self, root: Path, day: str):
+        self.day = day
+        self.root = root
+        self._index: Optional[List[Tuple[float, int, int, int]]] = None
+
+    def _paths(self, compacted: bool) -> Tuple[Path, Path]:
+        ext = ("cseg", "cidx") if compacted else ("seg", "idx")
+        return tuple(self.root / f"{self.day}.{e}" for e in ext)
+
+    def compacted(self) -> bool:
+        return self._paths(True)[1].exists()
+
+    @property
+    def seg(self) -> Path:
+        return self._paths(self.compacted())[0]
+
+    @property
+    def idx(self) -> Path:
+        return self._paths(self.compacted())[1]
+
+    def index(self) -> List[Tuple[float, int, int, int]]:
+        if self._index is None:
+            try:
+                raw = self.idx.read_bytes()
+            except FileNotFoundError:
+                raw = b""
+            n = len(raw) // INDEX.size     # torn tail record is ignored
+            self._index = [INDEX.unpack_from(raw, i * INDEX.size) for i in range(n)]
+        return self._index
+
+    def read(self, lo: float, hi: float) -> Iterator[Tuple[datetime, dict]]:
+        """Cycles with lo <= epoch < hi, in time order."""
+        idx = self.index()
+        times = [r[0] for r in idx]
+        a, b = bisect_left(times, lo), bisect_left(times, hi)
+        if a >= b:
+            return
+        block: Tuple[int, List[dict]] = (-1, [])
+        with open(self.seg, "rb") as f:
+            for epoch, off, length, slot in idx[a:b]:
+                if block[0] != off:
+                    f.seek(off)
+                    block = (off, _decompress(f.read(length)))
+                yield datetime.fromtimestamp(epoch, timezone.utc), block[1][slot]
+
+    def append(self, epoch: float, payload: dict):
+        seg, idx = self._paths(False)
+        blob = _compress([payload])
+        with open(seg, "ab") as f:
+            off = f.tell()
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(idx, "ab") as f:
+            # realign after a torn write so records stay fixed-size
+            tail = f.tell() % INDEX.size
+            if tail:
+                f.truncate(f.tell() - tail)
+                f.seek(0, os.SEEK_END)
+            f.write(INDEX.pack(epoch, off, len(blob), 0))
+        self._index = None
+
+    def compact(self, block: int = COMPACT_BLOCK) -> Tuple[int, int]:
+        """Regroup into multi-cycle blocks. Returns (bytes before, after)."""
+        live_seg, live_idx = self._paths(False)
+        before = live_seg.stat().st_size
+        cycles = [(t.timestamp(), p) for t, p in self.read(float("-inf"), float("inf"))]
+        cseg, cidx = self._paths(True)
+        tmp = cidx.with_suffix(".tmp")
+        with open(cseg, "wb") as fs, open(tmp, "wb") as fi:
+            for i in range(0, len(cycles), block):
+                chunk = cycles[i:i + block]
+                blob = _compress([p for _, p in chunk])
+                off = fs.tell()
+                fs.write(blob)
+                for slot, (epoch, _) in enumerate(chunk):
+                    fi.write(INDEX.pack(epoch, off, len(blob), slot))
+        os.replace(tmp, cidx)                 # commit point
+        live_seg.unlink(missing_ok=True)
+        live_idx.unlink(missing_ok=True)
+        self._index = None
+        return before, cseg.stat().st_size
+
+
+# ------------------------------------------------------------
+# STORE
+# ------------------------------------------------------------
+class DecisionStore:
+    """
+    History for one MODE. latest_path (optional) receives the newest
+    payload as plain JSON — the dashboard's existing latest view.
+    """
+
+    def __init__(self, root: Path, latest_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.latest_path = Path(latest_path) if latest_path else None
+        self.lock_path = self.root / ".lock"
+
+    def _segment(self, day: str) -> Segment:
+        return Segment(self.root, day)
+
+    def days(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted({p.stem for p in self.root.glob("*.idx")} |
+                      {p.stem for p in self.root.glob("*.cidx")})
+
+    # ---- write ----
+    def append(self, payload: dict, encoder=None):
+        """Append one cycle and refresh the latest view."""
+        t = _parse_time(payload)
+        day = t.strftime("%Y-%m-%d")
+        payload = json.loads(json.dumps(payload, cls=encoder, default=str))
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                new_day = day not in self.days()
+                self._segment(day).append(t.timestamp(), payload)
+                if new_day:
+                    self.maintain(today=t)
+                fcntl.flock(lf, fcntl.LOCK_UN)
+        except Exception as e:
+            logging.warning(f"Decision history append failed: {e}")
+
+        if self.latest_path:
+            tmp = self.latest_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, indent=2))
+            os.replace(tmp, self.latest_path)
+
+    def maintain(self, today: Optional[datetime] = None,
+                 retain_days: int = RETAIN_DAYS,
+                 compact_after: int = COMPACT_AFTER_DAYS) -> dict:
+        """Compact past days and drop days beyond retention (caller holds the lock)."""
+        today = today or datetime.now(timezone.utc)
+        drop_before = (today - timedelta(days=retain_days)).strftime("%Y-%m-%d")
+        compact_before = (today - timedelta(days=compact_after - 1)).strftime("%Y-%m-%d")
+        stats = {"dropped": 0, "compacted": 0, "saved_bytes": 0}
+        for day in self.days():
+            seg = self._segment(day)
+            if day < drop_before:
+                for path in (*seg._paths(False), *seg._paths(True)):
+                    path.unlink(missing_ok=True)
+                stats["dropped"] += 1
+            elif day < compact_before and not seg.compacted():
+                before, after = seg.compact()
+                stats["compacted"] += 1
+                stats["saved_bytes"] += before - after
+        return stats
+
+    # ---- read ----
+    def latest(self) -> Optional[dict]:
+        if self.latest_path and self.latest_path.exists():
+            return json.loads(self.latest_path.read_text())
+        for day in reversed(self.days()):
+            idx = self._segment(day).index()
+            if idx:
+                return next(self._segment(day).read(idx[-1][0], float("inf")))[1]
+        return None
+
+    def cycles(self, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> Iterator[Tuple[datetime, dict]]:
+        """Whole cycle payloads with start <= time < end."""
+        lo = start.timestamp() if start else float("-inf")
+        hi = end.timestamp() if end else float("inf")
+        days = self.days()
+        first = bisect_left(days, start.strftime("%Y-%m-%d")) if start else 0
+        last = bisect_right(days, end.strftime("%Y-%m-%d")) if end else len(days)
+        for day in days[first:last]:
+            yield from self._segment(day).read(lo, hi)
+
+    def query(self, pair: Optional[str] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> Iterator[Tuple[datetime, str, dict]]:
+        """(time, pair, diag) rows, optionally for one pair."""
+        for t, payload in self.cycles(start, end):
+            pairs = payload.get("pairs", {})
+            items = [(pair, pairs[pair])] if pair and pair in pairs else \
+                [] if pair else sorted(pairs.items())
+            for p, diag in items:
+                yield t, p, diag
+
+    def stats(self) -> dict:
+        days = self.days()
+        size = sum(self._segment(d).seg.stat().st_size for d in days)
+        cycles = sum(len(self._segment(d).index()) for d in days)
+        return {"days": len(days), "cycles": cycles, "bytes": size,
+                "first": days[0] if days else None, "last": days[-1] if days else None}
+
+
+def open_store(mode: str, state_dir: Path = STATE_DIR,
+               latest_path: Optional[Path] = None) -> DecisionStore:
+    """One history per MODE — DEMO and LIVE accounts are kept apart."""
+    return DecisionStore(Path(state_dir) / "decisions" / mode.lower(), latest_path)
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def _date(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES decision history")
+    ap.add_argument("cmd", choices=["query", "stats", "compact"])
+    ap.add_argument("--mode", default=os.getenv("MES_MODE", "DEMO"))
+    ap.add_argument("--dir", type=Path, default=STATE_DIR)
+    ap.add_argument("--pair")
+    ap.add_argument("--from", dest="start", type=_date)
+    ap.add_argument("--to", dest="end", type=_date)
+    ap.add_argument("--signals", action="store_true", help="only non-skipped decisions")
+    args = ap.parse_args()
+
+    store = open_store(args.mode, args.dir)
+    if args.cmd == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.cmd == "compact":
+        with open(store.lock_path, "a+") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            print(json.dumps(store.maintain(), indent=2))
+    else:
+        for t, pair, d in store.query(args.pair, args.start, args.end):
+            if args.signals and d.get("decision") in (None, "SKIPPED"):
+                continue
+            reasons = ",".join(d.get("reasons") or [])
+            print(f"{t:%Y-%m-%d %H:%M} {pair:<8} {d.get('decision', '?'):<8} "
+                  f"{d.get('direction') or '':<5} units={d.get('exec_units', 0)} {reasons}")
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_diff.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Differential replay of two versions of mes_scalp.py or
+#   mes_swing.py. Both versions see the SAME recorded candles and
+#   the SAME recorded account state (NAV / open positions) at every
+#   decision point; any (pair, time) where their decisions differ
+#   in action, direction or size is reported.
+#
+#   Under VERSION_POLICY a behavior change is exactly such a
+#   difference, so the report tells whether a PATCH bump is
+#   justified or the change needs MINOR (or a hotfix suffix).
+#
+# Design goals:
+#   • Fast enough for every `leo govern` — short recent window,
+#     one worker process per (version, instrument)
+#   • Unmodified strategy code (mes_replay.load_strategy)
+#   • Exit status usable as a gate: 0 ok, 2 bump not justified
+#
+# Usage:
+#   mes_diff.py scalp --baseline mes_scalp.py --candidate stage/mes_scalp_v3.5.103.py
+#   mes_diff.py swing --baseline A.py --candidate B.py --days 10 --json out.json
+#   mes_diff.py snapshot            # append current NAV / positions
+# ============================================================
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from mes_replay import (
+    DATA_DIR, AccountSnapshots, CandleStore, ReplayFeed,
+    decision_times, load_strategy, scalp_decisions, swing_decision,
+)
+
+ACCOUNT_LOG = DATA_DIR.parent / "account_snapshots.jsonl"
+DEFAULT_DAYS = 5
+SCALP_HOURS = range(13, 22)           # mes_scalp_* timer calendar
+SCALP_EVERY = 15
+
+VERSION_RE = re.compile(r"v(\d+)\.(\d+)\.(\d+)([a-z]?)")
+
+Key = Tuple[str, str]                 # (pair, iso time)
+
+
+# ============================================================
+# WORKER (one per process)
+# ============================================================
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(kind: str, data_dir: str, account_log: str, hours: Optional[range]):
+    store = CandleStore(Path(data_dir))
+    _worker.update(kind=kind, store=store, feed=ReplayFeed(store), hours=hours,
+                   account=AccountSnapshots(Path(account_log)), mods={})
+
+
+def _module(path: str):
+    mods = _worker["mods"]
+    if path not in mods:
+        mods[path] = load_strategy(Path(path), _worker["feed"])
+    return mods[path]
+
+
+def replay_decisions(path: str, inst: str, start: datetime, end: datetime,
+                     every: int) -> Dict[Key, dict]:
+    """Every non-empty decision one strategy version takes for inst."""
+    feed, store, account = _worker["feed"], _worker["store"], _worker["account"]
+    mod = _module(path)
+    out: Dict[Key, dict] = {}
+    cache = getattr(mod, "htf_cache", None)
+    if cache is not None:
+        cache.entries.clear()         # jobs may rewind the clock
+
+    if _worker["kind"] == "scalp":
+        clock = store.load(inst, "M1")
+        for t in decision_times(clock, start, end, every, _worker["hours"]):
+            feed.set_time(t, account)
+            dec = scalp_decisions(mod, feed, [inst]).get(inst)
+            if dec:
+                out[(inst, t.isoformat())] = dec
+        return out
+
+    # swing: recorded positions when available, otherwise each
+    # version carries the position its own decisions opened
+    clock = store.load(inst, "H1")
+    own: Dict[str, float] = {}
+    for t in decision_times(clock, start, end):
+        feed.set_time(t, account)
+        if not account:
+            feed.positions = dict(own)
+        dec = swing_decision(mod, feed, inst)
+        if not dec:
+            continue
+        out[(inst, t.isoformat())] = dec
+        if dec["action"] == "TAKE":
+            own[inst] = 1.0 if dec["direction"] == "BUY" else -1.0
+        elif dec["action"] == "CLOSE":
+            own.pop(inst, None)
+    return out
+
+
+# ============================================================
+# COMPARISON
+# ============================================================
+def compare(a: Dict[Key, dict], b: Dict[Key, dict]) -> List[dict]:
+    """(pair, time) keys where the two decision sets disagree."""
+    diffs = []
+    for key in sorted(set(a) | set(b), key=lambda k: (k[1], k[0])):
+        da, db = a.get(key), b.get(key)
+        if da == db:
+            continue
+        diffs.append({"pair": key[0], "time": key[1], "baseline": da, "candidate": db})
+    return diffs
+
+
+def run_diff(kind: str, baseline: Path, candidate: Path, instruments: List[str],
+             start: datetime, end: datetime, data_dir: Path = DATA_DIR,
+             account_log: Path = ACCOUNT_LOG, every: int = SCALP_EVERY,
+             hours: Optional[range] = SCALP_HOURS, workers: Optional[int] = None) -> dict:
+    jobs = [(role, str(p), inst)
+            for role, p in (("baseline", baseline), ("candidate", candidate))
+            for inst in instruments]
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(kind, str(data_dir), str(account_log), hours)) as ex:
+        futures = {job: ex.submit(replay_decisions, job[1], job[2], start, end, every)
+                   for job in jobs}
+        sides: Dict[str, Dict[Key, dict]] = {"baseline": {}, "candidate": {}}
+        for job, f in futures.items():
+            sides[job[0]].update(f.result())
+    a, b = sides["baseline"], sides["candidate"]
+
+    return {
+        "kind": kind,
+        "baseline": str(baseline),
+        "candidate": str(candidate),
+        "window": [start.isoformat(), end.isoformat()],
+        "instruments": instruments,
+        "account_snapshots": bool(AccountSnapshots(account_log)),
+        "baseline_decisions": len(a),
+        "candidate_decisions": len(b),
+        "differences": compare(a, b),
+    }
+
+
+# ============================================================
+# VERSION POLICY CHECK
+# ============================================================
+def file_version(path: Path) -> Optional[str]:
+    """Version from the VERSION string, falling back to the file name."""
+    m = re.search(r'^VERSION\s*=.*?(v\d+\.\d+\.\d+[a-z]?)', Path(path).read_text(), re.M)
+    if m:
+        return m.group(1)
+    m = VERSION_RE.search(Path(path).name)
+    return m.group(0) if m else None
+
+
+def bump_kind(old: str, new: str) -> Optional[str]:
+    """MAJOR / MINOR / PATCH / SUFFIX between two versions (None if not monotonic)."""
+    a, b = VERSION_RE.search(old), VERSION_RE.search(new)
+    if not a or not b:
+        return None
+    va, vb = tuple(map(int, a.groups()[:3])), tuple(map(int, b.groups()[:3]))
+    if vb[0] > va[0]:
+        return "MAJOR"
+    if vb[:1] == va[:1] and vb[1] > va[1]:
+        return "MINOR"
+    if vb[:2] == va[:2] and vb[2] > va[2]:
+        return "PATCH"
+    if vb == va and b.group(4) > a.group(4):
+        return "SUFFIX"
+    return None
+
+
+def verdict(report: dict, version_from: Optional[str], version_to: Optional[str]) -> dict:
+    """
+    Behavior changed → strategy_behavior (MINOR, or SUFFIX as hotfix).
+    No difference   → any bump is allowed; PATCH is the expected one.
+    """
+    changed = bool(report["differences"])
+    bump = bump_kind(version_from, version_to) if version_from and version_to else None
+    ok = not changed or bump in ("MAJOR", "MINOR", "SUFFIX")
+    return {
+        "version_from": version_from,
+        "version_to": version_to,
+        "bump": bump,
+        "implied_category": "strategy_behavior" if changed else "no_trade_impact",
+        "bump_justified": ok if bump else None,
+    }
+
+
+# ============================================================
+# REPORT
+# ============================================================
+def _fmt(d: Optional[dict]) -> str:
+    if not d:
+        return "—"
+    return f"{d['action']} {d['direction'] or ''} {d['size'] or ''}".strip()
+
+
+def print_report(report: dict, check: dict, limit: int = 25):
+    diffs = report["differences"]
+    print(f"{report['kind']} replay {report['window'][0][:16]} → {report['window'][1][:16]} "
+          f"({len(report['instruments'])} instruments, "
+          f"account state: {'recorded' if report['account_snapshots'] else 'simulated'})")
+    print(f"decisions: baseline {report['baseline_decisions']}, "
+          f"candidate {report['candidate_decisions']}, differing {len(diffs)}")
+    if diffs:
+        print(f"\n{'PAIR':<9} {'TIME':<17} {'BASELINE':<20} CANDIDATE")
+        for d in diffs[:limit]:
+            print(f"{d['pair']:<9} {d['time'][:16]:<17} {_fmt(d['baseline']):<20} {_fmt(d['candidate'])}")
+        if len(diffs) > limit:
+            print(f"... {len(diffs) - limit} more")
+    print(f"\nimplied category: {check['implied_category']}")
+    if check["bump"]:
+        state = "OK" if check["bump_justified"] else "NOT JUSTIFIED"
+        print(f"version {check['version_from']} → {check['version_to']} ({check['bump']}): {state}")
+
+
+def _date(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+
+
+def latest_close(store: CandleStore, insts: List[str], tf: str) -> datetime:
+    ns = max(int(store.load(i, tf).close_time[-1]) for i in insts)
+    return datetime.fromtimestamp(ns / 1e9, timezone.utc)
+
+
+def snapshot_account(path: Path = ACCOUNT_LOG):
+    """Append the live account's NAV and open positions (network)."""
+    import mes_swing as swing
+    nav = swing.oanda_get_account_nav() if hasattr(swing, "oanda_get_account_nav") else 0.0
+    AccountSnapshots.append(path, nav, swing.oanda_open_positions())
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES differential replay (baseline vs candidate)")
+    ap.add_argument("kind", choices=["scalp", "swing", "snapshot"])
+    ap.add_argument("--baseline", type=Path)
+    ap.add_argument("--candidate", type=Path)
+    ap.add_argument("--data", type=Path, default=DATA_DIR)
+    ap.add_argument("--account", type=Path, default=ACCOUNT_LOG,
+                    help="account snapshot JSONL (NAV / positions)")
+    ap.add_argument("--instruments", nargs="*")
+    ap.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    ap.add_argument("--from", dest="start", type=_date)
+    ap.add_argument("--to", dest="end", type=_date)
+    ap.add_argument("--every", type=int, default=SCALP_EVERY)
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--version-from")
+    ap.add_argument("--version-to")
+    ap.add_argument("--json", type=Path, help="write the full report")
+    args = ap.parse_args()
+
+    if args.kind == "snapshot":
+        snapshot_account(args.account)
+        print(f"Account snapshot → {args.account}")
+        sys.exit(0)
+
+    if not args.baseline or not args.candidate:
+        ap.error("--baseline and --candidate are required")
+
+    store = CandleStore(args.data)
+    clock_tf = "M1" if args.kind == "scalp" else "H1"
+    insts = args.instruments or store.instruments(clock_tf)
+    if not insts:
+        print(f"No stored candles under {args.data} — run 'mes_backtest.py record' first")
+        sys.exit(1)
+
+    end = args.end or latest_close(store, insts, clock_tf)
+    start = args.start or end - timedelta(days=args.days)
+
+    t0 = datetime.now()
+    report = run_diff(args.kind, args.baseline, args.candidate, insts, start, end,
+                      args.data, args.account, args.every, SCALP_HOURS, args.workers)
+    check = verdict(report,
+                    args.version_from or file_version(args.baseline),
+                    args.version_to or file_version(args.candidate))
+    report["policy"] = check
+    report["elapsed_s"] = round((datetime.now() - t0).total_seconds(), 2)
+
+    print_report(report, check)
+    print(f"\nReplayed in {report['elapsed_s']:.1f}s")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, default=str))
+
+    sys.exit(2 if check["bump_justified"] is False else 0)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_htf_cache.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Candle-close-aware memo for higher-timeframe structure.
+#   The H1/H4 structure read by scalp and swing comes from the
+#   last COMPLETE candle, which cannot change before the next
+#   candle of that granularity closes. Until then the structure
+#   is served from disk instead of refetching 300 candles.
+#
+# Design goals:
+#   • Keyed by (instrument, granularity, last complete bar time)
+#   • Expiry derived from the bar time itself (no session tables)
+#   • Persists across oneshot systemd runs
+#   • Safe for concurrent scalp + swing runs (flock + merge)
+# ============================================================
+
+import fcntl
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+# MES_HTF_CACHE=OFF forces a refetch every cycle (debug / replay)
+ENABLED = os.getenv("MES_HTF_CACHE", "ON").upper() != "OFF"
+
+GRANULARITY_SECONDS: Dict[str, int] = {
+    "M1": 60,
+    "M5": 300,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H4": 14400,
+    "D": 86400,
+}
+
+
+def utc_now() -> datetime:
+    """Memo clock — replaced by the replay tools with the simulated time."""
+    return datetime.now(timezone.utc)
+
+
+def bar_duration(granularity: str) -> timedelta:
+    return timedelta(seconds=GRANULARITY_SECONDS[granularity])
+
+
+def next_close(granularity: str, bar_time: datetime) -> datetime:
+    """
+    Close time of the candle AFTER the last complete one.
+
+    bar_time is the open time of the last complete candle, so it
+    closed at bar_time + 1 bar and its successor closes one bar
+    later. Market gaps only make this earlier than reality, which
+    costs a refetch, never a stale read.
+    """
+    return bar_time + 2 * bar_duration(granularity)
+
+
+# ------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------
+class HTFCache:
+    """
+    File-backed memo of {"INST:TF": {bar_time, next_close, structure, ...}}.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.entries: Dict[str, dict] = self._read()
+        self.dirty: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text())
+        except Exception:
+            return {}
+
+    def get(self, inst: str, tf: str, now: Optional[datetime] = None) -> Optional[str]:
+        """Cached structure for inst/tf, or None if missing or expired."""
+        if not ENABLED:
+            self.misses += 1
+            return None
+        e = self.entries.get(f"{inst}:{tf}")
+        now = now or utc_now()
+        if e and now < datetime.fromisoformat(e["next_close"]):
+            self.hits += 1
+            return e["structure"]
+        self.misses += 1
+        return None
+
+    def put(self, inst: str, tf: str, bar_time: datetime, structure: str, **fields):
+        """fields: extra per-bar values (e.g. rsi) valid for the same bar."""
+        e = {
+            "bar_time": bar_time.isoformat(),
+            "next_close": next_close(tf, bar_time).isoformat(),
+            "structure": structure,
+            **fields,
+        }
+        self.entries[f"{inst}:{tf}"] = e
+        self.dirty[f"{inst}:{tf}"] = e
+
+    def fields(self, inst: str, tf: str) -> dict:
+        """Everything stored for inst/tf (diagnostics only — no expiry check)."""
+        return self.entries.get(f"{inst}:{tf}", {})
+
+    def save(self):
+        """Merge our updates into the file under an exclusive lock."""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                merged = self._read()
+                for key, e in self.dirty.items():
+                    old = merged.get(key)
+                    if old is None or old["bar_time"] < e["bar_time"]:
+                        merged[key] = e
+                    elif old["bar_time"] == e["bar_time"]:
+                        merged[key] = {**old, **e}
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(merged, indent=1, sort_keys=True))
+                os.replace(tmp, self.path)
+                fcntl.flock(lf, fcntl.LOCK_UN)
+            self.dirty.clear()
+        except Exception as e:
+            logging.warning(f"HTF cache save failed: {e}")
+
+
+def open_cache(mode: str, state_dir: Path = STATE_DIR) -> HTFCache:
+    """One cache per MODE — DEMO and LIVE price feeds are kept apart."""
+    return HTFCache(Path(state_dir) / f"htf_cache_{mode.lower()}.json")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_http.py
+# Version: v1.0.2
+#
+# Purpose:
+#   The HTTP clients of the MES strategies.
+#   • open_client(): the OANDA v20 session of a strategy module,
+#     replacing _get_oanda_session() in mes_scalp and the module
+#     session in mes_swing. Every client of the process runs on ONE
+#     connection pool (scalp + swing under mes_scheduler, every
+#     account under mes_runner)
+#       - connection pool sized for the concurrent order / fetch
+#         threads (MES_HTTP_POOL, default 16)
+#       - gzip / deflate asked for explicitly — candle JSON shrinks
+#         5–8x on the wire (mes_load on the stand-in)
+#       - Retry (5×, back-off 0.5s, 429 / 5xx) bounded by the cycle
+#         deadline (mes_deadline) — GETs only: a POST / PUT is an
+#         order, and a 5xx or read timeout does not say it was not
+#         executed. Only connection failures (nothing sent) are
+#         retried for them; mes_orders reconciles the rest
+#       - identical GETs coalesced: a request already in flight is
+#         joined, not sent again, and /candles answers are reused
+#         for the rest of the cycle (the active mes_deadline) — no
+#         duplicate request within a cycle. Reused answers are kept
+#         per cycle and dropped with it, so overlapping cycles (two
+#         threads) never clear each other's
+#   • open_session(): plain pooled session for the other endpoints
+#     (Telegram) — no bare requests.post
+#
+# Design goals:
+#   • Still a requests.Session: callers, mes_metrics.instrument()
+#     and mes_deadline.guard() see the same API
+#   • Coalesced answers are copies marked `coalesced`, so the tracer
+#     counts them apart from requests actually sent
+#   • Streams (stream=True), POST and PUT are never coalesced
+#   • MES_HTTP_COALESCE=OFF sends every request
+# ============================================================
+
+import copy
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import mes_deadline
+from mes_deadline import DeadlineRetry, guard
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+POOL_SIZE = int(os.getenv("MES_HTTP_POOL", "16"))
+COALESCE = os.getenv("MES_HTTP_COALESCE", "ON").upper() != "OFF"
+
+# GET answers reused for the rest of a cycle (market data of the close)
+CYCLE_REUSE = ("/candles",)
+
+
+def retry_policy() -> DeadlineRetry:
+    """Read / status retries for GET only — orders are never re-sent."""
+    return DeadlineRetry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods={"GET"},
+        raise_on_status=False,
+    )
+
+
+class _Call:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[requests.Response] = None
+        self.error: Optional[BaseException] = None
+
+
+# ============================================================
+# OANDA CLIENT
+# ============================================================
+class Coalescer:
+    """In-flight calls and reusable answers of one token, shared by its clients."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, _Call] = {}
+        # cycle (mes_deadline.Deadline) → url → answer; gone with the cycle
+        self.reuse: "weakref.WeakKeyDictionary[mes_deadline.Deadline, Dict[str, requests.Response]]" = \
+            weakref.WeakKeyDictionary()
+        self.sent = 0
+        self.joined = 0
+
+
+class OandaClient(requests.Session):
+    def __init__(self, token: str, adapter: HTTPAdapter, shared: Coalescer,
+                 coalesce: bool = COALESCE):
+        super().__init__()
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        self.coalesce = coalesce
+        self.shared = shared
+
+    @staticmethod
+    def _joined(r: requests.Response) -> requests.Response:
+        r = copy.copy(r)
+        r.coalesced = True
+        return r
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if not self.coalesce or request.method != "GET" or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+        sh, key = self.shared, request.url
+        cycle = mes_deadline.current()          # no cycle (stream, tools) → no reuse
+        with sh.lock:
+            r = sh.reuse.get(cycle, {}).get(key) if cycle is not None else None
+            if r is None:
+                call = sh.inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = sh.inflight[key] = _Call()
+            else:
+                sh.joined += 1
+        if r is not None:
+            return self._joined(r)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            with sh.lock:
+                sh.joined += 1
+            return self._joined(call.response)
+
+        try:
+            call.response = super().send(request, **kwargs)
+            call.response.content                # read before followers share it
+            with sh.lock:
+                sh.sent += 1
+                path = request.path_url.split("?")[0]
+                if cycle is not None and call.response.ok and path.endswith(CYCLE_REUSE):
+                    sh.reuse.setdefault(cycle, {})[key] = call.response
+            return call.response
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with sh.lock:
+                sh.inflight.pop(key, None)
+            call.done.set()
+
+    def summary(self) -> str:
+        return f"{self.shared.sent} sent / {self.shared.joined} coalesced"
+
+
+_adapter: Optional[HTTPAdapter] = None
+_shared: Dict[str, Coalescer] = {}
+_lock = threading.Lock()
+
+
+def open_client(token: str) -> OandaClient:
+    """
+    A session for one module (its own tracer / deadline wrappers) on
+    the process's connection pool; clients of the same token share
+    in-flight calls and the cycle's /candles answers.
+    """
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE,
+                                   max_retries=retry_policy())
+        shared = _shared.setdefault(token, Coalescer())
+    return guard(OandaClient(token, _adapter, shared))
+
+
+# ============================================================
+# OTHER ENDPOINTS
+# ============================================================
+_session: Optional[requests.Session] = None
+
+
+def open_session() -> requests.Session:
+    """Shared pooled session with the same retry policy (Telegram, ...)."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=4, max_retries=retry_policy())
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
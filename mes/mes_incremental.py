@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_incremental.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Streaming form of the mes_indicators snapshot.
+#   Every indicator is a small recurrence updated once per new bar:
+#     • ATR       — running sum over a ring buffer of high-low ranges
+#                   (MES ATR is the simple 14-bar mean)
+#     • ATR delta — ring buffer of the last n+1 ATR values
+#     • EMA       — adjust=False recurrence (pandas .ewm)
+#     • RSI       — Wilder averages (EMA α = 1/n) of gains / losses
+#     • MACD      — fast / slow EMA of close, signal EMA of the line
+#   State per (instrument, granularity) is persisted between the
+#   oneshot runs, so a cycle fetches only the bars closed since the
+#   last one instead of the full warm-up window.
+#
+# Design goals:
+#   • Same values as the batch mes_indicators / pandas calculation
+#     (rolling sums re-added exactly each time the ring wraps, EMA
+#     in pandas' (1-α)·y + α·x form)
+#   • update(frame) is idempotent: bars at or before the state's last
+#     bar are skipped; a frame that does not reach back to it (gap,
+#     first run, MES_INCREMENTAL=OFF) re-seeds from the frame;
+#     continues() tells the caller beforehand, so a short frame
+#     fetched for an incremental update is refetched in full first
+#   • Compact JSON state (a few floats + two short rings per pair),
+#     flock + merge on save like mes_htf_cache
+# ============================================================
+
+import fcntl
+import json
+import logging
+import math
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import mes_indicators as mi
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+# MES_INCREMENTAL=OFF re-seeds from the fetched frame every cycle
+ENABLED = os.getenv("MES_INCREMENTAL", "ON").upper() != "OFF"
+
+GRANULARITY_SECONDS: Dict[str, int] = {"M1": 60, "M5": 300, "M15": 900, "H1": 3600, "H4": 14400}
+
+NAN = float("nan")
+
+
+def utc_now() -> datetime:
+    """State clock — replaced by the replay tools with the simulated time."""
+    return datetime.now(timezone.utc)
+
+
+# ============================================================
+# RECURRENCES (one float update per bar)
+# ============================================================
+class EMA:
+    """pandas .ewm(alpha=alpha, adjust=False).mean(), seeded by the first value."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, alpha: float, value: Optional[float] = None):
+        self.alpha = alpha
+        self.value = value
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+    def state(self) -> Optional[float]:
+        return self.value
+
+
+class Ring:
+    """Fixed-size window with a running sum; the sum is re-added on every wrap."""
+
+    __slots__ = ("n", "buf", "i", "count", "total")
+
+    def __init__(self, n: int, buf: Optional[List[float]] = None, i: int = 0, count: int = 0):
+        self.n = n
+        self.buf = list(buf) if buf else [0.0] * n
+        self.i = i
+        self.count = count
+        self.total = math.fsum(self.buf[:count] if count < n else self.buf)
+
+    def push(self, x: float) -> float:
+        """Append x; returns the value that fell out of the window (NaN if none)."""
+        out = self.buf[self.i] if self.count == self.n else NAN
+        self.buf[self.i] = x
+        self.i = (self.i + 1) % self.n
+        if self.count < self.n:
+            self.count += 1
+            self.total += x
+        elif self.i == 0:
+            self.total = math.fsum(self.buf)       # no drift across wraps
+        else:
+            self.total += x - out
+        return out
+
+    def mean(self) -> float:
+        return self.total / self.n if self.count == self.n else NAN
+
+    def oldest(self) -> float:
+        return self.buf[self.i] if self.count == self.n else NAN
+
+    def state(self) -> dict:
+        return {"buf": self.buf, "i": self.i, "count": self.count}
+
+
+class ATR:
+    """MES ATR (simple mean of high-low) plus the value n bars earlier."""
+
+    def __init__(self, n: int = mi.ATR_PERIOD, state: Optional[dict] = None):
+        self.n = n
+        state = state or {}
+        self.ranges = Ring(n, **state.get("ranges", {}))
+        self.history = Ring(n + 1, **state.get("history", {}))
+
+    def update(self, high: float, low: float) -> float:
+        self.ranges.push(high - low)
+        a = self.ranges.mean()
+        self.history.push(a)
+        return a
+
+    @property
+    def value(self) -> float:
+        return self.ranges.mean()
+
+    @property
+    def delta(self) -> float:
+        return self.value - self.history.oldest()
+
+    def state(self) -> dict:
+        return {"ranges": self.ranges.state(), "history": self.history.state()}
+
+
+class RSI:
+    """Wilder RSI — mes_indicators.rsi() one bar at a time."""
+
+    def __init__(self, n: int = mi.RSI_PERIOD, state: Optional[dict] = None):
+        state = state or {}
+        self.prev = state.get("prev")
+        self.gain = EMA(1.0 / n, state.get("gain"))
+        self.loss = EMA(1.0 / n, state.get("loss"))
+
+    def update(self, close: float) -> float:
+        if self.prev is not None:
+            d = close - self.prev
+            self.gain.update(max(d, 0.0))
+            self.loss.update(max(-d, 0.0))
+        self.prev = close
+        return self.value
+
+    @property
+    def value(self) -> float:
+        ag, al = self.gain.value, self.loss.value
+        if ag is None:
+            return NAN
+        if al == 0:
+            return 100.0 if ag > 0 else NAN
+        return 100.0 - 100.0 / (1.0 + ag / al)
+
+    def state(self) -> dict:
+        return {"prev": self.prev, "gain": self.gain.state(), "loss": self.loss.state()}
+
+
+class MACD:
+    def __init__(self, fast: int = mi.MACD_FAST, slow: int = mi.MACD_SLOW,
+                 signal: int = mi.MACD_SIGNAL, state: Optional[dict] = None):
+        state = state or {}
+        self.fast = EMA(2.0 / (fast + 1), state.get("fast"))
+        self.slow = EMA(2.0 / (slow + 1), state.get("slow"))
+        self.signal = EMA(2.0 / (signal + 1), state.get("signal"))
+
+    def update(self, close: float):
+        line = self.fast.update(close) - self.slow.update(close)
+        sig = self.signal.update(line)
+        return line, sig, line - sig
+
+    def state(self) -> dict:
+        return {"fast": self.fast.state(), "slow": self.slow.state(),
+                "signal": self.signal.state()}
+
+
+# ============================================================
+# PER-INSTRUMENT BUNDLE (mes_indicators.snapshot fields)
+# ============================================================
+class BarIndicators:
+    def __init__(self, atr_period: int = mi.ATR_PERIOD, state: Optional[dict] = None):
+        state = state or {}
+        self.atr_period = atr_period
+        self.atr = ATR(atr_period, state.get("atr"))
+        self.rsi = RSI(mi.RSI_PERIOD, state.get("rsi"))
+        self.macd = MACD(state=state.get("macd"))
+        self.last_time: Optional[str] = state.get("last_time")
+        self.bars = state.get("bars", 0)
+        self.last_bar = state.get("last_bar")          # [o, h, l, c]
+
+    def update(self, t: str, o: float, h: float, l: float, c: float):
+        self.atr.update(h, l)
+        self.rsi.update(c)
+        self.macd.update(c)
+        self.last_time = t
+        self.last_bar = [o, h, l, c]
+        self.bars += 1
+
+    def snapshot(self) -> dict:
+        o, h, l, c = self.last_bar
+        rng = h - l
+        a = self.atr.value
+        line = self.macd.fast.value - self.macd.slow.value
+        sig = self.macd.signal.value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            strong = np.float64(abs(c - o)) / a
+        d = self.atr.delta
+        return {
+            "atr_current": mi._num(a),
+            "atr_delta": mi._num(d),
+            "atr_trend": "unknown" if np.isnan(d) else "rising" if d > 0 else "falling" if d < 0 else "flat",
+            "macd_fast": mi._num(line),
+            "macd_slow": mi._num(sig),
+            "macd_sep": mi._num(line - sig),
+            "rsi": mi._num(self.rsi.value),
+            "body_ratio": abs(c - o) / rng if rng > 0 else 0.0,
+            "strong_body_ratio": mi._num(strong),
+            "candle_structure": mi.structure_name(np.sign(c - o)),
+        }
+
+    def state(self) -> dict:
+        return {"last_time": self.last_time, "bars": self.bars, "last_bar": self.last_bar,
+                "atr": self.atr.state(), "rsi": self.rsi.state(), "macd": self.macd.state()}
+
+
+# ============================================================
+# PERSISTED STATE (one file per MODE + granularity)
+# ============================================================
+class IndicatorState:
+    def __init__(self, path: Path, tf: str, atr_period: int = mi.ATR_PERIOD,
+                 enabled: bool = ENABLED):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.tf = tf
+        self.atr_period = atr_period
+        self.enabled = enabled
+        self.entries: Dict[str, dict] = self._read() if enabled else {}
+        self.dirty: Dict[str, dict] = {}
+        self.updated = 0                # bars applied incrementally
+        self.seeded = 0                 # bars replayed on (re-)seed
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text())
+        except Exception:
+            return {}
+
+    def bars_needed(self, inst: str, cap: int, now: Optional[datetime] = None) -> int:
+        """
+        Complete bars to fetch so the frame still contains the state's
+        last bar (≥ 2); cap when there is no state or it is too old.
+        """
+        e = self.entries.get(inst)
+        if not self.enabled or not e or e.get("atr_period") != self.atr_period:
+            return cap
+        step = GRANULARITY_SECONDS[self.tf]
+        now_s = int((now or utc_now()).timestamp()) // step * step
+        last = int(datetime.fromisoformat(e["last_time"]).timestamp())
+        if now_s <= last:               # state from a later clock (replay scratch)
+            return cap
+        return max(2, min(cap, (now_s - last) // step))
+
+    def continues(self, inst: str, df: pd.DataFrame) -> bool:
+        """True if update(inst, df) applies df incrementally (no re-seed)."""
+        e = self.entries.get(inst)
+        if not (self.enabled and e and e.get("atr_period") == self.atr_period):
+            return False
+        return e["last_time"] in {t.isoformat() for t in df.index}
+
+    def update(self, inst: str, df: pd.DataFrame) -> dict:
+        """Apply df's bars after the stored one (re-seed if df does not reach it)."""
+        e = self.entries.get(inst)
+        keys = [t.isoformat() for t in df.index]
+        if self.continues(inst, df):
+            ind = BarIndicators(self.atr_period, e)
+            start = keys.index(e["last_time"]) + 1
+            self.updated += len(df) - start
+        else:
+            ind = BarIndicators(self.atr_period)
+            start = 0
+            self.seeded += len(df)
+        v = df[["open", "high", "low", "close"]].to_numpy(dtype=float)
+        for k in range(start, len(df)):
+            ind.update(keys[k], *v[k].tolist())
+        if self.enabled:
+            st = {**ind.state(), "atr_period": self.atr_period}
+            self.entries[inst] = st
+            self.dirty[inst] = st
+        return ind.snapshot()
+
+    def save(self):
+        """Merge our updates into the file under an exclusive lock (newest bar wins)."""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                merged = self._read()
+                for inst, st in self.dirty.items():
+                    old = merged.get(inst)
+                    if old is None or old["last_time"] <= st["last_time"]:
+                        merged[inst] = st
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(merged, separators=(",", ":"), sort_keys=True))
+                os.replace(tmp, self.path)
+                fcntl.flock(lf, fcntl.LOCK_UN)
+            self.dirty.clear()
+        except Exception as e:
+            logging.warning(f"Indicator state save failed: {e}")
+
+
+def open_state(mode: str, tf: str, atr_period: int = mi.ATR_PERIOD,
+               state_dir: Path = STATE_DIR) -> IndicatorState:
+    """One file per MODE and granularity — DEMO and LIVE feeds are kept apart."""
+    return IndicatorState(Path(state_dir) / f"indicators_{mode.lower()}_{tf}.json", tf, atr_period)
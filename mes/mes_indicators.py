@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_indicators.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Multi-instrument indicator engine for MES.
+#   Stacks every instrument's candles into one (instruments × bars)
+#   NumPy panel and computes ATR, body ratio, structure, RSI and
+#   MACD for all instruments in single vectorized passes — the
+#   fields the dashboard /4 diagnostics page renders.
+#
+# Design goals:
+#   • Right-aligned panel: column -1 is each instrument's latest
+#     complete bar, shorter histories are NaN-padded on the left.
+#     Rolling windows therefore see exactly the bars a per-frame
+#     pandas .rolling() would — no cross-instrument gap filling.
+#   • Recursive indicators (EMA / Wilder) loop over TIME only,
+#     each step vectorized across all instruments
+#   • Pure functions, no network, no globals
+# ============================================================
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+FIELDS = ("open", "high", "low", "close")
+EWM_BLOCK = 64
+
+
+# ============================================================
+# PANEL
+# ============================================================
+@dataclass
+class Panel:
+    instruments: List[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    last_time: List[Optional[pd.Timestamp]]
+
+    def row(self, inst: str) -> int:
+        return self.instruments.index(inst)
+
+
+def stack(frames: Dict[str, pd.DataFrame], bars: Optional[int] = None) -> Panel:
+    """
+    Build a right-aligned panel from {instrument: candle frame}.
+    bars limits the panel width (defaults to the longest frame).
+    """
+    insts = list(frames)
+    width = bars or max((len(df) for df in frames.values()), default=0)
+    arrays = {f: np.full((len(insts), width), np.nan) for f in FIELDS}
+    last_time: List[Optional[pd.Timestamp]] = []
+
+    for i, inst in enumerate(insts):
+        df = frames[inst].tail(width)
+        n = len(df)
+        for f in FIELDS:
+            if n:
+                arrays[f][i, width - n:] = df[f].to_numpy(dtype=float)
+        last_time.append(df.index[-1] if n else None)
+
+    return Panel(insts, arrays["open"], arrays["high"], arrays["low"],
+                 arrays["close"], last_time)
+
+
+# ============================================================
+# VECTORIZED PRIMITIVES (axis 1 = time)
+# ============================================================
+def rolling_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """NaN unless the full n-bar window is present (pandas min_periods=n)."""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    ccnt = np.cumsum(valid, axis=1)
+    out = np.full_like(x, np.nan)
+    if x.shape[1] < n:
+        return out
+    s = csum[:, n - 1:].copy()
+    c = ccnt[:, n - 1:].copy()
+    s[:, 1:] -= csum[:, :-n]
+    c[:, 1:] -= ccnt[:, :-n]
+    out[:, n - 1:] = np.where(c == n, s / n, np.nan)
+    return out
+
+
+def last_window_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """Mean of the final n bars per row (NaN if any is missing)."""
+    if x.shape[1] < n:
+        return np.full(x.shape[0], np.nan)
+    return x[:, -n:].mean(axis=1)
+
+
+def ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    pandas .ewm(alpha=alpha, adjust=False).mean() per row.
+
+    Each row starts at its first non-NaN value (panels only carry
+    leading NaN). The recurrence is evaluated in blocks of
+    EWM_BLOCK bars: inside a block it is one matrix product with a
+    lower-triangular decay kernel, so the Python loop runs
+    T / EWM_BLOCK times instead of T.
+    """
+    n_rows, n_t = x.shape
+    if n_t == 0:
+        return x.copy()
+    valid = ~np.isnan(x)
+    has = valid.any(axis=1)
+    starts = np.where(has, valid.argmax(axis=1), n_t)
+    first = np.where(has, x[np.arange(n_rows), np.minimum(starts, n_t - 1)], 0.0)
+
+    # Back-filling the leading gap with the first value makes the
+    # recurrence land exactly on x[start] at t = start.
+    lead = np.arange(n_t)[None, :] < starts[:, None]
+    xf = np.where(lead, first[:, None], x)
+
+    keep = 1.0 - alpha
+    size = min(EWM_BLOCK, n_t)
+    j = np.arange(size)
+    lag = j[:, None] - j[None, :]
+    kernel = np.where(lag >= 0, alpha * keep ** np.maximum(lag, 0), 0.0)
+    carry = keep ** (j + 1)
+
+    out = np.empty_like(x)
+    prev = first.copy()
+    for s in range(0, n_t, size):
+        blk = xf[:, s:s + size]
+        m = blk.shape[1]
+        y = blk @ kernel[:m, :m].T + prev[:, None] * carry[None, :m]
+        out[:, s:s + m] = y
+        prev = y[:, -1]
+    out[lead] = np.nan
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    return ewm(x, 2.0 / (span + 1))
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    d = np.full_like(x, np.nan)
+    d[:, 1:] = x[:, 1:] - x[:, :-1]
+    return d
+
+
+# ============================================================
+# INDICATORS
+# ============================================================
+def atr(p: Panel, n: int = ATR_PERIOD) -> np.ndarray:
+    """MES ATR: simple rolling mean of the high-low range."""
+    return rolling_mean(p.high - p.low, n)
+
+
+def atr_last(p: Panel, n: int = ATR_PERIOD) -> np.ndarray:
+    """Current ATR only — the value scalp decisions compare against."""
+    return last_window_mean(p.high - p.low, n)
+
+
+def body(p: Panel) -> np.ndarray:
+    return np.abs(p.close - p.open)
+
+
+def body_ratio(p: Panel) -> np.ndarray:
+    rng = p.high - p.low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rng > 0, body(p) / rng, 0.0)
+
+
+def structure(p: Panel) -> np.ndarray:
+    """+1 bullish (close > open), -1 bearish, 0 flat — per bar."""
+    return np.sign(p.close - p.open)
+
+
+def rsi(p: Panel, n: int = RSI_PERIOD) -> np.ndarray:
+    d = diff(p.close)
+    gain = np.where(np.isnan(d), np.nan, np.clip(d, 0, None))
+    loss = np.where(np.isnan(d), np.nan, np.clip(-d, 0, None))
+    ag = ewm(gain, 1.0 / n)
+    al = ewm(loss, 1.0 / n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = ag / al
+        out = 100.0 - 100.0 / (1.0 + rs)
+    return np.where((al == 0) & (ag > 0), 100.0, out)
+
+
+def macd(p: Panel, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+         signal: int = MACD_SIGNAL):
+    line = ema(p.close, fast) - ema(p.close, slow)
+    sig = ema(line, signal)
+    return line, sig, line - sig
+
+
+STRUCTURE_NAMES = {1.0: "bullish", -1.0: "bearish", 0.0: "flat"}
+
+
+def structure_name(v: float) -> str:
+    return STRUCTURE_NAMES.get(float(v), "flat")
+
+
+# ============================================================
+# DIAGNOSTIC SNAPSHOT (dashboard /4 field names)
+# ============================================================
+def _num(v) -> Optional[float]:
+    v = float(v)
+    return None if np.isnan(v) else v
+
+
+def snapshot(p: Panel, atr_period: int = ATR_PERIOD) -> Dict[str, dict]:
+    """
+    Latest-bar indicator values per instrument, one pass per indicator.
+    atr_delta compares the current ATR with ATR one period earlier.
+    """
+    a = atr(p, atr_period)
+    br = body_ratio(p)
+    st = structure(p)
+    r = rsi(p)
+    line, sig, hist = macd(p)
+
+    a_now = atr_last(p, atr_period)
+    a_prev = a[:, -1 - atr_period] if a.shape[1] > atr_period else np.full_like(a_now, np.nan)
+    a_delta = a_now - a_prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strong = body(p)[:, -1] / a_now
+
+    out: Dict[str, dict] = {}
+    for i, inst in enumerate(p.instruments):
+        d = a_delta[i]
+        trend = "unknown" if np.isnan(d) else "rising" if d > 0 else "falling" if d < 0 else "flat"
+        out[inst] = {
+            "atr_current": _num(a_now[i]),
+            "atr_delta": _num(d),
+            "atr_trend": trend,
+            "macd_fast": _num(line[i, -1]),
+            "macd_slow": _num(sig[i, -1]),
+            "macd_sep": _num(hist[i, -1]),
+            "rsi": _num(r[i, -1]),
+            "body_ratio": _num(br[i, -1]),
+            "strong_body_ratio": _num(strong[i]),
+            "candle_structure": structure_name(st[i, -1]) if not np.isnan(st[i, -1]) else "unknown",
+        }
+    return out
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_instruments.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Daily cache of OANDA instrument metadata and currency
+#   conversions for sizing:
+#     • /instruments      → pipLocation, marginRate, trade size limits
+#     • /pricing?includeHomeConversions=true → quote → home currency
+#     • /summary          → account home currency
+#   Refreshed at most once per TTL_S (three requests a day); the
+#   conversions are kept current between refreshes from prices the
+#   cycle already has (observe()), so sizing never hits the network.
+#
+# Design goals:
+#   • One JSON file per MODE (instruments_<mode>.json), atomic replace
+#   • A failed refresh keeps the previous file; no file → conservative
+#     defaults (guessed pipLocation, DEFAULT_MARGIN_RATE)
+#   • Offline-safe: construction reads the file only
+# ============================================================
+
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+TTL_S = 24 * 3600
+DEFAULT_MARGIN_RATE = 0.05          # 20:1 — conservative when metadata is missing
+DEFAULT_HOME = "USD"
+
+
+def pip_location_guess(inst: str) -> int:
+    return -2 if inst.endswith("JPY") else -4
+
+
+class InstrumentCache:
+    def __init__(self, session, rest_url: str, account_id: str, path: Path):
+        self.session = session
+        self.base = f"{rest_url.rstrip('/')}/v3/accounts/{account_id}"
+        self.path = Path(path)
+        data = self._read()
+        self.fetched_at: float = data.get("fetched_at", 0.0)
+        self.home: str = data.get("home", DEFAULT_HOME)
+        self.instruments: Dict[str, dict] = data.get("instruments", {})
+        self.conversions: Dict[str, float] = data.get("conversions", {})
+        self.conversions[self.home] = 1.0
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except Exception:
+            return {}
+
+    # ---------------- refresh ----------------
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at >= TTL_S
+
+    def refresh(self, force: bool = False):
+        """Refetch metadata + conversions when older than TTL_S."""
+        if not force and not self.stale():
+            return
+        try:
+            r = self.session.get(f"{self.base}/summary", timeout=10)
+            r.raise_for_status()
+            home = r.json()["account"].get("currency", DEFAULT_HOME)
+
+            r = self.session.get(f"{self.base}/instruments", timeout=15)
+            r.raise_for_status()
+            instruments = {
+                i["name"]: {
+                    "type": i.get("type", "CURRENCY"),
+                    "pipLocation": int(i.get("pipLocation", pip_location_guess(i["name"]))),
+                    "displayPrecision": int(i.get("displayPrecision", 5)),
+                    "tradeUnitsPrecision": int(i.get("tradeUnitsPrecision", 0)),
+                    "minimumTradeSize": float(i.get("minimumTradeSize", 1)),
+                    "maximumOrderUnits": float(i.get("maximumOrderUnits", 1e8)),
+                    "marginRate": float(i.get("marginRate", DEFAULT_MARGIN_RATE)),
+                }
+                for i in r.json().get("instruments", [])
+            }
+
+            conversions = {home: 1.0}
+            names = [n for n, m in instruments.items() if m["type"] == "CURRENCY"]
+            if names:
+                r = self.session.get(f"{self.base}/pricing",
+                                     params={"instruments": ",".join(names),
+                                             "includeHomeConversions": "true"}, timeout=15)
+                r.raise_for_status()
+                for c in r.json().get("homeConversions", []):
+                    conversions[c["currency"]] = float(c.get("positionValue") or c["accountGain"])
+        except Exception as e:
+            logging.warning(f"[INSTRUMENTS] metadata refresh failed ({e}) — keeping cached values")
+            return
+
+        self.home, self.instruments, self.fetched_at = home, instruments, time.time()
+        self.conversions = conversions
+        self._write()
+        logging.info(f"[INSTRUMENTS] {len(instruments)} instruments, "
+                     f"{len(conversions)} currencies (home {home})")
+
+    def _write(self):
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "fetched_at": self.fetched_at, "home": self.home,
+                "instruments": self.instruments, "conversions": self.conversions,
+            }, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.warning(f"Instrument cache save failed: {e}")
+
+    # ---------------- lookups ----------------
+    def meta(self, inst: str) -> dict:
+        m = self.instruments.get(inst)
+        if m:
+            return m
+        return {"type": "CURRENCY", "pipLocation": pip_location_guess(inst),
+                "displayPrecision": 3 if inst.endswith("JPY") else 5,
+                "tradeUnitsPrecision": 0, "minimumTradeSize": 1.0,
+                "maximumOrderUnits": 1e8, "marginRate": DEFAULT_MARGIN_RATE}
+
+    def pip(self, inst: str) -> float:
+        return 10.0 ** self.meta(inst)["pipLocation"]
+
+    def observe(self, prices: Dict[str, float]):
+        """Refresh conversions from mid / close prices seen this cycle."""
+        for inst, price in prices.items():
+            if not price or not math.isfinite(price):
+                continue
+            base, quote = inst.split("_")
+            if quote == self.home:
+                self.conversions[base] = float(price)
+            elif base == self.home:
+                self.conversions[quote] = 1.0 / float(price)
+
+    def to_home(self, currency: str) -> float:
+        """Home-currency value of one unit of `currency` (nan if unknown)."""
+        return self.conversions.get(currency, math.nan)
+
+
+def open_instruments(session, rest_url: str, account_id: str, mode: str,
+                     state_dir: Path = STATE_DIR) -> InstrumentCache:
+    return InstrumentCache(session, rest_url, account_id,
+                           Path(state_dir) / f"instruments_{mode.lower()}.json")
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_ledger.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Per-strategy realized PnL from the OANDA transaction stream.
+#   sync() pulls /transactions/sinceid?id=<last> (paged, 1000 per
+#   answer), appends the new transactions to a local log and folds
+#   them into running totals, so a sync costs time proportional to
+#   the transactions since the last one — never a full export.
+#   Fills are attributed through clientExtensions:
+#     • entry order / tradeOpened tag → strategy (MES_SWING_* → swing,
+#       MES_SCALP_* → scalp, other tags as-is, none → unattributed)
+#     • comment "... vX.Y.Z ..." → strategy version
+#     • tradesClosed / tradeReduced realizedPL → the strategy that
+#       opened the trade (SL / TP and position closeouts included)
+#   Totals per strategy × instrument × entry session hour (UTC) and
+#   per strategy × version.
+#
+# Layout (one directory per account, MES_ACCOUNT_NAME):
+#   ledger/<account>/transactions.log   one JSON transaction per line
+#   ledger/<account>/transactions.idx   fixed 28-byte records in id order:
+#                                       (id, epoch, offset, length)
+#   ledger/<account>/ledger.json        last id, open trades, totals
+#
+# Design goals:
+#   • Crash safe: log before index before totals; a transaction the
+#     log already holds is not appended twice, a transaction the
+#     totals do not hold yet is applied on the next sync
+#   • Lookup by id or time by bisect over the index
+#   • Totals file bounded by strategies × instruments × 24 hours plus
+#     the trades still open
+#   • flock per account directory, like mes_account
+#
+# Known limits:
+#   • DAILY_FINANCING is logged but not attributed (position level)
+#   • Trades opened before the first sync are "unattributed"
+#
+# Usage:
+#   mes_ledger.py sync   [--account demo]        # uses OANDA_* env
+#   mes_ledger.py report [--account demo] [--by hour|version]
+# ============================================================
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+INDEX = struct.Struct("<QdQI")          # transaction id, epoch, offset, length
+PAGE_LIMIT = 50                         # pages (1000 transactions) per sync
+
+STRATEGY_TAGS = {"MES_SWING": "swing", "MES_SCALP": "scalp"}
+_VERSION = re.compile(r"\bv(\d+\.\d+\.\d+)\b")
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_time(s: str) -> datetime:
+    """OANDA RFC3339 (nanoseconds, Z) → aware datetime."""
+    return datetime.fromisoformat(_FRACTION.sub(r"\1", s).replace("Z", "+00:00"))
+
+
+def attribute(ext: Optional[dict]) -> Tuple[str, str]:
+    """(strategy, version) from an order / trade clientExtensions."""
+    if not ext or not ext.get("tag"):
+        return "unattributed", ""
+    tag = ext["tag"]
+    strategy = next((s for prefix, s in STRATEGY_TAGS.items() if tag.startswith(prefix)),
+                    tag.lower())
+    m = _VERSION.search(ext.get("comment", "") or "")
+    return strategy, m.group(1) if m else ""
+
+
+# ============================================================
+# TRANSACTION LOG (append-only, indexed by id)
+# ============================================================
+class TransactionLog:
+    def __init__(self, root: Path):
+        self.log = root / "transactions.log"
+        self.idx = root / "transactions.idx"
+
+    def index(self) -> List[Tuple[int, float, int, int]]:
+        try:
+            raw = self.idx.read_bytes()
+        except FileNotFoundError:
+            return []
+        raw = raw[: len(raw) - len(raw) % INDEX.size]      # torn tail ignored
+        return list(INDEX.iter_unpack(raw))
+
+    def last_id(self) -> int:
+        try:
+            size = self.idx.stat().st_size
+        except FileNotFoundError:
+            return 0
+        size -= size % INDEX.size
+        if not size:
+            return 0
+        with open(self.idx, "rb") as f:
+            f.seek(size - INDEX.size)
+            return INDEX.unpack(f.read(INDEX.size))[0]
+
+    def append(self, txns: List[dict]) -> int:
+        """Append transactions newer than the log; returns how many were written."""
+        last = self.last_id()
+        new = [t for t in txns if int(t["id"]) > last]
+        if not new:
+            return 0
+        with open(self.log, "ab") as lf:
+            offset = lf.tell()
+            recs = []
+            for t in new:
+                line = json.dumps(t, separators=(",", ":")).encode() + b"\n"
+                lf.write(line)
+                recs.append(INDEX.pack(int(t["id"]), parse_time(t["time"]).timestamp(),
+                                       offset, len(line)))
+                offset += len(line)
+            lf.flush()
+            os.fsync(lf.fileno())
+        with open(self.idx, "ab") as xf:
+            xf.write(b"".join(recs))
+        return len(new)
+
+    def _read(self, recs) -> Iterator[dict]:
+        with open(self.log, "rb") as f:
+            for _, _, off, n in recs:
+                f.seek(off)
+                yield json.loads(f.read(n))
+
+    def since(self, txn_id: int = 0) -> Iterator[dict]:
+        index = self.index()
+        return self._read(index[bisect_right([r[0] for r in index], txn_id):])
+
+    def between(self, start: datetime, end: datetime) -> Iterator[dict]:
+        # ids and times rise together — bisect the time column
+        index = self.index()
+        times = [r[1] for r in index]
+        return self._read(index[bisect_left(times, start.timestamp()):
+                                bisect_right(times, end.timestamp())])
+
+
+# ============================================================
+# LEDGER (running totals)
+# ============================================================
+def _bucket(d: dict, *keys) -> dict:
+    for k in keys:
+        d = d.setdefault(k, {})
+    if not d:
+        d.update({"realized": 0.0, "financing": 0.0, "closes": 0, "wins": 0})
+    return d
+
+
+class Ledger:
+    def __init__(self, session, rest_url: str, account_id: str, root: Path):
+        self.session = session
+        self.account_id = account_id
+        self.base = f"{rest_url.rstrip('/')}/v3/accounts/{account_id}"
+        self.root = Path(root)
+        self.path = self.root / "ledger.json"
+        self.lock_path = self.root / "ledger.lock"
+        self.log = TransactionLog(self.root)
+        self.state = self._read()
+        self.fetched = 0
+
+    def _read(self) -> dict:
+        try:
+            state = json.loads(self.path.read_text())
+        except Exception:
+            state = {}
+        if self.account_id and state.get("account_id") not in (None, self.account_id):
+            logging.warning(f"[LEDGER] account switched from {state['account_id']} — totals restart")
+            state = {}
+        state.setdefault("account_id", self.account_id)
+        state.setdefault("last_txn", "0")
+        for k in ("orders", "trades", "pnl", "versions"):
+            state.setdefault(k, {})
+        return state
+
+    # ---------------- OANDA ----------------
+    def _fetch(self, since: str) -> List[dict]:
+        out: List[dict] = []
+        for _ in range(PAGE_LIMIT):
+            r = self.session.get(f"{self.base}/transactions/sinceid",
+                                 params={"id": since}, timeout=15)
+            r.raise_for_status()
+            body = r.json()
+            page = body.get("transactions", [])
+            out.extend(page)
+            if not page or int(page[-1]["id"]) >= int(body.get("lastTransactionID", 0)):
+                break
+            since = page[-1]["id"]
+        self.fetched = len(out)
+        return out
+
+    # ---------------- folding ----------------
+    def _close(self, trade_id: str, units: str, pl: str, financing: str, when: str,
+               closed: bool):
+        st = self.state
+        trade = st["trades"].get(trade_id) or {"strategy": "unattributed", "version": "",
+                                               "instrument": "?", "hour": parse_time(when).hour}
+        b = _bucket(st["pnl"], trade["strategy"], trade["instrument"], str(trade["hour"]))
+        v = _bucket(st["versions"], trade["strategy"], trade["version"] or "?")
+        for agg in (b, v):
+            agg["realized"] += float(pl or 0)
+            agg["financing"] += float(financing or 0)
+            if closed:
+                agg["closes"] += 1
+                agg["wins"] += float(pl or 0) > 0
+        if closed:
+            st["trades"].pop(trade_id, None)
+        elif trade_id in st["trades"]:
+            st["trades"][trade_id]["units"] = str(float(trade["units"]) + float(units))
+
+    def apply(self, t: dict):
+        st = self.state
+        kind = t.get("type", "")
+        if kind.endswith("_ORDER") and t.get("clientExtensions"):
+            st["orders"][t["id"]] = t["clientExtensions"]
+        elif kind in ("ORDER_CANCEL", "ORDER_FILL"):
+            ext = st["orders"].pop(t.get("orderID", ""), None)
+            if kind == "ORDER_CANCEL":
+                return
+            opened = t.get("tradeOpened")
+            if opened:
+                strategy, version = attribute(opened.get("clientExtensions")
+                                              or t.get("clientExtensions") or ext)
+                st["trades"][opened["tradeID"]] = {
+                    "strategy": strategy, "version": version, "instrument": t["instrument"],
+                    "units": opened.get("units", t.get("units", "0")),
+                    "hour": parse_time(t["time"]).hour,
+                }
+            for c in t.get("tradesClosed", []) or []:
+                self._close(c["tradeID"], c.get("units", "0"), c.get("realizedPL"),
+                            c.get("financing"), t["time"], True)
+            red = t.get("tradeReduced")
+            if red:
+                self._close(red["tradeID"], red.get("units", "0"), red.get("realizedPL"),
+                            red.get("financing"), t["time"], False)
+        st["last_txn"] = t["id"]
+
+    # ---------------- sync ----------------
+    def sync(self) -> int:
+        """Fetch and fold every transaction after the last one; returns the count."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                self.state = self._read()
+                txns = self._fetch(self.state["last_txn"])
+                self.log.append(txns)
+                for t in txns:
+                    if int(t["id"]) > int(self.state["last_txn"]):
+                        self.apply(t)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self.state, separators=(",", ":"), sort_keys=True))
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+        return len(txns)
+
+    # ---------------- views ----------------
+    def rows(self, by: str = "hour") -> List[dict]:
+        """Totals as flat rows: strategy × instrument × hour, or strategy × version."""
+        out = []
+        if by == "version":
+            for s, vs in self.state["versions"].items():
+                for v, b in vs.items():
+                    out.append({"strategy": s, "version": v, **b})
+        else:
+            for s, insts in self.state["pnl"].items():
+                for inst, hours in insts.items():
+                    for h, b in hours.items():
+                        out.append({"strategy": s, "instrument": inst, "hour": int(h), **b})
+        return out
+
+    def totals(self) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        for r in self.rows():
+            t = _bucket(out, r["strategy"])
+            for k in ("realized", "financing", "closes", "wins"):
+                t[k] += r[k]
+        for s, t in out.items():
+            t["open"] = sum(1 for tr in self.state["trades"].values() if tr["strategy"] == s)
+        return out
+
+
+def open_ledger(session, rest_url: str, account_id: str, account: str,
+                state_dir: Path = STATE_DIR) -> Ledger:
+    return Ledger(session, rest_url, account_id, Path(state_dir) / "ledger" / account.lower())
+
+
+def summarize(root: Path) -> List[str]:
+    """Status lines from a ledger.json without any request (mes-run status)."""
+    led = Ledger(None, "", "", root)
+    if not led.path.exists():
+        return []
+    lines = []
+    for s, t in sorted(led.totals().items()):
+        rate = f"{t['wins'] / t['closes']:.0%}" if t["closes"] else "n/a"
+        lines.append(f"{s:<13} realized {t['realized']:>10.2f}  financing {t['financing']:>8.2f}  "
+                     f"closes {t['closes']:>4}  win {rate:>4}  open {t['open']}")
+    return lines
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES transaction sync + per-strategy PnL ledger")
+    ap.add_argument("command", choices=["sync", "report"])
+    ap.add_argument("--account", default=os.getenv("MES_ACCOUNT_NAME", ""),
+                    help="state key (default MES_ACCOUNT_NAME, else the MODE)")
+    ap.add_argument("--by", choices=["hour", "version"], default="hour")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    url = os.getenv("OANDA_API_URL", "").rstrip("/")
+    name = args.account or ("LIVE" if "fxtrade" in url else "DEMO")
+    if args.command == "sync":
+        from mes_http import open_client
+        led = open_ledger(open_client(os.getenv("OANDA_API_TOKEN", "")), url,
+                          os.getenv("OANDA_ACCOUNT_ID", ""), name)
+        n = led.sync()
+        print(f"{n} new transactions (last {led.state['last_txn']})")
+    else:
+        led = Ledger(None, "", "", STATE_DIR / "ledger" / name.lower())
+    for line in summarize(led.root):
+        print(line)
+    if args.command == "report":
+        key = "version" if args.by == "version" else "hour"
+        for r in sorted(led.rows(args.by), key=lambda r: (r["strategy"], r.get("instrument", ""), r[key])):
+            where = r["version"] if args.by == "version" else f"{r['instrument']:<8} {r['hour']:02d}h"
+            print(f"  {r['strategy']:<13} {where:<14} {r['realized']:>10.2f}  "
+                  f"closes {r['closes']:>4}  wins {int(r['wins']):>4}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_load.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Load harness for the MES cycle against the local v20 stand-in
+#   (mes_standin.py). Imports the real mes_scalp.py / mes_swing.py
+#   with OANDA_API_URL pointed at the stand-in, widens INSTRUMENTS
+#   to 7 / 70 / 200 pairs and times cold (empty HTF memo) and warm
+#   cycles, so request volume, 429 / retry behavior and wall time
+#   can be read off before the universe grows in production.
+#
+# Design goals:
+#   • Strategy code runs unmodified — only INSTRUMENTS is widened
+#   • Server-side counts (every attempt, 429s) next to client-side
+#     spans (mes_metrics), so retries show up as the difference
+#   • A size that fails or exceeds --budget-s marks the scaling limit
+#
+# Usage:
+#   mes_load.py scalp --sizes 7 70 200 --latency-ms 40 --rps 100
+#   mes_load.py swing --sizes 8 70 --p429 0.02 --json load.json
+#   mes_load.py scalp --sizes 7 70 200 --prefilter
+# ============================================================
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+MES_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(MES_DIR))
+
+import mes_standin
+from mes_replay import replay_env
+
+ENTRY = {"scalp": "main_cycle", "swing": "main"}
+
+
+def import_strategy(path: Path, url: str, account: str, prefilter: bool = False):
+    """Fresh module object wired to the stand-in; state in a scratch HOME."""
+    scratch = Path(tempfile.mkdtemp(prefix="mes_load_"))
+    (scratch / "leo-services" / "mes").mkdir(parents=True)
+    env = replay_env(scratch)
+    env.update({"OANDA_API_URL": url, "OANDA_ACCOUNT_ID": account,
+                "MES_STATE_DIR": str(scratch / "leo-services" / "mes"),
+                "MES_SCALP_PREFILTER": "ON" if prefilter else "OFF",
+                "MES_SWING_PREFILTER": "ON" if prefilter else "OFF"})
+    os.environ.update(env)
+    spec = importlib.util.spec_from_file_location(f"load_{path.stem}", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    logging.getLogger().setLevel(logging.WARNING)
+    return mod
+
+
+def server_stats(base: str) -> dict:
+    root = base.split("/fxpractice")[0]
+    return requests.get(f"{root}/__stats", timeout=5).json()
+
+
+def reset_stats(base: str):
+    root = base.split("/fxpractice")[0]
+    requests.post(f"{root}/__reset", timeout=5)
+
+
+def run_cycle(mod, name: str, base: str) -> dict:
+    reset_stats(base)
+    t0 = time.perf_counter()
+    error = ""
+    try:
+        getattr(mod, ENTRY[name])()
+    except BaseException as e:          # SystemExit included — a cycle never ends the harness
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - t0
+    stats = server_stats(base)
+    client = [ms for k, ms in mod.tracer.cycle if k.startswith("http/")]
+    return {
+        "seconds": round(wall, 3),
+        "requests": len(client),
+        "served": stats["requests"],
+        "throttled": stats["throttled"],
+        "kib": round(stats.get("bytes", 0) / 1024, 1),
+        "retries": max(0, stats["requests"] - len(client)),
+        "max_inflight": stats["max_inflight"],
+        "slowest_ms": round(max(client), 1) if client else 0.0,
+        "error": error,
+    }
+
+
+def load_test(name: str, path: Path, base: str, account: str,
+              sizes: List[int], cycles: int, prefilter: bool = False) -> Dict[int, List[dict]]:
+    mod = import_strategy(path, base, account, prefilter)
+    out: Dict[int, List[dict]] = {}
+    for n in sizes:
+        mod.INSTRUMENTS = mes_standin.universe(n)
+        if prefilter:
+            # the scan covers the universe (MES_UNIVERSE), not INSTRUMENTS
+            sys.modules["mes_prefilter"].UNIVERSE_OVERRIDE = list(mod.INSTRUMENTS)
+        runs = []
+        for i in range(cycles):
+            if i == 0:
+                mod.htf_cache.entries.clear()
+            runs.append(run_cycle(mod, name, base))
+        out[n] = runs
+    return out
+
+
+def report(name: str, results: Dict[int, List[dict]], budget_s: float) -> int | None:
+    print(f"\n{name} cycle vs universe size (budget {budget_s:.0f}s)\n")
+    print(f"{'N':>5} {'cold s':>8} {'warm s':>8} {'req cold':>9} {'req warm':>9} "
+          f"{'served':>7} {'KiB cold':>9} {'429':>5} {'retries':>8} {'req/s':>7}  status")
+    limit = None
+    for n, runs in results.items():
+        cold, warm = runs[0], runs[1:] or runs[:1]
+        warm_s = sorted(r["seconds"] for r in warm)[len(warm) // 2]
+        served = sum(r["served"] for r in runs)
+        secs = sum(r["seconds"] for r in runs) or 1e-9
+        errors = [r["error"] for r in runs if r["error"]]
+        status = "ok"
+        if errors:
+            status = f"FAILED ({errors[0][:60]})"
+        elif cold["seconds"] > budget_s:
+            status = "OVER BUDGET"
+        if status != "ok" and limit is None:
+            limit = n
+        print(f"{n:>5} {cold['seconds']:>8.2f} {warm_s:>8.2f} {cold['requests']:>9} "
+              f"{warm[-1]['requests']:>9} {served:>7} {cold['kib']:>9.1f} "
+              f"{sum(r['throttled'] for r in runs):>5} "
+              f"{sum(r['retries'] for r in runs):>8} {served / secs:>7.1f}  {status}")
+    sizes = list(results)
+    if len(sizes) > 1:
+        a, b = sizes[0], sizes[-1]
+        per = (results[b][0]["seconds"] - results[a][0]["seconds"]) / max(1, b - a)
+        if per > 0:
+            print(f"\ncold cycle cost ≈ {per * 1000:.0f}ms per instrument → "
+                  f"budget reached near {int(budget_s / per)} instruments")
+    if limit is not None:
+        print(f"scaling limit: first failing size {limit}")
+    return limit
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES load harness (local v20 stand-in)")
+    ap.add_argument("strategy", choices=list(ENTRY))
+    ap.add_argument("--file", type=Path, help="strategy file (default: mes/<strategy>.py)")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[7, 70, 200])
+    ap.add_argument("--cycles", type=int, default=3, help="1 cold + N-1 warm per size")
+    ap.add_argument("--url", help="external stand-in URL (…/fxpractice); default: in-process")
+    ap.add_argument("--account", default="standin")
+    ap.add_argument("--data", type=Path, help="recorded CandleStore dir for the stand-in")
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=15.0)
+    ap.add_argument("--p429", type=float, default=0.0)
+    ap.add_argument("--rps", type=float, default=100.0, help="stand-in token bucket (0 = off)")
+    ap.add_argument("--budget-s", type=float, default=60.0)
+    ap.add_argument("--prefilter", action="store_true", help="enable the /pricing prefilter")
+    ap.add_argument("--json", type=Path)
+    args = ap.parse_args()
+
+    base = args.url
+    if not base:
+        app = mes_standin.build(max(args.sizes), args.data, account_id=args.account,
+                                latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                p429=args.p429, rps=args.rps)
+        _, base = mes_standin.start(app)
+
+    path = args.file or MES_DIR / f"mes_{args.strategy}.py"
+    results = load_test(args.strategy, path.resolve(), base, args.account, args.sizes,
+                        args.cycles, args.prefilter)
+    limit = report(args.strategy, results, args.budget_s)
+    if args.json:
+        args.json.write_text(json.dumps({"strategy": args.strategy, "limit": limit,
+                                         "results": results}, indent=2))
+    sys.exit(1 if limit is not None else 0)
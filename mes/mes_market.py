@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_market.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Market data shared by every MES strategy plugin.
+#   • parse_candles(): OANDA /candles JSON → the candle frame both
+#     strategies read (was duplicated in mes_scalp / mes_swing)
+#   • MarketSnapshot: the candles of ONE candle close, fetched once
+#     and then frozen. mes_runner builds a snapshot per close and
+#     hands it to every strategy of every account as their
+#     oanda_get_candles(), so all of them evaluate the same bars.
+#     Granularities that several plugins read (H1 / H4) are fetched
+#     once at the deepest declared lookback (mes_planner PLAN), so a
+#     further plugin adds no request for data already in the snapshot.
+#
+# Design goals:
+#   • Immutable per close: a (instrument, granularity) frame is never
+#     refetched or replaced inside a snapshot; callers get copies
+#   • Frames still valid at the next close (H4 during the next H1
+#     cycles) carry over — same expiry rule as mes_htf_cache
+#   • No strategy imports, no globals — the host owns the lifecycle
+# ============================================================
+
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from mes_htf_cache import next_close
+
+
+# ============================================================
+# CANDLES
+# ============================================================
+def parse_candles(payload: dict, count: Optional[int] = None) -> pd.DataFrame:
+    """
+    Complete mid candles of a /candles response as a frame indexed by
+    UTC open time; the last `count` only (one extra is requested for
+    the forming bar).
+    """
+    rows = []
+    for c in payload.get("candles", []):
+        if c.get("complete"):
+            m = c["mid"]
+            rows.append({
+                "time": c["time"],
+                "open": float(m["o"]),
+                "high": float(m["h"]),
+                "low": float(m["l"]),
+                "close": float(m["c"]),
+                "volume": int(c.get("volume", 0)),
+            })
+    df = pd.DataFrame(rows)
+    if df.empty:
+        raise RuntimeError("No candles")
+    df["time"] = pd.to_datetime(df["time"])      # one vectorized parse
+    df = df.set_index("time")
+    return df if count is None else df.tail(count)
+
+
+# ============================================================
+# SNAPSHOT
+# ============================================================
+def shared_depth(plans: Iterable) -> Dict[str, int]:
+    """
+    Deepest lookback per granularity declared by MORE than one plan —
+    the overlap worth fetching once. A granularity only one plugin
+    reads keeps that plugin's own (possibly incremental) request size.
+    """
+    seen: Dict[str, int] = {}
+    depth: Dict[str, int] = {}
+    for plan in plans:
+        for tf, bars in plan.bars.items():
+            if tf in seen:
+                depth[tf] = max(depth.get(tf, seen[tf]), bars)
+            seen[tf] = max(seen.get(tf, 0), bars)
+    return depth
+
+
+class MarketSnapshot:
+    """
+    oanda_get_candles(inst, tf, count) for one close. The first read of
+    (inst, tf) fetches max(count, depth[tf]) bars; every later read is
+    served from that frame. A read deeper than the frame is fetched
+    but does not replace it — all plugins keep seeing the same bars.
+    """
+
+    def __init__(self, fetch: Callable, asof: Optional[datetime] = None,
+                 depth: Optional[Dict[str, int]] = None,
+                 previous: Optional["MarketSnapshot"] = None):
+        self.fetch = fetch
+        self.asof = asof or datetime.now(timezone.utc)
+        self.depth = dict(depth or {})
+        self.frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self.hits = 0
+        self.fetches = 0
+        if previous is not None:
+            for key, df in previous.frames.items():
+                if self.asof < next_close(key[1], df.index[-1].to_pydatetime()):
+                    self.frames[key] = df
+
+    def __call__(self, inst: str, tf: str, count: Optional[int] = None) -> pd.DataFrame:
+        key = (inst, tf)
+        df = self.frames.get(key)
+        if df is not None and (count is None or len(df) >= count):
+            self.hits += 1
+            return (df if count is None else df.tail(count)).copy()
+        want = max(count or 0, self.depth.get(tf, 0)) or None
+        fresh = self.fetch(inst, tf) if want is None else self.fetch(inst, tf, want)
+        self.fetches += 1
+        if df is None:
+            self.frames[key] = fresh
+        return (fresh if count is None else fresh.tail(count)).copy()
+
+    def summary(self) -> str:
+        return f"{self.hits} reused / {self.fetches} fetched, {len(self.frames)} frames"
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_metrics.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Lightweight span tracing + latency histograms for MES cycles.
+#   Each cycle phase (NAV, open positions, candles, indicators, ...)
+#   runs inside tracer.span(); every OANDA request made through an
+#   instrumented Session is timed per endpoint / instrument /
+#   granularity, urllib3 retries included. Histograms are merged
+#   into metrics_<mode>.json and summarized by `leo mes status`.
+#
+# Design goals:
+#   • Fixed log-spaced buckets → histograms merge by addition
+#   • One small JSON file per MODE, per-day buckets, KEEP_DAYS kept
+#   • No effect on decisions; a failed save only logs a warning
+#   • Standard library only (status reads it without the venv)
+# ============================================================
+
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+KEEP_DAYS = 7
+
+# bucket upper bounds in ms; the last bucket is overflow
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+# ------------------------------------------------------------
+# HISTOGRAM
+# ------------------------------------------------------------
+class Histogram:
+    def __init__(self, d: Optional[dict] = None):
+        d = d or {}
+        self.counts: List[int] = list(d.get("counts", [0] * (len(BUCKETS_MS) + 1)))
+        self.n = int(d.get("n", 0))
+        self.sum = float(d.get("sum", 0.0))
+        self.max = float(d.get("max", 0.0))
+        self.retries = int(d.get("retries", 0))
+        self.errors = int(d.get("errors", 0))
+
+    def add(self, ms: float):
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.n += other.n
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.retries += other.retries
+        self.errors += other.errors
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for overflow)."""
+        if not self.n:
+            return 0.0
+        target, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.n if self.n else 0.0
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "n": self.n, "sum": round(self.sum, 3),
+                "max": round(self.max, 3), "retries": self.retries, "errors": self.errors}
+
+
+# ------------------------------------------------------------
+# REQUEST KEYS
+# ------------------------------------------------------------
+_CANDLES = re.compile(r"/v3/instruments/([A-Z_]+)/candles$")
+_POSITION = re.compile(r"/v3/accounts/[^/]+/positions/([A-Z_]+)/close$")
+_ACCOUNT_ROOT = re.compile(r"/v3/accounts/[^/]+/?$")
+
+
+def request_key(method: str, url: str, params: Optional[dict] = None) -> str:
+    """http/<endpoint>[/<instrument>[/<granularity>]] — account ids dropped."""
+    path = urlparse(url).path
+    m = _CANDLES.search(path)
+    if m:
+        tf = (params or {}).get("granularity", "?")
+        return f"http/candles/{m.group(1)}/{tf}"
+    m = _POSITION.search(path)
+    if m:
+        return f"http/close/{m.group(1)}"
+    if _ACCOUNT_ROOT.search(path):
+        return f"http/{method.upper()} account"
+    tail = path.rstrip("/").rsplit("/", 1)[-1]
+    return f"http/{method.upper()} {tail}"
+
+
+# ------------------------------------------------------------
+# TRACER
+# ------------------------------------------------------------
+def _phases(spans) -> List[Tuple[str, float]]:
+    """Direct children of the "cycle" span, without the prefix."""
+    return [(k[6:], ms) for k, ms in spans if k.startswith("cycle/") and k.count("/") == 1]
+
+
+class Tracer:
+    def __init__(self, component: str, path: Path):
+        self.component = component
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.hists: Dict[str, Histogram] = {}
+        self.stack: List[str] = []
+        self.cycle: List[Tuple[str, float]] = []
+
+    def _hist(self, key: str) -> Histogram:
+        h = self.hists.get(key)
+        if h is None:
+            h = self.hists[key] = Histogram()
+        return h
+
+    def observe(self, key: str, ms: float):
+        self._hist(key).add(ms)
+
+    def begin_cycle(self):
+        self.cycle = []
+        self.stack = []
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a phase; nested spans are keyed parent/child."""
+        key = "/".join(self.stack + [name])
+        self.stack.append(name)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.stack.pop()
+            self.observe(key, ms)
+            self.cycle.append((key, ms))
+
+    def instrument(self, session):
+        """Time every request of a requests.Session (retries included)."""
+        original = session.request
+
+        def request(method, url, *args, **kwargs):
+            key = request_key(method, url, kwargs.get("params"))
+            t0 = time.perf_counter()
+            try:
+                r = original(method, url, *args, **kwargs)
+            except Exception:
+                h = self._hist(key)
+                h.add((time.perf_counter() - t0) * 1000)
+                h.errors += 1
+                raise
+            ms = (time.perf_counter() - t0) * 1000
+            if getattr(r, "coalesced", False):      # joined / reused (mes_http), not sent
+                self.observe(f"coalesced/{key[5:]}", ms)
+                return r
+            h = self._hist(key)
+            h.add(ms)
+            retry = getattr(getattr(r, "raw", None), "retries", None)
+            h.retries += len(getattr(retry, "history", ()) or ())
+            if r.status_code >= 400:
+                h.errors += 1
+            self.cycle.append((key, ms))
+            return r
+
+        session.request = request
+        return session
+
+    def cycle_summary(self, top: int = 3) -> str:
+        """One log line: the cycle's phases plus the slowest requests."""
+        phases = _phases(self.cycle)
+        reqs = sorted(((k, ms) for k, ms in self.cycle if k.startswith("http/")),
+                      key=lambda x: -x[1])[:top]
+        total = next((ms for k, ms in self.cycle if k == "cycle"), 0.0)
+        parts = " | ".join(f"{k} {ms / 1000:.2f}s" for k, ms in phases)
+        slow = ", ".join(f"{k[5:]} {ms:.0f}ms" for k, ms in reqs)
+        return f"cycle {total / 1000:.2f}s: {parts}" + (f" — slowest: {slow}" if slow else "")
+
+    def save(self):
+        """Merge this process's histograms into the metrics file."""
+        if not self.hists and not self.cycle:
+            return
+        now = datetime.now(timezone.utc)
+        day = now.strftime("%Y-%m-%d")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                data = read_metrics(self.path)
+                comp = data["days"].setdefault(day, {}).setdefault(self.component, {})
+                for key, h in self.hists.items():
+                    merged = Histogram(comp.get(key))
+                    merged.merge(h)
+                    comp[key] = merged.to_dict()
+                keep = (now - timedelta(days=KEEP_DAYS - 1)).strftime("%Y-%m-%d")
+                data["days"] = {d: v for d, v in data["days"].items() if d >= keep}
+                data["last_cycle"][self.component] = {
+                    "at": now.isoformat(),
+                    "spans": [[k, round(ms, 1)] for k, ms in self.cycle],
+                }
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(data, separators=(",", ":")))
+                os.replace(tmp, self.path)
+                fcntl.flock(lf, fcntl.LOCK_UN)
+            self.hists = {}
+        except Exception as e:
+            logging.warning(f"Metrics save failed: {e}")
+
+
+def open_tracer(component: str, mode: str, state_dir: Path = STATE_DIR) -> Tracer:
+    return Tracer(component, Path(state_dir) / f"metrics_{mode.lower()}.json")
+
+
+# ------------------------------------------------------------
+# READ / SUMMARY (used by mes-run status)
+# ------------------------------------------------------------
+def read_metrics(path: Path) -> dict:
+    try:
+        data = json.loads(Path(path).read_text())
+    except Exception:
+        data = {}
+    data.setdefault("days", {})
+    data.setdefault("last_cycle", {})
+    return data
+
+
+def merged(data: dict, component: str, days: int = 1) -> Dict[str, Histogram]:
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    out: Dict[str, Histogram] = {}
+    for day, comps in data["days"].items():
+        if day < since:
+            continue
+        for key, d in comps.get(component, {}).items():
+            out.setdefault(key, Histogram()).merge(Histogram(d))
+    return out
+
+
+def _rollup(hists: Dict[str, Histogram], part: int) -> Dict[str, Histogram]:
+    """Candle histograms grouped by path part (2 = instrument, 3 = granularity)."""
+    out: Dict[str, Histogram] = {}
+    for key, h in hists.items():
+        bits = key.split("/")
+        if key.startswith("http/candles/") and len(bits) > part:
+            out.setdefault(bits[part], Histogram()).merge(h)
+    return out
+
+
+def summarize(path: Path, days: int = 1, top: int = 5) -> List[str]:
+    data = read_metrics(path)
+    lines: List[str] = []
+    for comp in sorted(set(data["last_cycle"]) | {c for d in data["days"].values() for c in d}):
+        hists = merged(data, comp, days)
+        last = data["last_cycle"].get(comp, {})
+        phases = _phases(last.get("spans", []))
+        lines.append(f"{comp}: last cycle {last.get('at', 'n/a')[:19]}")
+        if phases:
+            lines.append("  " + " | ".join(f"{k} {ms / 1000:.2f}s" for k, ms in phases))
+
+        cycle = hists.get("cycle")
+        if cycle:
+            lines.append(f"  cycle p50 {cycle.quantile(.5) / 1000:.1f}s  "
+                         f"p95 {cycle.quantile(.95) / 1000:.1f}s  max {cycle.max / 1000:.1f}s  "
+                         f"(n={cycle.n}, {days}d)")
+        reqs = {k: h for k, h in hists.items() if k.startswith("http/")}
+        if reqs:
+            n = sum(h.n for h in reqs.values())
+            retries = sum(h.retries for h in reqs.values())
+            errors = sum(h.errors for h in reqs.values())
+            lines.append(f"  requests {n}  retries {retries}  errors {errors}")
+            for key, h in sorted(reqs.items(), key=lambda kv: -kv[1].quantile(.95))[:top]:
+                lines.append(f"    {key[5:]:<26} p95 {h.quantile(.95):>6.0f}ms  max {h.max:>6.0f}ms"
+                             + (f"  retries {h.retries}" if h.retries else ""))
+            for label, part in (("instrument", 2), ("granularity", 3)):
+                roll = _rollup(reqs, part)
+                if roll:
+                    worst = max(roll.items(), key=lambda kv: kv[1].mean)
+                    lines.append(f"  slowest {label}: {worst[0]} "
+                                 f"(mean {worst[1].mean:.0f}ms, p95 {worst[1].quantile(.95):.0f}ms)")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="MES latency summary")
+    ap.add_argument("--mode", default="demo")
+    ap.add_argument("--days", type=int, default=1)
+    ap.add_argument("--dir", type=Path, default=STATE_DIR)
+    args = ap.parse_args()
+    print("\n".join(summarize(args.dir / f"metrics_{args.mode.lower()}.json", args.days)
+                    or ["no metrics yet"]))
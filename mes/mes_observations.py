@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_observations.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Typed, columnar MES trade observation log.
+#   Replaces trade_observations.csv, whose rows from different
+#   scalp versions carry different field sets (13 vs 10 columns)
+#   under one header. Each row here records the schema version it
+#   was produced with; every field lives in its own fixed-width
+#   column file, so one column (session_hour_utc,
+#   was_margin_capped, ...) is read for all rows without touching
+#   the others.
+#
+# Layout:
+#   observations/meta.json        row count + column types (commit point)
+#   observations/<column>.bin     little-endian fixed-width values
+#   observations/<column>.dict    category strings (JSON list)
+#
+# Design goals:
+#   • Appends are batched in memory and flushed once per cycle
+#   • Crash safe: column files may run ahead of meta.json, readers
+#     and the next flush only trust meta["rows"]
+#   • New columns can be added later — older rows read as null
+#   • `migrate` imports the legacy CSV, detecting the schema per row
+# ============================================================
+
+import argparse
+import atexit
+import csv
+import fcntl
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+FLUSH_ROWS = 64
+
+# column → storage type
+#   ts   int64 µs since epoch      cat  int32 category code
+#   f8   float64                   i8   int64
+#   b1   int8 (0/1)                i1   int8        u1  uint8
+COLUMNS: Dict[str, str] = {
+    "timestamp_utc": "ts",
+    "pair": "cat",
+    "direction": "cat",
+    "sweep_type": "cat",
+    "confirmation_type": "cat",
+    "retest_distance_pips": "f8",
+    "zone_radius_pips": "f8",
+    "in_zone_ratio": "f8",
+    "strong_body_ratio": "f8",
+    "pullback_pips": "f8",
+    "tp_pips": "f8",
+    "sl_pips": "f8",
+    "exec_units": "i8",
+    "was_margin_capped": "b1",
+    "session_hour_utc": "i1",
+    "schema_version": "u1",
+}
+
+DTYPES = {"ts": "<i8", "cat": "<i4", "f8": "<f8", "i8": "<i8",
+          "b1": "i1", "i1": "i1", "u1": "u1"}
+NULLS = {"ts": np.iinfo(np.int64).min, "cat": -1, "f8": np.nan,
+         "i8": np.iinfo(np.int64).min, "b1": -1, "i1": -1, "u1": 0}
+
+# Field sets written by past and current scalp versions
+SCHEMAS: Dict[int, List[str]] = {
+    1: ["timestamp_utc", "pair", "direction", "sweep_type", "confirmation_type",
+        "retest_distance_pips", "zone_radius_pips", "in_zone_ratio", "tp_pips",
+        "sl_pips", "exec_units", "was_margin_capped", "session_hour_utc"],
+    2: ["timestamp_utc", "pair", "direction", "strong_body_ratio", "pullback_pips",
+        "sl_pips", "tp_pips", "exec_units", "was_margin_capped", "session_hour_utc"],
+}
+CURRENT_SCHEMA = 2
+
+
+# ------------------------------------------------------------
+# VALUE ENCODING
+# ------------------------------------------------------------
+def _ts(v) -> int:
+    if isinstance(v, datetime):
+        t = v
+    else:
+        t = datetime.fromisoformat(str(v))
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return int(t.timestamp() * 1_000_000)
+
+
+def _bool(v) -> int:
+    if isinstance(v, str):
+        return 1 if v.strip().lower() in ("true", "1", "yes") else 0
+    return int(bool(v))
+
+
+def _encode(kind: str, v, cats: List[str], cat_ix: Dict[str, int]):
+    if v is None or v == "":
+        return NULLS[kind]
+    if kind == "ts":
+        return _ts(v)
+    if kind == "cat":
+        s = str(v)
+        if s not in cat_ix:
+            cat_ix[s] = len(cats)
+            cats.append(s)
+        return cat_ix[s]
+    if kind == "f8":
+        return float(v)
+    if kind == "b1":
+        return _bool(v)
+    return int(float(v))
+
+
+# ------------------------------------------------------------
+# STORE
+# ------------------------------------------------------------
+class ObservationLog:
+    def __init__(self, root: Path, flush_rows: int = FLUSH_ROWS):
+        self.root = Path(root)
+        self.meta_path = self.root / "meta.json"
+        self.lock_path = self.root / ".lock"
+        self.flush_rows = flush_rows
+        self.pending: List[dict] = []
+
+    # ---- metadata ----
+    def meta(self) -> dict:
+        try:
+            return json.loads(self.meta_path.read_text())
+        except FileNotFoundError:
+            return {"format": 1, "rows": 0, "columns": {}}
+
+    def _write_meta(self, meta: dict):
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta, indent=1))
+        os.replace(tmp, self.meta_path)
+
+    def _col(self, name: str) -> Path:
+        return self.root / f"{name}.bin"
+
+    def _dict_path(self, name: str) -> Path:
+        return self.root / f"{name}.dict"
+
+    def categories(self, name: str) -> List[str]:
+        try:
+            return json.loads(self._dict_path(name).read_text())
+        except FileNotFoundError:
+            return []
+
+    def __len__(self):
+        return self.meta()["rows"] + len(self.pending)
+
+    # ---- write ----
+    def append(self, row: dict, schema: int = CURRENT_SCHEMA):
+        """Queue one observation; flushed every flush_rows rows and at exit."""
+        unknown = set(row) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown observation fields: {sorted(unknown)}")
+        self.pending.append({**row, "schema_version": schema})
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                self._flush_locked(self.pending)
+                fcntl.flock(lf, fcntl.LOCK_UN)
+            self.pending = []
+        except Exception as e:
+            logging.warning(f"Observation flush failed: {e}")
+
+    def _flush_locked(self, rows: List[dict]):
+        meta = self.meta()
+        n = meta["rows"]
+        for name, kind in COLUMNS.items():
+            dtype = np.dtype(DTYPES[kind])
+            cats = self.categories(name) if kind == "cat" else []
+            cat_ix = {s: i for i, s in enumerate(cats)}
+            values = np.array([_encode(kind, r.get(name), cats, cat_ix) for r in rows], dtype=dtype)
+
+            path = self._col(name)
+            with open(path, "ab") as f:
+                have = f.tell() // dtype.itemsize
+                if have > n:                    # uncommitted tail from a crash
+                    f.truncate(n * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                elif have < n:                  # column added after rows existed
+                    np.full(n - have, NULLS[kind], dtype=dtype).tofile(f)
+                values.tofile(f)
+            if kind == "cat":
+                self._dict_path(name).write_text(json.dumps(cats))
+            meta["columns"][name] = kind
+        meta["rows"] = n + len(rows)
+        self._write_meta(meta)              # commit point
+
+    # ---- read ----
+    def raw(self, name: str) -> np.ndarray:
+        """Stored values of one column (memory-mapped, nulls as sentinels)."""
+        kind = COLUMNS[name]
+        n = self.meta()["rows"]
+        dtype = np.dtype(DTYPES[kind])
+        path = self._col(name)
+        have = path.stat().st_size // dtype.itemsize if path.exists() else 0
+        if have == 0:
+            return np.full(n, NULLS[kind], dtype=dtype)
+        arr = np.memmap(path, dtype=dtype, mode="r", shape=(min(have, n),))
+        if have < n:
+            arr = np.concatenate([arr, np.full(n - have, NULLS[kind], dtype=dtype)])
+        return arr
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One column, typed:
+          ts → datetime64[us, UTC-naive], cat → object (None for null),
+          f8 → float64 (NaN), i8/i1 → float64 with NaN for null,
+          b1 → float64 1.0 / 0.0 / NaN.
+        """
+        kind = COLUMNS[name]
+        a = self.raw(name)
+        if kind == "ts":
+            out = a.astype("datetime64[us]")
+            out[a == NULLS["ts"]] = np.datetime64("NaT")
+            return out
+        if kind == "cat":
+            cats = np.array(self.categories(name) + [None], dtype=object)
+            return cats[np.where(a < 0, len(cats) - 1, a)]
+        if kind in ("f8", "u1"):
+            return np.asarray(a)
+        out = a.astype(np.float64)
+        out[a == NULLS[kind]] = np.nan
+        return out
+
+    def frame(self, columns: Optional[Iterable[str]] = None):
+        """pandas DataFrame of the requested columns (all by default)."""
+        import pandas as pd
+        cols = list(columns or COLUMNS)
+        df = pd.DataFrame({c: self.column(c) for c in cols})
+        if "timestamp_utc" in df:
+            df["timestamp_utc"] = df["timestamp_utc"].dt.tz_localize("UTC")
+        return df
+
+
+def open_observations(state_dir: Path = STATE_DIR) -> ObservationLog:
+    log = ObservationLog(Path(state_dir) / "observations")
+    atexit.register(log.flush)
+    return log
+
+
+# ------------------------------------------------------------
+# LEGACY CSV MIGRATION
+# ------------------------------------------------------------
+def detect_schema(fields: List[str]) -> Optional[int]:
+    """Schema version of one legacy CSV row, by field count."""
+    for version, names in SCHEMAS.items():
+        if len(fields) == len(names):
+            return version
+    return None
+
+
+def migrate_csv(csv_path: Path, log: ObservationLog) -> Dict[str, int]:
+    """Import every row of trade_observations.csv; returns counts per schema."""
+    counts: Dict[str, int] = {}
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header and header != SCHEMAS[1]:
+            logging.warning(f"Unexpected CSV header: {header}")
+        for lineno, fields in enumerate(reader, start=2):
+            if not fields:
+                continue
+            version = detect_schema(fields)
+            if version is None:
+                raise ValueError(f"{csv_path}:{lineno}: {len(fields)} fields, no known schema")
+            log.append(dict(zip(SCHEMAS[version], fields)), schema=version)
+            counts[f"v{version}"] = counts.get(f"v{version}", 0) + 1
+    log.flush()
+    return counts
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES trade observation log")
+    ap.add_argument("cmd", choices=["migrate", "show", "column"])
+    ap.add_argument("--dir", type=Path, default=STATE_DIR)
+    ap.add_argument("--csv", type=Path, help="legacy CSV (default: <dir>/trade_observations.csv)")
+    ap.add_argument("--name", help="column name for 'column'")
+    args = ap.parse_args()
+
+    log = ObservationLog(args.dir / "observations")
+    if args.cmd == "migrate":
+        src = args.csv or args.dir / "trade_observations.csv"
+        if log.meta()["rows"]:
+            print(f"{log.root} already holds {log.meta()['rows']} rows — not migrating twice")
+        else:
+            print(f"{src} → {log.root}: {migrate_csv(src, log)}")
+    elif args.cmd == "column":
+        if args.name not in COLUMNS:
+            ap.error(f"--name must be one of: {', '.join(COLUMNS)}")
+        for v in log.column(args.name):
+            print(v)
+    else:
+        print(log.frame().to_string())
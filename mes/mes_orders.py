@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_orders.py
+# Version: v1.2.1
+#
+# Purpose:
+#   OANDA v20 order execution for MES.
+#     • MARKET entries with stop loss / take profit attached on fill
+#       as distances from the fill price, priced at the instrument's displayPrecision (mes_instruments)
+#     • position closes with the fill checked, not fire-and-forget
+#     • clientExtensions (tag + version comment) on entries and
+#       closes, so fills can be attributed back (mes_ledger)
+#     • all orders of one cycle sent concurrently, each worker in a
+#       copy of the caller's context (the cycle's mes_deadline)
+#     • decision-to-fill latency recorded per order
+#     • orders are sent ONCE: a send whose answer is lost (timeout,
+#       connection drop, 5xx, unreadable body) is looked up in
+#       /transactions/sinceid by its client order id and reported as
+#       filled / not filled from the account — never re-sent
+#
+# Design goals:
+#   • Payloads built at decision time (OrderSpec.payload) so the
+#     send path is one POST / PUT per order
+#   • Every response parsed into a Fill — rejected, cancelled and
+#     HTTP-failed orders are reported, never raised
+#   • Uses the caller's requests.Session (auth, metrics); its retry
+#     policy must leave POST / PUT alone (mes_http.retry_policy)
+# ============================================================
+
+import contextvars
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+MAX_WORKERS = 8
+ORDER_TIMEOUT_S = 10
+RECONCILE_WINDOW = 200                  # transactions looked back for a lost answer
+
+
+def price_precision(instrument: str, meta: Optional[dict] = None) -> int:
+    """
+    Price precision OANDA accepts: the instrument's displayPrecision
+    (mes_instruments.meta()); 3 for JPY / 5 for FX without metadata.
+    """
+    if meta and meta.get("displayPrecision") is not None:
+        return int(meta["displayPrecision"])
+    return 3 if instrument.endswith("JPY") else 5
+
+
+def fmt_price(instrument: str, value: float, meta: Optional[dict] = None) -> str:
+    return f"{value:.{price_precision(instrument, meta)}f}"
+
+
+# ============================================================
+# ORDER SPECS
+# ============================================================
+@dataclass
+class OrderSpec:
+    """One order decided this cycle; payload is ready to send."""
+    instrument: str
+    kind: str                           # ENTRY | CLOSE
+    units: int = 0
+    payload: dict = field(default_factory=dict)
+    tag: str = ""
+    client_id: str = ""
+    decided_at: float = field(default_factory=time.perf_counter)
+
+
+def client_order_id(tag: str) -> str:
+    """Unique clientExtensions.id, so a lost answer can be looked up."""
+    return f"{tag or 'MES'}-{uuid.uuid4().hex[:16]}"
+
+
+def market_entry(instrument: str, units: int, sl_distance: float,
+                 tp_distance: float, tag: str, comment: str = "",
+                 meta: Optional[dict] = None) -> OrderSpec:
+    """
+    MARKET FOK entry with SL and TP as distances from the fill: both on
+    the right side of whatever price fills, at the R:R decided. `meta` is
+    the mes_instruments record of the instrument (price precision).
+    """
+    cid = client_order_id(tag)
+    order = {
+        "type": "MARKET",
+        "instrument": instrument,
+        "units": str(int(units)),
+        "timeInForce": "FOK",
+        "positionFill": "DEFAULT",
+        "stopLossOnFill": {
+            "distance": fmt_price(instrument, sl_distance, meta),
+            "timeInForce": "GTC",
+        },
+        "takeProfitOnFill": {
+            "distance": fmt_price(instrument, tp_distance, meta),
+            "timeInForce": "GTC",
+        },
+        "clientExtensions": {"id": cid, "tag": tag, "comment": comment[:128]},
+        "tradeClientExtensions": {"tag": tag, "comment": comment[:128]},
+    }
+    return OrderSpec(instrument, "ENTRY", int(units), {"order": order}, tag, cid)
+
+
+def position_close(instrument: str, units: float, tag: str = "", comment: str = "") -> OrderSpec:
+    """Close the whole long or short side currently held."""
+    side = "long" if units > 0 else "short"
+    cid = client_order_id(tag)
+    ext = {"id": cid}
+    if tag:
+        ext.update(tag=tag, comment=comment[:128])
+    payload = {f"{side}Units": "ALL", f"{side}ClientExtensions": ext}
+    return OrderSpec(instrument, "CLOSE", int(units), payload, tag, cid)
+
+
+# ============================================================
+# RESPONSE PARSING
+# ============================================================
+@dataclass
+class Fill:
+    instrument: str
+    kind: str
+    ok: bool
+    units: float = 0.0
+    price: float = 0.0
+    order_id: str = ""
+    trade_id: str = ""
+    pl: float = 0.0
+    reason: str = ""
+    status: int = 0
+    reconciled: bool = False            # answer lost, outcome read from the account
+    latency_ms: float = 0.0             # decision → response with fill
+    request_ms: float = 0.0             # HTTP round trip (retries included)
+
+
+def parse_entry(instrument: str, status: int, body: dict) -> Fill:
+    f = Fill(instrument, "ENTRY", False, status=status)
+    fill = body.get("orderFillTransaction")
+    if fill:
+        f.ok = True
+        f.order_id = fill.get("orderID", "")
+        f.units = float(fill.get("units", 0))
+        f.price = float(fill.get("price", 0) or 0)
+        f.trade_id = (fill.get("tradeOpened") or {}).get("tradeID", "")
+        return f
+    cancel = body.get("orderCancelTransaction") or body.get("orderRejectTransaction") or {}
+    f.order_id = cancel.get("orderID", "") or cancel.get("id", "")
+    f.reason = (cancel.get("reason") or cancel.get("rejectReason")
+                or body.get("errorCode") or body.get("errorMessage") or f"HTTP {status}")
+    return f
+
+
+def parse_close(instrument: str, status: int, body: dict) -> Fill:
+    f = Fill(instrument, "CLOSE", False, status=status)
+    fills = [body[k] for k in ("longOrderFillTransaction", "shortOrderFillTransaction")
+             if body.get(k)]
+    if fills:
+        f.ok = True
+        f.units = sum(float(x.get("units", 0)) for x in fills)
+        f.price = float(fills[0].get("price", 0) or 0)
+        f.order_id = fills[0].get("orderID", "")
+        f.pl = sum(float(x.get("pl", 0) or 0) for x in fills)
+        return f
+    cancel = body.get("longOrderCancelTransaction") or body.get("shortOrderCancelTransaction") or {}
+    f.reason = (cancel.get("reason") or body.get("errorCode")
+                or body.get("errorMessage") or f"HTTP {status}")
+    return f
+
+
+def parse_transactions(spec: OrderSpec, txns: List[dict]) -> Optional[Fill]:
+    """
+    Outcome of spec in a transaction page: the order created with its
+    client id, then its fill or cancel. None if the order is not there.
+    """
+    order_id = next((t.get("id") for t in txns
+                     if (t.get("clientExtensions") or {}).get("id") == spec.client_id), None)
+    if order_id is None:
+        return None
+    f = Fill(spec.instrument, spec.kind, False, order_id=order_id)
+    for t in txns:
+        if t.get("orderID") != order_id:
+            continue
+        if t.get("type") == "ORDER_FILL":
+            f.ok = True
+            f.units = float(t.get("units", 0))
+            f.price = float(t.get("price", 0) or 0)
+            f.trade_id = (t.get("tradeOpened") or {}).get("tradeID", "")
+            f.pl = float(t.get("pl", 0) or 0)
+            return f
+        if t.get("type") == "ORDER_CANCEL":
+            f.reason = t.get("reason", "ORDER_CANCEL")
+            return f
+    f.reason = "order created, no fill yet"
+    return f
+
+
+# ============================================================
+# EXECUTION
+# ============================================================
+class OrderExecutor:
+    def __init__(self, session, rest_url: str, account_id: str,
+                 observe: Optional[Callable[[str, float], None]] = None,
+                 max_workers: int = MAX_WORKERS):
+        self.session = session
+        self.base = f"{rest_url.rstrip('/')}/v3/accounts/{account_id}"
+        self.observe = observe
+        self.max_workers = max_workers
+
+    def _reconcile(self, spec: OrderSpec, why: str) -> Fill:
+        """
+        The answer to spec was lost, the order may still have executed:
+        read it back from the account's recent transactions. Never re-sends.
+        """
+        try:
+            r = self.session.get(f"{self.base}/summary", timeout=ORDER_TIMEOUT_S)
+            r.raise_for_status()
+            last = int(r.json()["lastTransactionID"])
+            r = self.session.get(f"{self.base}/transactions/sinceid",
+                                 params={"id": max(0, last - RECONCILE_WINDOW)},
+                                 timeout=ORDER_TIMEOUT_S)
+            r.raise_for_status()
+            txns = r.json().get("transactions", [])
+        except Exception as e:
+            return Fill(spec.instrument, spec.kind, False, reconciled=True,
+                        reason=f"{why}; UNKNOWN, lookup failed ({type(e).__name__}: {e})")
+        fill = parse_transactions(spec, txns)
+        if fill is None:
+            fill = Fill(spec.instrument, spec.kind, False, reason=f"{why}; not executed")
+        elif not fill.ok:
+            fill.reason = f"{why}; {fill.reason}"
+        fill.reconciled = True
+        return fill
+
+    def _send(self, spec: OrderSpec) -> Fill:
+        t0 = time.perf_counter()
+        status, why = 0, ""
+        try:
+            if spec.kind == "ENTRY":
+                r = self.session.post(f"{self.base}/orders", json=spec.payload,
+                                      timeout=ORDER_TIMEOUT_S)
+            else:
+                r = self.session.put(f"{self.base}/positions/{spec.instrument}/close",
+                                     json=spec.payload, timeout=ORDER_TIMEOUT_S)
+            status = r.status_code
+            try:
+                body = r.json()
+            except ValueError:
+                body = None
+            if status >= 500 or (body is None and status < 400):
+                why = f"HTTP {status}" + ("" if body is not None else " (unreadable)")
+            else:
+                parse = parse_entry if spec.kind == "ENTRY" else parse_close
+                fill = parse(spec.instrument, status, body or {})
+        except Exception as e:
+            why = f"{type(e).__name__}: {e}"
+        if why:
+            fill = self._reconcile(spec, why)
+            fill.status = status
+        done = time.perf_counter()
+        fill.request_ms = (done - t0) * 1000
+        fill.latency_ms = (done - spec.decided_at) * 1000
+        if self.observe:
+            self.observe(f"order/{spec.kind.lower()}", fill.latency_ms)
+        level = logging.INFO if fill.ok else logging.WARNING
+        logging.log(level, f"[ORDER] {spec.kind} {spec.instrument} "
+                           f"{'filled' if fill.ok else 'FAILED ' + fill.reason}"
+                           f"{' (reconciled)' if fill.reconciled else ''} "
+                           f"units={fill.units:g} price={fill.price:g} "
+                           f"({fill.latency_ms:.0f}ms from decision, {fill.request_ms:.0f}ms request)")
+        return fill
+
+    def execute(self, specs: List[OrderSpec]) -> List[Fill]:
+        """Send all orders concurrently; fills in the order of specs."""
+        if not specs:
+            return []
+        if len(specs) == 1:
+            return [self._send(specs[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(specs))) as ex:
+            # one copy per order: a Context can be entered by one thread at a time
+            futures = [ex.submit(contextvars.copy_context().run, self._send, spec)
+                       for spec in specs]
+            return [f.result() for f in futures]
+
+
+def by_instrument(fills: List[Fill]) -> Dict[str, Fill]:
+    return {f.instrument: f for f in fills}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_planner.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Data-dependency planner for MES cycles.
+#   • Lookbacks: every indicator / check declares what it reads and
+#     the planner turns that into the minimum number of complete
+#     candles per granularity (structure of the last bar → 1,
+#     ATR(14) → 14, its delta → 28, RSI / MACD → EMA warm-up until
+#     the seed's weight is below WARMUP_TOL) instead of a fixed 300.
+#   • Deferred fetches: NAV, positions and other account reads are
+#     wrapped in Lazy and only requested when a later gate actually
+#     reads them; quiet cycles (no alignment, no signal) skip them.
+#
+# Design goals:
+#   • Decision inputs are exact — only the diagnostic EMA fields
+#     (rsi / macd) are truncated, within WARMUP_TOL of the 300-bar value
+#   • Pure bookkeeping: no network, no globals beyond the constants
+#   • One summary line per cycle (fetched / deferred) for mes.log
+# ============================================================
+
+import math
+import os
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+import mes_indicators as mi
+
+WARMUP_TOL = float(os.getenv("MES_WARMUP_TOL", "1e-4"))
+MAX_BARS = 5000                  # OANDA per-request limit
+
+T = TypeVar("T")
+
+
+# ============================================================
+# LOOKBACKS (complete bars per indicator)
+# ============================================================
+def ema_warmup(alpha: float, tol: float = WARMUP_TOL) -> int:
+    """Bars until the seed of an adjust=False EWM weighs less than tol."""
+    return int(math.ceil(math.log(tol) / math.log(1.0 - alpha)))
+
+
+def lookback(indicator: str, n: int = 0) -> int:
+    if indicator in ("structure", "body", "body_ratio", "close"):
+        return 1
+    if indicator == "atr":
+        return n or mi.ATR_PERIOD
+    if indicator == "atr_delta":
+        return 2 * (n or mi.ATR_PERIOD)
+    if indicator == "rsi":
+        return 1 + ema_warmup(1.0 / (n or mi.RSI_PERIOD))
+    if indicator == "macd":
+        return (ema_warmup(2.0 / (mi.MACD_SLOW + 1))
+                + ema_warmup(2.0 / (mi.MACD_SIGNAL + 1)))
+    if indicator == "snapshot":
+        # mes_indicators.snapshot(): atr / atr_delta / rsi / macd / body
+        return max(lookback("atr_delta", n), lookback("rsi"), lookback("macd"))
+    raise KeyError(f"no lookback declared for {indicator}")
+
+
+class Plan:
+    """Minimum complete bars per granularity for the reads declared."""
+
+    def __init__(self):
+        self.bars: Dict[str, int] = {}
+        self.reasons: Dict[str, List[str]] = {}
+
+    def need(self, tf: str, indicator: str, n: int = 0) -> "Plan":
+        bars = min(lookback(indicator, n), MAX_BARS)
+        self.bars[tf] = max(self.bars.get(tf, 0), bars)
+        self.reasons.setdefault(tf, []).append(f"{indicator}{n or ''}={bars}")
+        return self
+
+    def count(self, tf: str) -> int:
+        return self.bars[tf]
+
+    def describe(self) -> str:
+        return ", ".join(f"{tf}:{b} ({' '.join(self.reasons[tf])})" for tf, b in self.bars.items())
+
+
+# ============================================================
+# DEFERRED FETCHES
+# ============================================================
+class Lazy(Generic[T]):
+    """
+    Fetch on first call, then reuse. `span` wraps the fetch in a
+    tracer span so deferred reads still show up in the cycle timing.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], T], span: Optional[Callable] = None):
+        self.name = name
+        self.fetch = fetch
+        self.span = span
+        self.fetched = False
+        self._value: Optional[T] = None
+
+    def __call__(self) -> T:
+        if not self.fetched:
+            if self.span is not None:
+                with self.span(self.name):
+                    self._value = self.fetch()
+            else:
+                self._value = self.fetch()
+            self.fetched = True
+        return self._value
+
+
+def summary(*lazies: Lazy) -> str:
+    fetched = [l.name for l in lazies if l.fetched]
+    deferred = [l.name for l in lazies if not l.fetched]
+    return (f"fetched: {', '.join(fetched) or 'none'}; "
+            f"skipped: {', '.join(deferred) or 'none'}")
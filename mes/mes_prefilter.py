@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_prefilter.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Cheap scan stage in front of the candle fetches. One batched
+#   /pricing snapshot covers the whole tradable FX universe of the
+#   account; instruments that cannot qualify this cycle are dropped
+#   before any candles are requested:
+#     • not tradeable (market closed / halted)
+#     • spread wider than the strategy's limit (in pips)
+#     • no movement since the previous scan (mid moved < MIN_MOVE_PIPS)
+#   Survivors are what the strategy evaluates, so a 70+ pair
+#   universe costs about the request budget of today's 7 majors.
+#
+# Design goals:
+#   • Off by default — strategies opt in per MODE via env
+#   • Universe (name + pipLocation) from /instruments, cached daily
+#     (or from the shared mes_instruments cache when one is passed)
+#   • Previous mids persisted per strategy / MODE for the move test
+#   • Any failure falls back to the strategy's fixed list
+# ============================================================
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+PRICING_BATCH = 250             # instruments per /pricing request
+UNIVERSE_TTL_S = 24 * 3600
+MIN_MOVE_PIPS = float(os.getenv("MES_PREFILTER_MIN_MOVE_PIPS", "0.5"))
+
+# MES_UNIVERSE=EUR_USD,GBP_JPY,... pins the universe instead of /instruments
+UNIVERSE_OVERRIDE = [i for i in os.getenv("MES_UNIVERSE", "").split(",") if i]
+
+
+@dataclass
+class Quote:
+    instrument: str
+    bid: float
+    ask: float
+    tradeable: bool
+
+    @property
+    def mid(self) -> float:
+        return (self.bid + self.ask) / 2
+
+
+def pip_location_guess(inst: str) -> int:
+    return -2 if inst.endswith("JPY") else -4
+
+
+class Prefilter:
+    def __init__(self, session, rest_url: str, account_id: str, path: Path,
+                 max_spread_pips: float, enabled: bool = False,
+                 min_move_pips: float = MIN_MOVE_PIPS, instruments=None):
+        self.session = session
+        self.instruments = instruments      # mes_instruments.InstrumentCache (optional)
+        self.base = f"{rest_url.rstrip('/')}/v3/accounts/{account_id}"
+        self.path = Path(path)
+        self.max_spread_pips = max_spread_pips
+        self.min_move_pips = min_move_pips
+        self.enabled = enabled
+        self.state = self._read()
+        self.dropped: Dict[str, str] = {}
+
+    # ---------------- state ----------------
+    def _read(self) -> dict:
+        try:
+            state = json.loads(self.path.read_text())
+        except Exception:
+            state = {}
+        state.setdefault("universe", {})
+        state.setdefault("universe_at", 0)
+        state.setdefault("mids", {})
+        return state
+
+    def _write(self):
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.warning(f"Prefilter state save failed: {e}")
+
+    # ---------------- universe ----------------
+    def universe(self) -> Dict[str, int]:
+        """{instrument: pipLocation} for every tradable CURRENCY instrument."""
+        if UNIVERSE_OVERRIDE:
+            cached = self.state["universe"]
+            return {i: cached.get(i, pip_location_guess(i)) for i in UNIVERSE_OVERRIDE}
+        if self.instruments is not None:
+            # shared daily /instruments cache — no second metadata fetch
+            self.instruments.refresh()
+            uni = {n: m["pipLocation"] for n, m in self.instruments.instruments.items()
+                   if m["type"] == "CURRENCY"}
+            if not uni:
+                raise RuntimeError("instrument cache empty")
+            return uni
+        if self.state["universe"] and time.time() - self.state["universe_at"] < UNIVERSE_TTL_S:
+            return self.state["universe"]
+        r = self.session.get(f"{self.base}/instruments", timeout=15)
+        r.raise_for_status()
+        self.state["universe"] = {
+            i["name"]: int(i.get("pipLocation", pip_location_guess(i["name"])))
+            for i in r.json().get("instruments", []) if i.get("type") == "CURRENCY"
+        }
+        self.state["universe_at"] = time.time()
+        return self.state["universe"]
+
+    # ---------------- pricing ----------------
+    def snapshot(self, insts: List[str]) -> Dict[str, Quote]:
+        out: Dict[str, Quote] = {}
+        for i in range(0, len(insts), PRICING_BATCH):
+            r = self.session.get(f"{self.base}/pricing",
+                                 params={"instruments": ",".join(insts[i:i + PRICING_BATCH])},
+                                 timeout=15)
+            r.raise_for_status()
+            for p in r.json().get("prices", []):
+                bids, asks = p.get("bids") or [], p.get("asks") or []
+                if not bids or not asks:
+                    continue
+                out[p["instrument"]] = Quote(p["instrument"], float(bids[0]["price"]),
+                                             float(asks[0]["price"]), bool(p.get("tradeable", True)))
+        return out
+
+    def judge(self, q: Optional[Quote], pip: float) -> Optional[str]:
+        if q is None:
+            return "NO_PRICE"
+        if not q.tradeable:
+            return "NOT_TRADEABLE"
+        spread = (q.ask - q.bid) / pip
+        if spread > self.max_spread_pips:
+            return f"SPREAD {spread:.1f}p"
+        prev = self.state["mids"].get(q.instrument)
+        if prev is not None and abs(q.mid - prev) / pip < self.min_move_pips:
+            return f"STILL {abs(q.mid - prev) / pip:.2f}p"
+        return None
+
+    def scan(self, fallback: List[str], keep: Iterable[str] = ()) -> List[str]:
+        """
+        Survivors of the whole universe (universe order), plus `keep`
+        (e.g. instruments with open positions) unconditionally.
+        Returns `fallback` unchanged when disabled or on any error.
+        """
+        self.dropped = {}
+        if not self.enabled:
+            return list(fallback)
+        keep = list(keep)
+        try:
+            uni = self.universe()
+            quotes = self.snapshot(list(uni))
+        except Exception as e:
+            logging.warning(f"[PREFILTER] scan failed ({e}) — using fixed list")
+            return list(fallback)
+
+        survivors = []
+        for inst, loc in uni.items():
+            reason = self.judge(quotes.get(inst), 10.0 ** loc)
+            if reason is None or inst in keep:
+                survivors.append(inst)
+            else:
+                self.dropped[inst] = reason
+        survivors += [k for k in keep if k not in survivors]
+        if self.instruments is not None:
+            self.instruments.observe({i: q.mid for i, q in quotes.items()})
+        self.state["mids"] = {i: q.mid for i, q in quotes.items()}
+        self.state["scanned_at"] = datetime.now(timezone.utc).isoformat()
+        self._write()
+        logging.info(f"[PREFILTER] {len(survivors)}/{len(uni)} instruments survive "
+                     f"({summary(self.dropped)})")
+        return survivors
+
+
+def summary(dropped: Dict[str, str]) -> str:
+    counts: Dict[str, int] = {}
+    for reason in dropped.values():
+        k = reason.split()[0]
+        counts[k] = counts.get(k, 0) + 1
+    return ", ".join(f"{k.lower()} {n}" for k, n in sorted(counts.items())) or "none dropped"
+
+
+def open_prefilter(session, rest_url: str, account_id: str, component: str, mode: str,
+                   max_spread_pips: float, enabled: bool,
+                   state_dir: Path = STATE_DIR, instruments=None) -> Prefilter:
+    return Prefilter(session, rest_url, account_id,
+                     Path(state_dir) / f"prefilter_{component}_{mode.lower()}.json",
+                     max_spread_pips, enabled, instruments=instruments)
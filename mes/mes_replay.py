@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_replay.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Offline replay plumbing shared by the MES backtester and the
+#   differential version harness:
+#     • CandleStore  — stored OANDA candles (one CSV per inst/TF)
+#     • ReplayFeed   — serves "what OANDA would have returned" at a
+#                      simulated clock, in oanda_get_candles() schema
+#     • load_strategy — imports ANY mes_scalp.py / mes_swing.py file
+#                      with its OANDA I/O rebound to a ReplayFeed
+#     • AccountSnapshots — recorded NAV / open positions over time
+#     • record       — downloads history into a CandleStore
+#
+# Design goals:
+#   • Strategy code runs unmodified — only its I/O functions are
+#     swapped, so replays exercise the real decision logic
+#   • No network at replay time, no writes outside a scratch dir
+#   • Fast slicing: candles held as NumPy arrays, frames built on demand
+# ============================================================
+
+import bisect
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MES_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes"))) / "candles"
+
+GRANULARITY_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D": 86400}
+REPLAY_COUNT = 300          # default depth; strategies pass their planned count
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+# ============================================================
+# CANDLE STORE
+# ============================================================
+class Series:
+    """One instrument/granularity as arrays; start times in epoch ns."""
+
+    def __init__(self, df: pd.DataFrame, granularity: str):
+        self.granularity = granularity
+        self.start = df.index.as_unit("ns").asi8
+        self.close_time = self.start + GRANULARITY_SECONDS[granularity] * 1_000_000_000
+        self.values = df[COLUMNS].to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.start)
+
+    def available(self, now_ns: int) -> int:
+        """Number of candles complete at now_ns."""
+        return int(np.searchsorted(self.close_time, now_ns, side="right"))
+
+    def frame(self, hi: int, count: int) -> pd.DataFrame:
+        lo = max(0, hi - count)
+        v = self.values[lo:hi]
+        df = pd.DataFrame(v[:, :4], columns=COLUMNS[:4],
+                          index=pd.to_datetime(self.start[lo:hi], unit="ns", utc=True).rename("time"))
+        df["volume"] = v[:, 4].astype(int)
+        return df
+
+
+class CandleStore:
+    """DATA_DIR/<INST>_<TF>.csv with columns time,open,high,low,close,volume."""
+
+    def __init__(self, root: Path = DATA_DIR):
+        self.root = Path(root)
+        self._series: Dict[tuple, Series] = {}
+
+    def path(self, inst: str, tf: str) -> Path:
+        return self.root / f"{inst}_{tf}.csv"
+
+    def instruments(self, tf: str = "M1") -> List[str]:
+        return sorted(p.name[: -len(f"_{tf}.csv")] for p in self.root.glob(f"*_{tf}.csv"))
+
+    def load(self, inst: str, tf: str) -> Series:
+        key = (inst, tf)
+        if key not in self._series:
+            df = pd.read_csv(self.path(inst, tf))
+            df.index = pd.to_datetime(df.pop("time"), utc=True).rename("time")
+            self._series[key] = Series(df.sort_index(), tf)
+        return self._series[key]
+
+    def save(self, inst: str, tf: str, df: pd.DataFrame):
+        self.root.mkdir(parents=True, exist_ok=True)
+        out = df[COLUMNS].copy()
+        out.index = out.index.tz_convert("UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+        out.to_csv(self.path(inst, tf), index_label="time")
+
+
+class AccountSnapshots:
+    """
+    Recorded account state, one JSON line per observation:
+      {"time": iso, "nav": float, "positions": {pair: units}}
+    at(t) returns the latest snapshot taken at or before t.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.times: List[datetime] = []
+        self.rows: List[dict] = []
+        if path and Path(path).exists():
+            rows = [json.loads(l) for l in Path(path).read_text().splitlines() if l.strip()]
+            rows.sort(key=lambda r: r["time"])
+            self.rows = rows
+            self.times = [datetime.fromisoformat(r["time"]) for r in rows]
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def at(self, t: datetime) -> Optional[dict]:
+        i = bisect.bisect_right(self.times, t)
+        return self.rows[i - 1] if i else None
+
+    @staticmethod
+    def append(path: Path, nav: float, positions: Dict[str, float],
+               t: Optional[datetime] = None):
+        row = {"time": (t or datetime.now(timezone.utc)).isoformat(),
+               "nav": nav, "positions": positions}
+        with Path(path).open("a") as f:
+            f.write(json.dumps(row) + "\n")
+
+
+# ============================================================
+# REPLAY FEED
+# ============================================================
+class ReplayFeed:
+    """
+    Answers the strategy's OANDA calls as of self.now.
+    nav / positions come from the caller (simulator or recorded
+    account snapshots); closes are recorded, never sent.
+    """
+
+    def __init__(self, store: CandleStore, nav: float = 10_000.0):
+        self.store = store
+        self.now: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        self.nav = nav
+        self.positions: Dict[str, float] = {}
+        self.closes: List[str] = []
+        self.requests = 0
+
+    def set_time(self, now: datetime, account: Optional[AccountSnapshots] = None):
+        """Advance the clock; recorded account state wins when available."""
+        self.now = now
+        self.closes = []
+        snap = account.at(now) if account else None
+        if snap:
+            self.nav = float(snap["nav"])
+            self.positions = {k: float(v) for k, v in snap["positions"].items()}
+
+    def now_ns(self) -> int:
+        return int(self.now.timestamp() * 1_000_000_000)
+
+    def candles(self, inst: str, tf: str, count: int = REPLAY_COUNT) -> pd.DataFrame:
+        self.requests += 1
+        s = self.store.load(inst, tf)
+        hi = s.available(self.now_ns())
+        if hi == 0:
+            raise RuntimeError("No candles")
+        return s.frame(hi, count)
+
+    def account_nav(self) -> float:
+        return self.nav
+
+    def open_positions(self) -> Dict[str, float]:
+        return dict(self.positions)
+
+    def close_position(self, pair: str):
+        self.closes.append(pair)
+
+    def execute_orders(self, orders) -> list:
+        """mes_orders specs are recorded, never sent (no fills)."""
+        self.closes.extend(o.instrument for o in orders if o.kind == "CLOSE")
+        return [None] * len(orders)
+
+
+# ============================================================
+# STRATEGY LOADING
+# ============================================================
+def replay_env(scratch: Path) -> Dict[str, str]:
+    """Credentials the strategies demand at import, pointed nowhere."""
+    return {
+        "OANDA_API_TOKEN": "replay",
+        "OANDA_ACCOUNT_ID": "replay",
+        "OANDA_API_URL": "http://replay.invalid/fxpractice",
+        "MES_SWING_ARMED": "NO",
+        "MES_SCALP_PREFILTER": "OFF",
+        "MES_SWING_PREFILTER": "OFF",
+        "MES_RESAMPLE": "OFF",
+        "MES_DEADLINE": "OFF",
+        "MES_LEDGER": "OFF",
+        "FOREX_TOKEN": "",
+        "TELEGRAM_ID": "",
+        "HOME": str(scratch),
+        "MES_STATE_DIR": str(scratch),
+    }
+
+
+def load_strategy(path: Path, feed: ReplayFeed, name: Optional[str] = None):
+    """
+    Import a strategy file in replay mode and rebind its OANDA I/O.
+    Each call yields an independent module object, so two versions
+    of the same file can live in one process.
+    """
+    path = Path(path).resolve()
+    scratch = Path(tempfile.mkdtemp(prefix="mes_replay_"))
+    os.environ.update(replay_env(scratch))
+    for d in (str(MES_DIR), str(path.parent)):
+        if d not in sys.path:
+            sys.path.insert(0, d)
+
+    mod_name = name or f"replay_{path.stem}_{abs(hash(str(path)))}"
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rebind = {
+        "oanda_get_candles": feed.candles,
+        "oanda_get_account_nav": feed.account_nav,
+        "oanda_get_open_positions": feed.open_positions,
+        "oanda_open_positions": feed.open_positions,
+        "oanda_close_position": feed.close_position,
+        "execute_orders": feed.execute_orders,
+        "telegram": lambda *a, **k: None,
+        "write_diag": lambda *a, **k: None,
+        "record_observations": lambda *a, **k: None,
+        "refresh_instruments": lambda *a, **k: None,   # defaults + observed closes
+    }
+    for attr, fn in rebind.items():
+        if hasattr(mod, attr):
+            setattr(mod, attr, fn)
+
+    cache = getattr(mod, "htf_cache", None)
+    if cache is not None:
+        cache.entries.clear()
+        cache.save = lambda: None
+    m1_state = getattr(mod, "m1_state", None)
+    if m1_state is not None:
+        m1_state.entries.clear()            # in-memory only, follows the replay clock
+        m1_state.save = lambda: None
+    tracer = getattr(mod, "tracer", None)
+    if tracer is not None:
+        tracer.save = lambda: None
+    for clocked in ("mes_htf_cache", "mes_incremental"):
+        if clocked in sys.modules:
+            sys.modules[clocked].utc_now = lambda: feed.now
+    return mod
+
+
+# ============================================================
+# CLOCK HELPERS
+# ============================================================
+def decision_times(series: Series, start: datetime, end: datetime,
+                   every_min: int = 1, hours: Optional[range] = None) -> List[datetime]:
+    """
+    Candle close times in [start, end) on an every_min grid,
+    optionally restricted to UTC hours (mirrors the timer calendars).
+    """
+    t = pd.to_datetime(series.close_time, unit="ns", utc=True)
+    t = t[(t >= pd.Timestamp(start)) & (t < pd.Timestamp(end))]
+    t = t[(t.minute % every_min) == 0]
+    if hours is not None:
+        t = t[np.isin(t.hour, list(hours))]
+    return list(t.to_pydatetime())
+
+
+# ============================================================
+# RECORDING (network — run once, replay forever)
+# ============================================================
+def record(store: CandleStore, inst: str, tf: str, start: datetime, end: datetime,
+           get: Optional[Callable] = None):
+    """Page OANDA candles [start, end) into the store (5000 per request)."""
+    import requests
+
+    url = os.environ["OANDA_API_URL"].rstrip("/")
+    headers = {"Authorization": f"Bearer {os.environ['OANDA_API_TOKEN']}"}
+    get = get or requests.Session().get
+    step = timedelta(seconds=GRANULARITY_SECONDS[tf] * 5000)
+
+    rows = []
+    cursor = start
+    while cursor < end:
+        r = get(
+            f"{url}/v3/instruments/{inst}/candles",
+            params={
+                "granularity": tf,
+                "price": "M",
+                "from": cursor.isoformat(),
+                "to": min(cursor + step, end).isoformat(),
+            },
+            headers=headers,
+            timeout=30,
+        )
+        r.raise_for_status()
+        for c in r.json().get("candles", []):
+            if c.get("complete"):
+                m = c["mid"]
+                rows.append((c["time"], float(m["o"]), float(m["h"]),
+                             float(m["l"]), float(m["c"]), int(c.get("volume", 0))))
+        cursor += step
+
+    df = pd.DataFrame(rows, columns=["time"] + COLUMNS)
+    df.index = pd.to_datetime(df.pop("time"), utc=True)
+    df = df[~df.index.duplicated()].sort_index()
+    store.save(inst, tf, df)
+    return len(df)
+
+
+# ============================================================
+# DECISION CAPTURE (version-agnostic)
+# ============================================================
+class _SignalLog(logging.Handler):
+    """Picks '<INST>: continuation conditions met' out of older scalp builds."""
+
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.hits: List[str] = []
+
+    def emit(self, record):
+        msg = record.getMessage()
+        if msg.endswith(": continuation conditions met"):
+            self.hits.append(msg.split(":", 1)[0])
+
+
+def scalp_decisions(mod, feed: ReplayFeed, insts: List[str]) -> Dict[str, dict]:
+    """
+    Run the scalp main_cycle() for insts at feed.now.
+    Returns {inst: {"action", "direction", "size"}} for every signal.
+    Builds with write_diag() report direction and units directly; older
+    builds only log the signal, so direction falls back to H1 structure.
+    """
+    mod.INSTRUMENTS = list(insts)
+    captured: Dict[str, dict] = {}
+    has_diag = hasattr(mod, "write_diag")
+    if has_diag:
+        mod.write_diag = lambda diags: captured.update(diags)
+
+    root = logging.getLogger()
+    handler = _SignalLog()
+    level = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    for h in root.handlers:
+        if h is not handler:
+            h.setLevel(logging.WARNING)
+    try:
+        mod.main_cycle()
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+
+    if has_diag:
+        return {
+            inst: {"action": d["decision"], "direction": d["direction"],
+                   "size": int(d.get("exec_units") or 0)}
+            for inst, d in captured.items()
+            if d.get("decision") not in (None, "SKIPPED")
+        }
+    out = {}
+    for inst in handler.hits:
+        h1 = feed.candles(inst, "H1").iloc[-1]
+        out[inst] = {"action": "SIGNAL",
+                     "direction": "BUY" if h1["close"] > h1["open"] else "SELL",
+                     "size": 0}
+    return out
+
+
+def swing_decision(mod, feed: ReplayFeed, pair: str) -> Optional[dict]:
+    """evaluate_swing() at feed.now as {"action", "direction", "size"}."""
+    dec = mod.evaluate_swing(pair, feed.nav, feed.open_positions())
+    if not dec:
+        return None
+    return {"action": dec.action, "direction": dec.direction,
+            "size": int(getattr(dec, "units_final", 0) or 0)}
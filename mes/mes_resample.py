@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_resample.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Local multi-timeframe candles for MES.
+#   One stored M1 mid series per instrument is kept current with a
+#   single incremental request per cycle; M5 / M15 / H1 / H4 are
+#   built from it with vectorized NumPy group reductions (first /
+#   max / min / last / sum per bucket) instead of separate OANDA
+#   requests, so every timeframe is cut from the same bars.
+#   Bucket alignment follows OANDA's candle conventions:
+#     • sub-daily granularities up to H1 start on UTC multiples
+#     • H2 … D start at dailyAlignment (17:00) in alignmentTimezone
+#       (America/New_York) plus whole periods — H4 opens at 21:00 /
+#       01:00 / … UTC in summer and 22:00 / 02:00 / … in winter
+#     • buckets without ticks produce no candle; a bucket is complete
+#       once the store is synced past its end
+#
+# Design goals:
+#   • Opt-in (MES_RESAMPLE=ON); callers fall back to an OANDA fetch
+#     whenever the store does not cover the requested lookback
+#   • Same DataFrame schema as oanda_get_candles()
+#   • Store per MODE under bars/<mode>/<INST>_M1.npz, trimmed to
+#     RETAIN_DAYS, flock + atomic replace (scalp + swing share it)
+#   • `verify` compares resampled bars with OANDA-provided ones
+#
+# Usage:
+#   mes_resample.py verify --data ~/leo-services/mes/candles
+#   mes_resample.py verify --data DIR --instruments EUR_USD --tf H1 H4
+# ============================================================
+
+import argparse
+import fcntl
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+STATE_DIR = Path(os.getenv("MES_STATE_DIR", str(Path.home() / "leo-services" / "mes")))
+
+ENABLED = os.getenv("MES_RESAMPLE", "OFF").upper() == "ON"
+RETAIN_DAYS = int(os.getenv("MES_BARS_RETAIN_DAYS", "35"))    # H4 × 126 bars + weekends
+
+# OANDA candle defaults (GET /v3/instruments/{inst}/candles)
+DAILY_ALIGNMENT = 17
+ALIGNMENT_TZ = "America/New_York"
+
+PERIOD_S: Dict[str, int] = {
+    "M1": 60, "M2": 120, "M4": 240, "M5": 300, "M10": 600, "M15": 900, "M30": 1800,
+    "H1": 3600, "H2": 7200, "H3": 10800, "H4": 14400, "H6": 21600, "H8": 28800,
+    "H12": 43200, "D": 86400,
+}
+PAGE = 5000                       # OANDA max candles per request
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+# ============================================================
+# RESAMPLING (pure NumPy / pandas, no state)
+# ============================================================
+def bucket_starts(t: np.ndarray, tf: str, daily_alignment: int = DAILY_ALIGNMENT,
+                  tz: str = ALIGNMENT_TZ) -> np.ndarray:
+    """Start (epoch s, UTC) of the tf candle containing each time in t."""
+    p = PERIOD_S[tf]
+    t = np.asarray(t, dtype=np.int64)
+    if p <= 3600:
+        return t // p * p
+    # daily-aligned: offset of alignmentTimezone at each bar (DST aware);
+    # DST switches fall on weekends, so bar and bucket share the offset
+    utc = pd.DatetimeIndex(t * 1_000_000_000, tz="UTC")
+    off = (utc.tz_convert(tz).tz_localize(None).asi8 - utc.tz_localize(None).asi8) // 1_000_000_000
+    anchor = daily_alignment * 3600
+    local = t + off
+    return (local - anchor) // p * p + anchor - off
+
+
+def resample(t: np.ndarray, values: np.ndarray, tf: str, synced_to: Optional[int] = None,
+             daily_alignment: int = DAILY_ALIGNMENT,
+             tz: str = ALIGNMENT_TZ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Group base bars (start times t, sorted; values (n, 5) OHLCV) into tf
+    candles. Returns (starts, values) of the COMPLETE candles only —
+    complete means synced_to (default: end of the last base bar) is
+    at or past the bucket's end.
+    """
+    if len(t) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5))
+    b = bucket_starts(t, tf, daily_alignment, tz)
+    first = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    last = np.r_[first[1:], len(b)] - 1
+    out = np.column_stack([
+        values[first, 0],
+        np.maximum.reduceat(values[:, 1], first),
+        np.minimum.reduceat(values[:, 2], first),
+        values[last, 3],
+        np.add.reduceat(values[:, 4], first),
+    ])
+    starts = b[first]
+    if synced_to is None:
+        synced_to = int(t[-1]) + PERIOD_S["M1"]
+    done = starts + PERIOD_S[tf] <= synced_to
+    return starts[done], out[done]
+
+
+def to_frame(starts: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """oanda_get_candles() schema: UTC DatetimeIndex 'time', OHLC float, volume int."""
+    df = pd.DataFrame(values[:, :4], columns=COLUMNS[:4],
+                      index=pd.to_datetime(starts, unit="s", utc=True).rename("time"))
+    df["volume"] = values[:, 4].astype(int)
+    return df
+
+
+# ============================================================
+# M1 BASE STORE
+# ============================================================
+def _rfc3339(t: int) -> str:
+    return datetime.fromtimestamp(t, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class BarStore:
+    """
+    Stored M1 mid bars per instrument, synced incrementally from OANDA.
+    candles(inst, tf, count) serves any granularity from the store.
+    """
+
+    def __init__(self, session, rest_url: str, root: Path, enabled: bool = ENABLED):
+        self.session = session
+        self.rest_url = rest_url.rstrip("/")
+        self.root = Path(root)
+        self.enabled = enabled
+        self.series: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}   # t, values, synced_to
+        self._resampled: Dict[Tuple[str, str], Tuple[int, np.ndarray, np.ndarray]] = {}
+        self.requests = 0
+
+    def path(self, inst: str) -> Path:
+        return self.root / f"{inst}_M1.npz"
+
+    # ---------------- persistence ----------------
+    def _load(self, inst: str) -> Tuple[np.ndarray, np.ndarray, int]:
+        try:
+            with np.load(self.path(inst)) as z:
+                return z["t"], z["v"], int(z["synced_to"])
+        except Exception:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5)), 0
+
+    def _save(self, inst: str, t: np.ndarray, v: np.ndarray, synced_to: int):
+        tmp = self.path(inst).with_suffix(".tmp.npz")
+        np.savez(tmp, t=t, v=v, synced_to=np.int64(synced_to))
+        os.replace(tmp, self.path(inst))
+
+    # ---------------- OANDA ----------------
+    def _fetch(self, inst: str, since: int, now: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Complete M1 bars starting at or after `since`, paged by 5000."""
+        ts, vs = [], []
+        cursor = since
+        while cursor < now:
+            r = self.session.get(
+                f"{self.rest_url}/v3/instruments/{inst}/candles",
+                params={"granularity": "M1", "price": "M", "from": _rfc3339(cursor),
+                        "count": PAGE},
+                timeout=30,
+            )
+            self.requests += 1
+            r.raise_for_status()
+            rows = [c for c in r.json().get("candles", []) if c.get("complete")]
+            if not rows:
+                break
+            t = pd.to_datetime([c["time"] for c in rows], utc=True).as_unit("s").asi8
+            ts.append(t)
+            vs.append(np.array([[float(c["mid"]["o"]), float(c["mid"]["h"]), float(c["mid"]["l"]),
+                                 float(c["mid"]["c"]), int(c.get("volume", 0))] for c in rows]))
+            if len(rows) < PAGE - 1:
+                break
+            cursor = int(t[-1]) + 60
+        if not ts:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5))
+        return np.concatenate(ts), np.concatenate(vs)
+
+    # ---------------- sync ----------------
+    def sync(self, instruments: Iterable[str], now: Optional[float] = None):
+        """
+        Append the M1 bars closed since the last sync (one request each;
+        none when another process already synced this minute). An
+        instrument that fails to sync is not covered this cycle.
+        """
+        self.series = {}
+        if not self.enabled:
+            return
+        now = int(now if now is not None else time.time())
+        minute = now // 60 * 60                       # every bar before this is complete
+        floor = minute - RETAIN_DAYS * 86400
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "M1.lock", "a+") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                for inst in instruments:
+                    t, v, synced = self._load(inst)
+                    if synced < minute:
+                        since = int(t[-1]) + 60 if len(t) else floor
+                        try:
+                            nt, nv = self._fetch(inst, max(since, floor), minute)
+                        except Exception as e:
+                            logging.warning(f"[BARS] {inst} sync failed ({e}) — OANDA candles this cycle")
+                            continue
+                        keep = (nt > (t[-1] if len(t) else -1)) & (nt < minute)
+                        t = np.concatenate([t, nt[keep]])
+                        v = np.concatenate([v, nv[keep]])
+                        cut = np.searchsorted(t, floor)
+                        t, v, synced = t[cut:], v[cut:], minute
+                        self._save(inst, t, v, synced)
+                    self.series[inst] = (t, v, synced)
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    # ---------------- reads ----------------
+    def bars(self, inst: str, tf: str) -> Tuple[np.ndarray, np.ndarray]:
+        t, v, synced = self.series[inst]
+        if tf == "M1":
+            return t, v
+        key = (inst, tf)
+        hit = self._resampled.get(key)
+        if hit is None or hit[0] != synced:
+            hit = (synced, *resample(t, v, tf, synced))
+            self._resampled[key] = hit
+        return hit[1], hit[2]
+
+    def covers(self, inst: str, tf: str, count: int) -> bool:
+        """Store synced this cycle and at least `count` complete tf bars deep."""
+        if not self.enabled or inst not in self.series:
+            return False
+        return len(self.bars(inst, tf)[0]) >= count
+
+    def candles(self, inst: str, tf: str, count: int) -> pd.DataFrame:
+        starts, values = self.bars(inst, tf)
+        if len(starts) == 0:
+            raise RuntimeError("No candles")
+        return to_frame(starts[-count:], values[-count:])
+
+
+def open_bars(session, rest_url: str, mode: str, enabled: bool = ENABLED,
+              state_dir: Path = STATE_DIR) -> BarStore:
+    return BarStore(session, rest_url, Path(state_dir) / "bars" / mode.lower(), enabled)
+
+
+# ============================================================
+# VERIFY (resampled vs OANDA-provided bars)
+# ============================================================
+def verify(store, inst: str, tf: str, daily_alignment: int = DAILY_ALIGNMENT,
+           tz: str = ALIGNMENT_TZ) -> dict:
+    """
+    Compare bars resampled from store's M1 with store's own tf bars
+    (a mes_replay CandleStore recorded from OANDA) over the M1 span.
+    """
+    m1 = store.load(inst, "M1")
+    ref = store.load(inst, tf)
+    t = m1.start // 1_000_000_000
+    starts, values = resample(t, m1.values, tf, int(t[-1]) + 60, daily_alignment, tz)
+    rt = ref.start // 1_000_000_000
+    lo, hi = max(t[0], rt[0]), min(t[-1], rt[-1])
+    # first bucket may be partial in the M1 recording
+    lo = int(bucket_starts(np.array([lo]), tf, daily_alignment, tz)[0]) + PERIOD_S[tf]
+    mine = {int(s): row for s, row in zip(starts, values) if lo <= s <= hi}
+    theirs = {int(s): row for s, row in zip(rt, ref.values) if lo <= s <= hi}
+    common = sorted(set(mine) & set(theirs))
+    if not common:
+        return {"instrument": inst, "tf": tf, "bars": 0, "missing": len(theirs),
+                "extra": len(mine), "ohlc_mismatch": 0, "max_abs_diff": 0.0, "volume_mismatch": 0}
+    a = np.array([mine[s] for s in common])
+    b = np.array([theirs[s] for s in common])
+    diff = np.abs(a[:, :4] - b[:, :4])
+    return {
+        "instrument": inst, "tf": tf, "bars": len(common),
+        "missing": len(set(theirs) - set(mine)), "extra": len(set(mine) - set(theirs)),
+        "ohlc_mismatch": int((diff.max(axis=1) > 1e-9).sum()),
+        "max_abs_diff": float(diff.max()),
+        "volume_mismatch": int((a[:, 4] != b[:, 4]).sum()),
+    }
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    ap = argparse.ArgumentParser(description="MES local candle resampler")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    v = sub.add_parser("verify", help="resampled M1 vs recorded OANDA bars (mes_replay record)")
+    v.add_argument("--data", type=Path, default=STATE_DIR / "candles")
+    v.add_argument("--instruments", nargs="+")
+    v.add_argument("--tf", nargs="+", default=["M5", "M15", "H1", "H4"])
+    v.add_argument("--daily-alignment", type=int, default=DAILY_ALIGNMENT)
+    v.add_argument("--tz", default=ALIGNMENT_TZ)
+    args = ap.parse_args()
+
+    from mes_replay import CandleStore
+    cs = CandleStore(args.data)
+    failed = False
+    for inst in args.instruments or cs.instruments("M1"):
+        for tf in args.tf:
+            if not cs.path(inst, tf).exists():
+                continue
+            r = verify(cs, inst, tf, args.daily_alignment, args.tz)
+            ok = r["bars"] and not (r["missing"] or r["extra"] or r["ohlc_mismatch"])
+            failed |= not ok
+            print(f"{inst:8} {tf:4} bars {r['bars']:6}  missing {r['missing']:4}  extra {r['extra']:4}  "
+                  f"ohlc≠ {r['ohlc_mismatch']:4} (max {r['max_abs_diff']:.2e})  "
+                  f"vol≠ {r['volume_mismatch']:4}  {'OK' if ok else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_risk.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Monte Carlo risk simulator for MES sizing parameters.
+#   Trade outcomes from a backtest (mes_backtest.py --out) are turned
+#   into R multiples and bootstrapped into equity paths:
+#     • scalp — every trade is re-scored for each MAX_SL_PIPS /
+#               TP_PIPS pair from its M1 excursions after entry
+#     • swing — R = pips / (SL_ATR_MULT × ATR14(H1) at entry)
+#   Risk actually taken per trade is what mes_sizing would size:
+#     min(risk_pct, max_margin_frac × SL distance / (entry × marginRate))
+#   For every (risk_pct, max_margin_frac, sl, tp) set it reports the
+#   final-return median, max drawdown percentiles, P(loss) and the
+#   risk of ruin (max drawdown ≥ --ruin).
+#
+# Design goals:
+#   • One NumPy operation per parameter set over all paths
+#     (paths × trades arrays, chunked to bound memory) — no Python
+#     loop per path or per trade
+#   • Common random numbers: every parameter set sees the same
+#     bootstrap draws, so differences come from the parameters
+#   • Reads the same CandleStore as mes_replay / mes_backtest
+#
+# Known limits:
+#   • The observation log (mes_observations) records signals but no
+#     outcome, so trades come from a backtest CSV
+#   • Trades are drawn independently; re-scored scalp exits keep the
+#     backtest's entry times (overlap with one position per pair is
+#     not re-evaluated)
+#   • Exits not reached within --horizon M1 bars are marked to market
+#
+# Usage:
+#   mes_backtest.py scalp --from 2025-01-01 --to 2026-01-01 --out scalp.csv
+#   mes_risk.py scalp --trades scalp.csv --paths 100000 --days 30 \
+#       --risk 0.005 0.008 0.02 --margin-frac 0.1 0.2 --sl 4 5 6 --tp 3 3.5 5
+#   mes_risk.py swing --trades swing.csv --risk 0.0025 0.01 0.02
+# ============================================================
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from mes_backtest import pip_size
+from mes_replay import DATA_DIR, CandleStore
+
+# ------------------------------------------------------------
+# DEFAULTS (current strategy constants)
+# ------------------------------------------------------------
+DEFAULTS = {
+    "scalp": {"risk": [0.008, 0.02], "margin_frac": [0.10, 0.20], "sl": [5.0], "tp": [3.5]},
+    "swing": {"risk": [0.0025, 0.02], "margin_frac": [0.10, 0.20], "sl": [None], "tp": [None]},
+}
+SWING_ATR_PERIOD = 14
+SWING_SL_ATR_MULT = 1.5
+MARGIN_RATE = 0.0333              # 30:1 retail FX (per-instrument rates in mes_instruments)
+HORIZON_BARS = 240                # M1 bars a scalp exit may take before mark-to-market
+CHUNK_PATHS = 4096                 # paths per array (cache sized)
+
+
+# ============================================================
+# TRADE SAMPLE
+# ============================================================
+@dataclass
+class Sample:
+    instruments: np.ndarray        # (n,) str
+    sign: np.ndarray               # (n,) +1 BUY / -1 SELL
+    entry: np.ndarray              # (n,) price
+    entry_ns: np.ndarray           # (n,) epoch ns
+    pips: np.ndarray               # (n,) backtest result
+    span_days: float
+
+    def __len__(self):
+        return len(self.pips)
+
+
+def load_trades(path: Path, instruments: Optional[Sequence[str]] = None) -> Sample:
+    """Closed trades from a mes_backtest.py --out CSV (OPEN rows dropped)."""
+    with Path(path).open() as f:
+        rows = [r for r in csv.DictReader(f)
+                if r["outcome"] != "OPEN" and (not instruments or r["instrument"] in instruments)]
+    if not rows:
+        raise SystemExit(f"{path}: no closed trades")
+    t = np.array([datetime.fromisoformat(r["entry_time"]).timestamp() for r in rows])
+    return Sample(
+        instruments=np.array([r["instrument"] for r in rows]),
+        sign=np.array([1.0 if r["direction"] == "BUY" else -1.0 for r in rows]),
+        entry=np.array([float(r["entry"]) for r in rows]),
+        entry_ns=(t * 1e9).astype(np.int64),
+        pips=np.array([float(r["pips"]) for r in rows]),
+        span_days=max(1.0, (t.max() - t.min()) / 86400),
+    )
+
+
+def excursions(store: CandleStore, s: Sample, horizon: int = HORIZON_BARS):
+    """
+    Favorable / adverse excursion (running max, pips) and close (pips)
+    over the M1 bars after each entry — (n, horizon) arrays, NaN-padded
+    where the data ends.
+    """
+    n = len(s)
+    fav = np.full((n, horizon), np.nan)
+    adv = np.full((n, horizon), np.nan)
+    close = np.full((n, horizon), np.nan)
+    for inst in np.unique(s.instruments):
+        m1 = store.load(inst, "M1")
+        rows = np.flatnonzero(s.instruments == inst)
+        start = np.searchsorted(m1.close_time, s.entry_ns[rows], side="right")
+        idx = start[:, None] + np.arange(horizon)[None, :]
+        ok = idx < len(m1)
+        idx = np.minimum(idx, len(m1) - 1)
+        pip = pip_size(inst)
+        sign = s.sign[rows, None]
+        entry = s.entry[rows, None]
+        hi, lo, c = m1.values[idx, 1], m1.values[idx, 2], m1.values[idx, 3]
+        up = np.where(sign > 0, hi - entry, entry - lo) / pip
+        down = np.where(sign > 0, entry - lo, hi - entry) / pip
+        fav[rows] = np.where(ok, np.maximum.accumulate(up, axis=1), np.nan)
+        adv[rows] = np.where(ok, np.maximum.accumulate(down, axis=1), np.nan)
+        close[rows] = np.where(ok, sign * (c - entry) / pip, np.nan)
+    return fav, adv, close
+
+
+def rescore(fav: np.ndarray, adv: np.ndarray, close: np.ndarray,
+            sl: float, tp: float) -> np.ndarray:
+    """
+    Pips per trade for one SL / TP pair (same rule as
+    mes_backtest.simulate_exit: SL wins a bar that touches both).
+    """
+    horizon = fav.shape[1]
+    hit_sl = adv >= sl
+    hit_tp = fav >= tp
+    i_sl = np.where(hit_sl.any(axis=1), hit_sl.argmax(axis=1), horizon)
+    i_tp = np.where(hit_tp.any(axis=1), hit_tp.argmax(axis=1), horizon)
+    last = np.where(np.isnan(close), -np.inf, np.arange(horizon)).argmax(axis=1)
+    mtm = close[np.arange(len(close)), last]
+    return np.where(i_sl <= i_tp, np.where(i_sl < horizon, -sl, mtm), tp)
+
+
+def swing_stops(store: CandleStore, s: Sample,
+                period: int = SWING_ATR_PERIOD, mult: float = SWING_SL_ATR_MULT) -> np.ndarray:
+    """SL distance in pips per trade — mes_swing.entry_levels() at entry time."""
+    out = np.full(len(s), np.nan)
+    for inst in np.unique(s.instruments):
+        h1 = store.load(inst, "H1")
+        rows = np.flatnonzero(s.instruments == inst)
+        hi = np.searchsorted(h1.close_time, s.entry_ns[rows], side="right")
+        idx = hi[:, None] - period + np.arange(period)[None, :]
+        rng = h1.values[np.maximum(idx, 0), 1] - h1.values[np.maximum(idx, 0), 2]
+        atr = np.where((idx >= 0).all(axis=1), rng.mean(axis=1), np.nan)
+        out[rows] = mult * atr / pip_size(inst)
+    return out
+
+
+# ============================================================
+# SIMULATION
+# ============================================================
+@dataclass
+class Result:
+    risk_pct: float
+    margin_frac: float
+    sl: Optional[float]
+    tp: Optional[float]
+    mean_risk: float               # risk per trade after the margin cap
+    final_p50: float
+    final_p5: float
+    dd_p50: float
+    dd_p95: float
+    dd_p99: float
+    p_loss: float
+    p_ruin: float
+
+
+def draws(n_trades: int, n_sample: int, paths: int, seed: int,
+          chunk: int = CHUNK_PATHS) -> Iterator[np.ndarray]:
+    """Bootstrap index chunks (paths × trades), identical for every parameter set."""
+    rng = np.random.default_rng(seed)
+    for lo in range(0, paths, chunk):
+        yield rng.integers(0, n_sample, size=(min(chunk, paths - lo), n_trades), dtype=np.int32)
+
+
+def paths_stats(r: np.ndarray, idx_chunks: List[np.ndarray], ruin: float) -> Dict[str, np.ndarray]:
+    """
+    r: per-trade equity return (risk × R). Log-equity paths are a
+    cumsum over gathered returns; drawdown from its running maximum.
+    """
+    logr = np.log1p(np.maximum(r, -0.999999)).astype(np.float32)
+    finals, dds = [], []
+    for idx in idx_chunks:
+        eq = logr[idx]
+        np.cumsum(eq, axis=1, out=eq)
+        peak = np.maximum.accumulate(eq, axis=1)
+        np.maximum(peak, 0.0, out=peak)           # starting equity is a peak too
+        np.subtract(eq, peak, out=peak)
+        dds.append(-np.expm1(peak.min(axis=1)))
+        finals.append(np.expm1(eq[:, -1]))
+    final, dd = np.concatenate(finals), np.concatenate(dds)
+    return {"final": final, "dd": dd, "ruin": dd >= ruin}
+
+
+def simulate(kind: str, s: Sample, store: Optional[CandleStore], risks: Sequence[float],
+             fracs: Sequence[float], sls: Sequence[Optional[float]], tps: Sequence[Optional[float]],
+             paths: int, n_trades: int, ruin: float, margin_rate: float = MARGIN_RATE,
+             seed: int = 0, horizon: int = HORIZON_BARS) -> List[Result]:
+    idx_chunks = list(draws(n_trades, len(s), paths, seed))
+
+    # R multiple per trade for every SL / TP pair
+    outcomes = {}
+    if kind == "scalp":
+        if list(sls) != DEFAULTS["scalp"]["sl"] or list(tps) != DEFAULTS["scalp"]["tp"]:
+            if store is None:
+                raise SystemExit("scalp: re-scoring SL / TP needs M1 candles (--data)")
+            fav, adv, close = excursions(store, s, horizon)
+            for sl, tp in itertools.product(sls, tps):
+                outcomes[(sl, tp)] = (rescore(fav, adv, close, sl, tp), np.full(len(s), sl))
+        else:
+            sl, tp = DEFAULTS["scalp"]["sl"][0], DEFAULTS["scalp"]["tp"][0]
+            outcomes[(sl, tp)] = (s.pips, np.full(len(s), sl))
+    else:
+        stop = swing_stops(store, s) if store is not None else np.full(len(s), np.nan)
+        if np.isnan(stop).all():
+            raise SystemExit("swing: SL distances need H1 candles (--data)")
+        outcomes[(None, None)] = (s.pips, np.where(np.isnan(stop), np.nanmedian(stop), stop))
+
+    pips_ = {inst: pip_size(inst) for inst in np.unique(s.instruments)}
+    pip = np.array([pips_[i] for i in s.instruments])
+
+    out: List[Result] = []
+    seen: Dict[bytes, Dict[str, np.ndarray]] = {}   # risk above the cap → same paths
+    for (sl, tp), (pips, stop) in outcomes.items():
+        R = pips / stop
+        cap_risk = stop * pip / (s.entry * margin_rate)      # risk at 100% of NAV as margin
+        for risk, frac in itertools.product(risks, fracs):
+            eff = np.minimum(risk, frac * cap_risk)
+            r = eff * R
+            key = r.tobytes()
+            if key not in seen:
+                seen[key] = paths_stats(r, idx_chunks, ruin)
+            st = seen[key]
+            out.append(Result(
+                risk, frac, sl, tp, float(eff.mean()),
+                float(np.median(st["final"])), float(np.percentile(st["final"], 5)),
+                float(np.median(st["dd"])), float(np.percentile(st["dd"], 95)),
+                float(np.percentile(st["dd"], 99)),
+                float((st["final"] < 0).mean()), float(st["ruin"].mean()),
+            ))
+    return out
+
+
+# ============================================================
+# REPORT
+# ============================================================
+def report(results: List[Result], ruin: float):
+    print(f"\n{'RISK':>6} {'MFRAC':>6} {'SL':>5} {'TP':>5} {'EFF':>6} "
+          f"{'MED RET':>8} {'P5 RET':>8} {'DD50':>6} {'DD95':>6} {'DD99':>6} "
+          f"{'P(LOSS)':>7} {f'RUIN{ruin:.0%}':>8}")
+    for r in results:
+        sl = f"{r.sl:g}" if r.sl is not None else "atr"
+        tp = f"{r.tp:g}" if r.tp is not None else "-"
+        print(f"{r.risk_pct:>6.2%} {r.margin_frac:>6.0%} {sl:>5} {tp:>5} {r.mean_risk:>6.2%} "
+              f"{r.final_p50:>8.1%} {r.final_p5:>8.1%} {r.dd_p50:>6.1%} {r.dd_p95:>6.1%} "
+              f"{r.dd_p99:>6.1%} {r.p_loss:>7.1%} {r.p_ruin:>8.2%}")
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES Monte Carlo risk simulator")
+    ap.add_argument("kind", choices=["scalp", "swing"])
+    ap.add_argument("--trades", type=Path, required=True, help="mes_backtest.py --out CSV")
+    ap.add_argument("--data", type=Path, default=DATA_DIR, help="CandleStore for re-scoring / ATR")
+    ap.add_argument("--instruments", nargs="*")
+    ap.add_argument("--paths", type=int, default=100000)
+    ap.add_argument("--days", type=float, default=30.0, help="horizon at the backtest's trade rate")
+    ap.add_argument("--n-trades", type=int, help="trades per path (overrides --days)")
+    ap.add_argument("--risk", type=float, nargs="+")
+    ap.add_argument("--margin-frac", type=float, nargs="+")
+    ap.add_argument("--sl", type=float, nargs="+", help="scalp MAX_SL_PIPS values")
+    ap.add_argument("--tp", type=float, nargs="+", help="scalp TP_PIPS values")
+    ap.add_argument("--margin-rate", type=float, default=MARGIN_RATE)
+    ap.add_argument("--ruin", type=float, default=0.5, help="drawdown counted as ruin")
+    ap.add_argument("--horizon", type=int, default=HORIZON_BARS, help="M1 bars per scalp exit")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    d = DEFAULTS[args.kind]
+    sample = load_trades(args.trades, args.instruments)
+    store = CandleStore(args.data) if args.data.exists() else None
+    n_trades = args.n_trades or max(1, round(len(sample) / sample.span_days * args.days))
+    if args.kind == "swing" and (args.sl or args.tp):
+        print("swing: SL is 1.5×ATR with no fixed TP — --sl / --tp ignored")
+
+    t0 = time.perf_counter()
+    results = simulate(args.kind, sample, store, args.risk or d["risk"],
+                       args.margin_frac or d["margin_frac"],
+                       (args.sl or d["sl"]) if args.kind == "scalp" else d["sl"],
+                       (args.tp or d["tp"]) if args.kind == "scalp" else d["tp"],
+                       args.paths, n_trades, args.ruin, args.margin_rate, args.seed, args.horizon)
+    print(f"{len(sample)} trades over {sample.span_days:.0f} days → {args.paths} paths × "
+          f"{n_trades} trades ({args.days:g} days)")
+    report(results, args.ruin)
+    print(f"\n{len(results)} parameter sets in {time.perf_counter() - t0:.1f}s")
+    sys.exit(0)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_runner.py
+# Version: v1.1.1
+#
+# Purpose:
+#   Single-process multi-account MES runner and strategy plugin
+#   host. The per-MODE timers and schedulers each download the same
+#   H1/H4/M1 candles for the same instruments; this runner fetches
+#   market data ONCE per candle close and evaluates it for every
+#   strategy of every configured account (demo, live, subaccounts).
+#   Strategy plugins (mes_scalp, mes_swing, ...) are imported once
+#   per account with that account's environment (credentials, risk
+#   settings, safety gates). Each close gets one MarketSnapshot
+#   (mes_market) that every plugin reads as its oanda_get_candles():
+#   granularities several plugins declare in their PLAN are fetched
+#   once at the deepest lookback, so market-data requests stay
+#   constant as accounts and strategies are added.
+#
+# Plugins:
+#   mes_<name>.py listed under "strategies" in the accounts file,
+#   exposing
+#     PLUGIN = {"tf": "M1", "entry": "main_cycle", "calendar": "scalp"}
+#       tf        candle whose close triggers a cycle
+#       entry     function run per cycle
+#       calendar  "scalp" / "swing" (mes_scheduler) or "every"
+#     PLAN                    mes_planner lookbacks (snapshot depth)
+#     oanda_get_candles(inst, tf, count)   replaced by the snapshot
+#
+# Design goals:
+#   • Strategy code unchanged — an account is just an env overlay
+#     (MES_ACCOUNT_NAME keys its account / metrics / decision state)
+#   • Safety gates are per account: OANDA_* and MES_SWING_ARMED are
+#     never inherited from the runner's own environment, so arming
+#     one LIVE account cannot arm another
+#   • An account whose import aborts (missing credentials, swing
+#     LIVE gate) is logged and skipped; the others keep running
+#   • Same calendars and /tmp/mes_*.lock locks as mes_scheduler; a
+#     job whose lock is held (cycle still running) is skipped
+#   • Snapshot frames are frozen for the close and handed out as
+#     copies — one plugin cannot change what another one reads
+#
+# Accounts file (MES_ACCOUNTS, default /opt/mes/accounts.json):
+#   {"market_data": "live",
+#    "accounts": [
+#      {"name": "demo", "strategies": ["scalp", "swing"],
+#       "env": {"OANDA_API_URL": "https://api-fxpractice.oanda.com",
+#               "OANDA_API_TOKEN": "${OANDA_DEMO_API_TOKEN}",
+#               "OANDA_ACCOUNT_ID": "${OANDA_DEMO_ACCOUNT_ID}"}},
+#      {"name": "live", "strategies": ["scalp", "swing"],
+#       "swing_hours": "13,17,21",
+#       "env": {"OANDA_API_URL": "https://api-fxtrade.oanda.com",
+#               "OANDA_API_TOKEN": "${OANDA_LIVE_API_TOKEN}",
+#               "OANDA_ACCOUNT_ID": "${OANDA_LIVE_ACCOUNT_ID}",
+#               "MES_SWING_ARMED": "YES",
+#               "SWING_RISK_PCT_LIVE": "0.0025"}}]}
+#   ${VAR} is taken from the runner's environment (op run).
+#
+# Usage:
+#   mes_runner.py                 # run forever
+#   mes_runner.py --once          # one cycle of every job now
+#   mes_runner.py --plan 10       # print the next 10 scheduled cycles
+# ============================================================
+
+import argparse
+import fcntl
+import importlib.util
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mes_htf_cache import GRANULARITY_SECONDS
+from mes_market import MarketSnapshot, shared_depth
+from mes_scheduler import (DELAY_S, LOCKS, SWING_HOURS_DEFAULT, next_due_on,
+                           scalp_due, swing_due)
+
+# ============================================================
+# CONFIG
+# ============================================================
+MES_DIR = Path(__file__).resolve().parent
+ACCOUNTS_PATH = Path(os.getenv("MES_ACCOUNTS", "/opt/mes/accounts.json"))
+
+DEFAULT_STRATEGIES = ["scalp", "swing"]
+CALENDARS = ("scalp", "swing", "every")
+
+# must come from the account entry — never from the runner's env
+ACCOUNT_KEYS = ("OANDA_API_URL", "OANDA_API_TOKEN", "OANDA_ACCOUNT_ID",
+                "MES_SWING_ARMED", "MES_ACCOUNT_NAME")
+
+_VAR = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+# ============================================================
+# ACCOUNTS
+# ============================================================
+@dataclass
+class Account:
+    name: str
+    env: Dict[str, str]
+    strategies: List[str]
+    swing_hours: Optional[List[int]] = None
+
+
+def _resolve(name: str, value: str) -> str:
+    def sub(m):
+        if m.group(1) not in os.environ:
+            raise ValueError(f"account {name}: ${{{m.group(1)}}} not set")
+        return os.environ[m.group(1)]
+    return _VAR.sub(sub, str(value))
+
+
+def load_accounts(path: Path = ACCOUNTS_PATH) -> Tuple[List[Account], Optional[str]]:
+    """Accounts in file order plus the name of the market-data account."""
+    cfg = json.loads(Path(path).read_text())
+    accounts, seen = [], set()
+    for a in cfg.get("accounts", []):
+        name = a["name"]
+        if name in seen:
+            raise ValueError(f"duplicate account name {name}")
+        seen.add(name)
+        unknown = [s for s in a.get("strategies", DEFAULT_STRATEGIES)
+                   if not (MES_DIR / f"mes_{s}.py").exists()]
+        if unknown:
+            raise ValueError(f"account {name}: no plugin file for {unknown}")
+        hours = a.get("swing_hours")
+        accounts.append(Account(
+            name=name,
+            env={k: _resolve(name, v) for k, v in a.get("env", {}).items()},
+            strategies=a.get("strategies", DEFAULT_STRATEGIES),
+            swing_hours=[int(h) for h in str(hours).split(",")] if hours else None,
+        ))
+    if not accounts:
+        raise ValueError(f"{path}: no accounts configured")
+    return accounts, cfg.get("market_data")
+
+
+def import_strategy(strategy: str, account: Account):
+    """Fresh mes_<strategy> plugin module built under the account's env."""
+    saved = dict(os.environ)
+    for k in ACCOUNT_KEYS:
+        os.environ.pop(k, None)
+    os.environ.update(account.env)
+    os.environ["MES_ACCOUNT_NAME"] = account.name
+    try:
+        spec = importlib.util.spec_from_file_location(
+            f"mes_{strategy}__{account.name}", MES_DIR / f"mes_{strategy}.py")
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        plugin = getattr(mod, "PLUGIN", None)
+        if not plugin or plugin.get("calendar") not in CALENDARS:
+            raise ValueError(f"mes_{strategy}.py: PLUGIN with a calendar in {CALENDARS} required")
+        return mod
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+# ============================================================
+# JOBS
+# ============================================================
+@dataclass
+class Job:
+    account: str
+    strategy: str
+    module: object
+    tf: str
+    due: Callable[[datetime], bool] = field(repr=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.account}/{self.strategy}"
+
+    @property
+    def lock(self) -> str:
+        return LOCKS.get(self.strategy, f"/tmp/mes_{self.strategy}.lock")
+
+    def run(self):
+        getattr(self.module, self.module.PLUGIN["entry"])()
+
+
+def plan(jobs: List[Job], after: datetime, count: int) -> List[Tuple[datetime, List[Job]]]:
+    out: List[Tuple[datetime, List[Job]]] = []
+    t = after
+    while len(out) < count:
+        nxt = {j.key: next_due_on(j.tf, j.due, t, j.key) for j in jobs}
+        at = min(nxt.values())
+        out.append((at, [j for j in jobs if nxt[j.key] == at]))
+        t = at
+    return out
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+class Runner:
+    def __init__(self, accounts: List[Account], market_data: Optional[str] = None):
+        self.accounts = accounts
+        self.market_data = market_data or accounts[0].name
+        self.stop = False
+        self.jobs: List[Job] = []
+        self.fetch: Optional[Callable] = None
+        self.depth: Dict[str, int] = {}
+        self.snapshot: Optional[MarketSnapshot] = None
+
+    def load(self):
+        modules: Dict[Tuple[str, str], object] = {}
+        for account in self.accounts:
+            for strategy in account.strategies:
+                try:
+                    modules[(account.name, strategy)] = import_strategy(strategy, account)
+                except (SystemExit, Exception) as e:
+                    # missing credentials, swing LIVE gate, ...
+                    logging.error(f"[RUNNER] {account.name}/{strategy} refused to load "
+                                  f"({type(e).__name__}: {e}) — skipped")
+        if not modules:
+            raise RuntimeError("no account / strategy could be loaded")
+
+        # one market-data source: the market_data account if it loaded
+        source = next((m for (a, _), m in modules.items() if a == self.market_data),
+                      next(iter(modules.values())))
+        self.fetch = source.oanda_get_candles
+        # overlapping granularities are fetched once at the deepest lookback
+        per_strategy = {s: m for (_, s), m in modules.items()}
+        self.depth = shared_depth(m.PLAN for m in per_strategy.values() if hasattr(m, "PLAN"))
+
+        for account in self.accounts:
+            for strategy in account.strategies:
+                mod = modules.get((account.name, strategy))
+                if mod is None:
+                    continue
+                plugin = mod.PLUGIN
+                due = {"scalp": scalp_due, "every": lambda t: True}.get(plugin["calendar"])
+                if plugin["calendar"] == "swing":
+                    hours = account.swing_hours or [
+                        int(h) for h in SWING_HOURS_DEFAULT.get(mod.MODE, "14,16,18,20").split(",")]
+                    due = partial(swing_due, hours=hours)
+                self.jobs.append(Job(account.name, strategy, mod, plugin["tf"], due))
+        logging.info(f"[RUNNER] jobs: {', '.join(j.key for j in self.jobs)} "
+                     f"(market data via {self.market_data}; shared depth "
+                     f"{', '.join(f'{tf}:{n}' for tf, n in self.depth.items()) or 'none'})")
+
+    def run_job(self, job: Job):
+        t0 = time.monotonic()
+        with open(job.lock, "w") as lock_fd:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # an overrunning cycle (oneshot / scheduler) — skip, never queue
+                logging.warning(f"[RUNNER] {job.key} previous cycle still running — skipped")
+                return
+            try:
+                logging.info(f"[RUNNER] {job.account}: {getattr(job.module, 'VERSION', job.strategy)} cycle")
+                cache = getattr(job.module, "htf_cache", None)
+                if cache is not None:
+                    cache.hits = cache.misses = 0
+                job.run()
+            except (SystemExit, Exception) as e:
+                logging.exception(f"[RUNNER] {job.key} cycle failed: {e}")
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        logging.info(
+            f"[RUNNER] {job.key} done in {time.monotonic() - t0:.2f}s "
+            f"(snapshot: {self.snapshot.summary()})"
+        )
+
+    def run_due(self, due: List[Job], at: Optional[datetime] = None):
+        # one snapshot per close: the first job fetches, every later job
+        # (other strategies, other accounts) reads the same frames
+        self.snapshot = MarketSnapshot(self.fetch, at, self.depth, previous=self.snapshot)
+        for job in sorted(due, key=lambda j: (GRANULARITY_SECONDS.get(j.tf, 0), j.strategy)):
+            if self.stop:
+                break
+            job.module.oanda_get_candles = self.snapshot
+            self.run_job(job)
+
+    def once(self):
+        self.run_due(self.jobs)
+
+    def sleep_until(self, t: datetime):
+        while not self.stop:
+            left = (t - datetime.now(timezone.utc)).total_seconds()
+            if left <= 0:
+                return
+            time.sleep(min(left, 5.0))
+
+    def forever(self):
+        after = datetime.now(timezone.utc)
+        while not self.stop:
+            at, due = plan(self.jobs, after, 1)[0]
+            logging.info(f"[RUNNER] next: {', '.join(j.key for j in due)} at {at:%a %H:%M} UTC")
+            self.sleep_until(at + timedelta(seconds=DELAY_S))
+            if self.stop:
+                break
+            self.run_due(due, at)
+            # cycles that overran a later close are skipped, not queued
+            after = max(at, datetime.now(timezone.utc) - timedelta(seconds=DELAY_S))
+        logging.info("[RUNNER] stopped")
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Multi-account MES runner")
+    ap.add_argument("--accounts", type=Path, default=ACCOUNTS_PATH)
+    ap.add_argument("--plan", type=int, metavar="N", help="print the next N cycles and exit")
+    ap.add_argument("--once", action="store_true", help="run every job once now and exit")
+    args = ap.parse_args()
+
+    accounts, market_data = load_accounts(args.accounts)
+    runner = Runner(accounts, market_data)
+    runner.load()
+    # no-op when mes_scalp already configured mes.log + stdout
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+
+    if args.plan:
+        for at, due in plan(runner.jobs, datetime.now(timezone.utc), args.plan):
+            print(f"{at + timedelta(seconds=DELAY_S):%a %Y-%m-%d %H:%M:%S} UTC  "
+                  f"{', '.join(j.key for j in due)}")
+        sys.exit(0)
+    if args.once:
+        runner.once()
+        sys.exit(0)
+
+    daemon_lock = open("/tmp/mes_runner.lock", "w")
+    try:
+        fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("mes_runner already running")
+        sys.exit(1)
+
+    def _stop(*_):
+        runner.stop = True
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    runner.forever()
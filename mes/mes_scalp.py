@@ -1,13 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-MES v3.5.99 — PRO Continuation Scalp (Intent Restore) + Rate-Limit Safe Exit
+MES v3.6.8 — PRO Continuation Scalp (Intent Restore) + Rate-Limit Safe Exit
 -----------------------------------------------------------------------
 • Continuation-only scalp entries (no reversals)
 • 4H + 1H structure alignment → single candle check
 • Volume restored to informational (not a hard veto)
 • Relaxed M1 strong candle threshold (intent restore)
 • Clean exit on OANDA rate-limit (prevents systemd FAILED state)
+• H1/H4 structure memoized until the next candle close (mes_htf_cache)
+• Continuation check callable on locally built M1 bars (mes_stream)
+• Indicators for all instruments in one vectorized pass (mes_indicators)
+  + per-pair diagnostics restored to latest_diag.json
+• Optional pricing prefilter over the account's FX universe
+  (MES_SCALP_PREFILTER=ON, mes_prefilter) — off by default
+• NAV + open positions kept incrementally via /changes
+  (mes_account, shared with swing) — one small request per cycle
+• Signals sized in one vectorized pass (mes_sizing) from cached
+  /instruments metadata (mes_instruments): risk_units / exec_units /
+  was_margin_capped / risk_pct_used are filled instead of 0
+• Per-account state key MES_ACCOUNT_NAME (default MODE) and
+  MES_SCALP_RISK_PCT / MES_SCALP_MAX_MARGIN_FRAC overrides, so
+  mes_runner can evaluate several accounts in one process
+• Minimal lookbacks from mes_planner (H1/H4 126 bars for the RSI
+  diag, M1 162 for the snapshot) instead of 300 per granularity;
+  NAV + instrument metadata fetched only when a SIGNAL needs sizing,
+  open positions no longer read (scalp never used them)
+• Optional local candles (MES_RESAMPLE=ON, mes_resample): one
+  incremental M1 request per instrument, H1/H4 and M15 resampled
+  from it; tf_15m / rsi_15m diagnostics filled when covered
+• M1 ATR / RSI / MACD kept as streaming state between cycles
+  (mes_incremental): a cycle fetches the M1 bars closed since the
+  last one (typically 2) instead of 162; MES_INCREMENTAL=OFF re-seeds
+• mes_runner plugin (PLUGIN): evaluated on the runner's per-close
+  MarketSnapshot; candle parsing shared via mes_market
+• Hard decision budget per cycle and phase (mes_deadline,
+  MES_SCALP_DEADLINE_S): GET timeouts / retries cut to the budget
+  left, a late cycle's decisions recorded as DEADLINE_EXCEEDED
+  skips; an overlapping run is skipped instead of queued
+• OANDA session from mes_http (shared pool, gzip, identical GETs
+  coalesced) instead of _get_oanda_session()
+• A short incremental M1 frame that misses the stored bar is
+  refetched in full before the indicators re-seed, and an ATR that
+  is still unavailable counts as a WEAK_M1_CANDLE (it could pass as
+  strong and SIGNAL)
 """
 
 import csv
@@ -26,8 +62,22 @@ from typing import Any, Dict, List, Tuple
 import numpy as np
 import pandas as pd
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+import mes_indicators as mi
+from mes_account import open_account
+from mes_deadline import Deadline, DeadlineExceeded
+from mes_decisions import open_store
+from mes_htf_cache import open_cache
+from mes_http import open_client
+from mes_incremental import open_state
+from mes_instruments import open_instruments
+from mes_market import parse_candles
+from mes_metrics import open_tracer
+from mes_observations import open_observations
+from mes_planner import Lazy, Plan, summary as plan_summary
+from mes_prefilter import open_prefilter
+from mes_resample import open_bars
+from mes_sizing import size_batch
 
 # ============================================================
 # PATHS
@@ -36,7 +86,7 @@ PROJECT_ROOT = Path.home() / "leo-services" / "mes"
 PROJECT_ROOT.mkdir(parents=True, exist_ok=True)
 
 MES_DIAG_PATH = PROJECT_ROOT / "latest_diag.json"
-TRADE_OBS_PATH = PROJECT_ROOT / "trade_observations.csv"
+TRADE_OBS_PATH = PROJECT_ROOT / "trade_observations.csv"   # legacy; see mes_observations.py migrate
 LOG_PATH = PROJECT_ROOT / "mes.log"
 CONFIG_PATH = PROJECT_ROOT / "config.json"
 
@@ -64,28 +114,6 @@ class SafeEncoder(json.JSONEncoder):
             return float(obj)
         return super().default(obj)
 
-# ============================================================
-# OANDA SESSION
-# ============================================================
-def _get_oanda_session() -> requests.Session:
-    if hasattr(_get_oanda_session, "session"):
-        return _get_oanda_session.session
-    s = requests.Session()
-    retry = Retry(
-        total=5,
-        backoff_factor=0.5,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods={"GET", "POST", "PUT"},
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    s.mount("https://", adapter)
-    s.mount("http://", adapter)
-    _get_oanda_session.session = s
-    return s
-
-oanda = _get_oanda_session()
-
 # ============================================================
 # CONFIG
 # ============================================================
@@ -106,19 +134,29 @@ OANDA_REST_URL = os.getenv("OANDA_API_URL", "").rstrip("/")
 if not all([OANDA_API_TOKEN, OANDA_ACCOUNT_ID, OANDA_REST_URL]):
     raise RuntimeError("Missing OANDA credentials")
 
-oanda.headers.update({
-    "Authorization": f"Bearer {OANDA_API_TOKEN}",
-    "Content-Type": "application/json",
-})
+# pooled session shared with swing / other accounts, gzip, coalesced GETs
+oanda = open_client(OANDA_API_TOKEN)
 
 MODE = "DEMO" if "fxpractice" in OANDA_REST_URL else "LIVE"
-VERSION = f"MES v3.5.99 {MODE}"
+# account / metrics / decisions / prefilter state key — mes_runner sets
+# one per configured account; market-data state (HTF memo) stays per MODE
+ACCOUNT_NAME = os.getenv("MES_ACCOUNT_NAME", MODE)
+VERSION = f"MES v3.6.8 {MODE}"
 
 # ============================================================
 # CONSTANTS (INTENT RESTORE)
 # ============================================================
 INSTRUMENTS = ["EUR_USD", "GBP_USD", "AUD_USD", "NZD_USD", "USD_CAD", "USD_CHF", "EUR_GBP"]
-CANDLE_COUNT = 300
+
+# ON → scan the account's whole FX universe via /pricing instead of INSTRUMENTS
+PREFILTER = os.getenv("MES_SCALP_PREFILTER", "OFF").upper() == "ON"
+PREFILTER_MAX_SPREAD_PIPS = 1.5
+# ON → H1/H4/M15 resampled from a stored M1 base (mes_resample)
+RESAMPLE = os.getenv("MES_RESAMPLE", "OFF").upper() == "ON"
+# hard decision budget per cycle / phase (MES_DEADLINE=OFF disables)
+DEADLINE_S = float(os.getenv("MES_SCALP_DEADLINE_S", "20"))
+DEADLINE_PHASES = {"prefilter": 5.0, "bars": 8.0, "evaluate": 15.0, "sizing": 5.0}
+CANDLE_COUNT = 300       # default / seeding depth (mes_stream); cycles use PLAN
 ATR_PERIOD = 14
 
 STRONG_CANDLE_ATR_MULT = 0.25   # ← restored intent
@@ -129,97 +167,344 @@ TP_PIPS = 3.5
 
 DEMO_RISK_PCT = 0.02
 LIVE_RISK_PCT = 0.008
-RISK_PCT = DEMO_RISK_PCT if MODE == "DEMO" else LIVE_RISK_PCT
+RISK_PCT = float(os.getenv("MES_SCALP_RISK_PCT",
+                          DEMO_RISK_PCT if MODE == "DEMO" else LIVE_RISK_PCT))
+DEMO_MAX_MARGIN_FRAC = 0.20
+LIVE_MAX_MARGIN_FRAC = 0.10
+MAX_MARGIN_FRAC = float(os.getenv("MES_SCALP_MAX_MARGIN_FRAC",
+                                 DEMO_MAX_MARGIN_FRAC if MODE == "DEMO" else LIVE_MAX_MARGIN_FRAC))
 
 # ============================================================
 # OANDA HELPERS
 # ============================================================
+account = open_account(oanda, OANDA_REST_URL, OANDA_ACCOUNT_ID, ACCOUNT_NAME, PROJECT_ROOT)
+
 def oanda_get_account_nav() -> float:
-    r = oanda.get(f"{OANDA_REST_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/summary", timeout=10)
-    r.raise_for_status()
-    return float(r.json()["account"]["NAV"])
+    return account.current_nav()
 
 def oanda_get_open_positions() -> Dict[str, float]:
-    r = oanda.get(f"{OANDA_REST_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/openPositions", timeout=10)
-    r.raise_for_status()
-    return {
-        p["instrument"]: float(p["long"]["units"]) + float(p["short"]["units"])
-        for p in r.json().get("positions", [])
-    }
+    return account.open_positions()
 
-def oanda_get_candles(inst: str, tf: str) -> pd.DataFrame:
+def oanda_get_candles(inst: str, tf: str, count: int = CANDLE_COUNT) -> pd.DataFrame:
+    """Last `count` complete candles (one extra requested for the forming bar)."""
     r = oanda.get(
         f"{OANDA_REST_URL}/v3/instruments/{inst}/candles",
-        params={"granularity": tf, "count": CANDLE_COUNT, "price": "M"},
+        params={"granularity": tf, "count": count + 1, "price": "M"},
         timeout=15,
     )
     r.raise_for_status()
-    rows = []
-    for c in r.json().get("candles", []):
-        if c.get("complete"):
-            m = c["mid"]
-            rows.append({
-                "time": pd.to_datetime(c["time"]),
-                "open": float(m["o"]),
-                "high": float(m["h"]),
-                "low": float(m["l"]),
-                "close": float(m["c"]),
-                "volume": int(c.get("volume", 0)),
-            })
-    df = pd.DataFrame(rows).set_index("time")
-    if df.empty:
-        raise RuntimeError("No candles")
-    return df
-
-# ============================================================
-# STRUCTURE
-# ============================================================
-def is_bullish(df): return df.iloc[-1]["close"] > df.iloc[-1]["open"]
-def is_bearish(df): return df.iloc[-1]["close"] < df.iloc[-1]["open"]
+    return parse_candles(r.json(), count)
+
+def market_candles(inst: str, tf: str, count: int) -> pd.DataFrame:
+    """Local bars when the M1 store covers the lookback, OANDA otherwise."""
+    if bars.covers(inst, tf, count):
+        return bars.candles(inst, tf, count)
+    return oanda_get_candles(inst, tf, count)
+
+# ============================================================
+# PLUGIN (mes_runner: candle that triggers a cycle, entry point,
+# calendar from mes_scheduler)
+# ============================================================
+PLUGIN = {"tf": "M1", "entry": "main_cycle", "calendar": "scalp"}
+
+# ============================================================
+# DATA PLAN (minimum complete bars per granularity)
+# ============================================================
+# decisions: last H1/H4 structure, M1 ATR + body; diagnostics: HTF RSI
+# (memo), M1 snapshot (atr_delta, rsi, macd)
+PLAN = (Plan()
+        .need("H1", "structure").need("H1", "rsi")
+        .need("H4", "structure").need("H4", "rsi")
+        .need("M1", "atr", ATR_PERIOD).need("M1", "body")
+        .need("M1", "snapshot", ATR_PERIOD)
+        .need("M15", "structure").need("M15", "rsi"))   # diag, local bars only
+
+# ============================================================
+# HTF STRUCTURE (memoized until the next H1/H4 close)
+# ============================================================
+htf_cache = open_cache(MODE, PROJECT_ROOT)
+m1_state = open_state(MODE, "M1", ATR_PERIOD, PROJECT_ROOT)
+decisions = open_store(ACCOUNT_NAME, PROJECT_ROOT, latest_path=MES_DIAG_PATH)
+observations = open_observations(PROJECT_ROOT)
+tracer = open_tracer("scalp", ACCOUNT_NAME, PROJECT_ROOT)
+tracer.instrument(oanda)
+instruments = open_instruments(oanda, OANDA_REST_URL, OANDA_ACCOUNT_ID, ACCOUNT_NAME,
+                               PROJECT_ROOT)
+prefilter = open_prefilter(oanda, OANDA_REST_URL, OANDA_ACCOUNT_ID, "scalp", ACCOUNT_NAME,
+                           PREFILTER_MAX_SPREAD_PIPS, PREFILTER, PROJECT_ROOT,
+                           instruments=instruments)
+bars = open_bars(oanda, OANDA_REST_URL, MODE, RESAMPLE, PROJECT_ROOT)
+
+def htf_structures(insts: List[str], tf: str) -> Dict[str, str]:
+    """
+    Structure of the last complete tf candle per instrument.
+    Memo hits cost nothing; misses are fetched and evaluated as one panel.
+    """
+    out: Dict[str, str] = {}
+    missing = []
+    for inst in insts:
+        cached = htf_cache.get(inst, tf)
+        if cached is None:
+            missing.append(inst)
+        else:
+            out[inst] = cached
+
+    if missing:
+        frames = {inst: market_candles(inst, tf, PLAN.count(tf)) for inst in missing}
+        snap = mi.snapshot(mi.stack(frames))
+        for inst, df in frames.items():
+            out[inst] = snap[inst]["candle_structure"]
+            htf_cache.put(inst, tf, df.index[-1].to_pydatetime(),
+                          out[inst], rsi=snap[inst]["rsi"])
+        instruments.observe({inst: float(df["close"].iloc[-1]) for inst, df in frames.items()})
+    return out
+
+def m15_fields(insts: List[str]) -> Dict[str, Dict[str, Any]]:
+    """tf_15m / rsi_15m diagnostics — only from local bars, never fetched."""
+    frames = {inst: bars.candles(inst, "M15", PLAN.count("M15"))
+              for inst in insts if bars.covers(inst, "M15", PLAN.count("M15"))}
+    if not frames:
+        return {}
+    snap = mi.snapshot(mi.stack(frames))
+    return {inst: {"tf_15m": snap[inst]["candle_structure"], "rsi_15m": snap[inst]["rsi"]}
+            for inst in frames}
+
+# ============================================================
+# CONTINUATION CHECK (shared by timer cycle + mes_stream)
+# ============================================================
+def new_diag(inst: str) -> Dict[str, Any]:
+    return {
+        "pair": inst,
+        "time": datetime.now(timezone.utc).isoformat(),
+        "decision": "SKIPPED",
+        "direction": "NONE",
+        "reasons": [],
+        "entry_type": "NONE",
+        "tp_pips": 0.0,
+        "sl_pips": 0.0,
+        "risk_units": 0,
+        "exec_units": 0,
+        "was_margin_capped": False,
+        "risk_pct_used": 0.0,
+        "strong_body_ratio": 0.0,
+        "pullback_pips": 0.0,
+        "in_alignment": False,
+    }
+
+def evaluate_instruments(insts: List[str],
+                         m1_frames: Dict[str, pd.DataFrame] | None = None) -> Dict[str, Dict[str, Any]]:
+    """
+    HTF alignment gate for every instrument, then the M1 strong candle
+    check for the aligned ones in a single indicator pass.
+    m1_frames may come from a local bar builder; otherwise M1 is fetched.
+    """
+    with tracer.span("htf_H1"):
+        s1h = htf_structures(insts, "H1")
+    with tracer.span("htf_H4"):
+        s4h = htf_structures(insts, "H4")
+
+    m15 = m15_fields(insts)
+
+    diags = {inst: new_diag(inst) for inst in insts}
+    aligned = []
+    for inst in insts:
+        d = diags[inst]
+        d.update({
+            "tf_1h": s1h[inst],
+            "tf_4h": s4h[inst],
+            "rsi_1h": htf_cache.fields(inst, "H1").get("rsi"),
+            "rsi_4h": htf_cache.fields(inst, "H4").get("rsi"),
+            "tf_15m": None,
+            "rsi_15m": None,
+            **m15.get(inst, {}),
+        })
+        if s4h[inst] != s1h[inst] or s1h[inst] == "flat":
+            d["reasons"] = ["HTF_MISALIGNED"]
+        else:
+            d["in_alignment"] = True
+            aligned.append(inst)
+
+    if not aligned:
+        return diags
+
+    if m1_frames is None:
+        with tracer.span("m1_candles"):
+            cap = PLAN.count("M1")
+            m1_frames = {inst: market_candles(inst, "M1", m1_state.bars_needed(inst, cap))
+                         for inst in aligned}
+            # missed the stored bar (gap, clock): re-seed from the full window, never a short frame
+            for inst in aligned:
+                if len(m1_frames[inst]) < cap and not m1_state.continues(inst, m1_frames[inst]):
+                    m1_frames[inst] = market_candles(inst, "M1", cap)
+    with tracer.span("indicators"):
+        # streaming state: only bars after the stored one are applied
+        snap = {inst: m1_state.update(inst, m1_frames[inst]) for inst in aligned}
+        atr = np.array([np.nan if snap[i]["atr_current"] is None else snap[i]["atr_current"]
+                        for i in aligned])
+        body = np.array([abs(m1_frames[i]["close"].iloc[-1] - m1_frames[i]["open"].iloc[-1])
+                         for i in aligned])
+        with np.errstate(invalid="ignore"):
+            weak = np.isnan(atr) | (atr <= 0) | (body < STRONG_CANDLE_ATR_MULT * atr)
+
+    instruments.observe({inst: float(m1_frames[inst]["close"].iloc[-1]) for inst in aligned})
+    for i, inst in enumerate(aligned):
+        d = diags[inst]
+        d.update(snap[inst])
+        d["rr"] = TP_PIPS / MAX_SL_PIPS
+        if weak[i]:
+            d["reasons"] = ["WEAK_M1_CANDLE"]
+            continue
+        d["decision"] = "SIGNAL"
+        d["direction"] = "BUY" if s1h[inst] == "bullish" else "SELL"
+        d["reasons"] = ["CONTINUATION_OK"]
+        d["tp_pips"] = TP_PIPS
+        d["sl_pips"] = MAX_SL_PIPS
+        d["entry_price"] = float(m1_frames[inst]["close"].iloc[-1])
+        logging.info(f"{inst}: continuation conditions met")
+    return diags
+
+# ============================================================
+# SIZING (NAV risk over the SL, margin cap — mes_sizing)
+# ============================================================
+def refresh_instruments():
+    """Daily /instruments + home conversions refresh (cached file otherwise)."""
+    instruments.refresh()
+
+def size_signals(diags: Dict[str, Dict[str, Any]], nav: Lazy, meta: Lazy):
+    """
+    Units for every SIGNAL in one vectorized pass. NAV and the
+    instrument metadata are deferred reads — a cycle without a
+    signal never requests them.
+    """
+    sig = [inst for inst, d in diags.items() if d["decision"] == "SIGNAL"]
+    if not sig:
+        return
+    meta()
+    sized = size_batch(instruments, sig, [diags[i]["entry_price"] for i in sig],
+                       [MAX_SL_PIPS * instruments.pip(i) for i in sig],
+                       nav(), RISK_PCT, MAX_MARGIN_FRAC)
+    for inst in sig:
+        row = sized.row(inst)
+        d = diags[inst]
+        d["risk_units"] = row["risk_units"]
+        d["exec_units"] = row["units"]
+        d["was_margin_capped"] = row["was_margin_capped"]
+        d["risk_pct_used"] = RISK_PCT if row["units"] else 0.0
+        if row["reason"]:
+            d["reasons"].append(f"SIZE: {row['reason']}")
+
+def check_continuation(inst: str, df1: pd.DataFrame | None = None) -> str | None:
+    """Single-instrument form used by mes_stream on each M1 close."""
+    d = evaluate_instruments([inst], {inst: df1} if df1 is not None else None)[inst]
+    return d["tf_1h"] if d["decision"] == "SIGNAL" else None
+
+def write_diag(diags: Dict[str, Dict[str, Any]]):
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "version": VERSION,
+        "mode": MODE,
+        "pairs": diags,
+    }
+    decisions.append(payload, encoder=SafeEncoder)
+
+def record_observations(diags: Dict[str, Dict[str, Any]]):
+    """One typed observation row per signal (schema v2 fields)."""
+    for inst, d in diags.items():
+        if d["decision"] != "SIGNAL":
+            continue
+        t = datetime.fromisoformat(d["time"])
+        observations.append({
+            "timestamp_utc": t,
+            "pair": inst,
+            "direction": d["tf_1h"],
+            "strong_body_ratio": d.get("strong_body_ratio"),
+            "pullback_pips": PULLBACK_PIPS,
+            "sl_pips": d["sl_pips"],
+            "tp_pips": d["tp_pips"],
+            "exec_units": d["exec_units"],
+            "was_margin_capped": d["was_margin_capped"],
+            "session_hour_utc": t.hour,
+        })
+    observations.flush()
 
 # ============================================================
 # MAIN CYCLE (RATE-LIMIT SAFE)
 # ============================================================
 def main_cycle():
     logging.info("MES cycle invoked by systemd timer")
+    tracer.begin_cycle()
+    with tracer.span("cycle"):
+        run_cycle()
+    tracer.save()
+    logging.info(tracer.cycle_summary())
 
-    # ---- RATE-LIMIT SAFE NAV FETCH ----
-    try:
-        nav = oanda_get_account_nav()
-    except requests.HTTPError as e:
-        msg = str(e).lower()
-        if "429" in msg or "rate" in msg:
-            logging.warning("OANDA rate-limited — skipping this cycle cleanly")
-            return      # <-- CLEAN EXIT (status 0)
-        raise
-
-    open_pos = oanda_get_open_positions()
-
-    for inst in INSTRUMENTS:
-        df1h = oanda_get_candles(inst, "H1")
-        df4h = oanda_get_candles(inst, "H4")
-
-        if not ((is_bullish(df4h) and is_bullish(df1h)) or
-                (is_bearish(df4h) and is_bearish(df1h))):
-            continue
+def drop_late(insts: List[str], diags: Dict[str, Dict[str, Any]] | None,
+              exc: DeadlineExceeded) -> Dict[str, Dict[str, Any]]:
+    """A cycle past its budget keeps no SIGNAL — every pair is recorded as a skip."""
+    logging.warning(f"MES cycle {exc} — decisions dropped")
+    tracer.observe(f"deadline/{exc.phase}", exc.overrun_s * 1000)
+    diags = diags or {inst: new_diag(inst) for inst in insts}
+    for d in diags.values():
+        d["decision"] = "SKIPPED"
+        d["reasons"] = d["reasons"] + [f"DEADLINE_EXCEEDED: {exc.phase}"]
+    return diags
 
-        df1 = oanda_get_candles(inst, "M1")
-        atr = (df1["high"] - df1["low"]).rolling(ATR_PERIOD).mean().iloc[-1]
-        body = abs(df1.iloc[-1]["close"] - df1.iloc[-1]["open"])
+def run_cycle():
+    # account reads are deferred until a SIGNAL needs sizing
+    nav = Lazy("nav", oanda_get_account_nav, tracer.span)
+    meta = Lazy("instruments", refresh_instruments, tracer.span)
+    deadline = Deadline(DEADLINE_S, DEADLINE_PHASES)
 
-        if atr <= 0 or body < STRONG_CANDLE_ATR_MULT * atr:
-            continue
+    insts = INSTRUMENTS
+    diags = None
+    try:
+        with deadline.active():
+            if prefilter.enabled:
+                with tracer.span("prefilter"), deadline.phase("prefilter"):
+                    insts = prefilter.scan(INSTRUMENTS)
+            if bars.enabled:
+                with tracer.span("bars"), deadline.phase("bars"):
+                    bars.sync(insts)
 
-        logging.info(f"{inst}: continuation conditions met")
+            with tracer.span("evaluate"), deadline.phase("evaluate"):
+                diags = evaluate_instruments(insts)
 
-    logging.info("MES cycle completed normally")
+            # ---- RATE-LIMIT SAFE NAV FETCH ----
+            try:
+                with tracer.span("sizing"), deadline.phase("sizing"):
+                    size_signals(diags, nav, meta)
+            except requests.HTTPError as e:
+                msg = str(e).lower()
+                if "429" in msg or "rate" in msg:
+                    logging.warning("OANDA rate-limited — skipping this cycle cleanly")
+                    return      # <-- CLEAN EXIT (status 0)
+                raise
+    except DeadlineExceeded as e:
+        diags = drop_late(insts, diags, e)
+    logging.info(f"Deferred reads — {plan_summary(nav, meta)}")
+    with tracer.span("diag"):
+        write_diag(diags)
+        record_observations(diags)
+
+    with tracer.span("memo_save"):
+        htf_cache.save()
+        m1_state.save()
+    logging.info(
+        f"HTF memo: {htf_cache.hits} hits / {htf_cache.misses} fetches"
+    )
+    logging.info(f"MES cycle completed normally ({deadline.elapsed():.2f}s)")
 
 # ============================================================
 # ENTRY POINT (LOCKED)
 # ============================================================
 if __name__ == "__main__":
     lock_fd = open("/tmp/mes_scalp.lock", "w")
-    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        # a cycle still running past its deadline — skip, never queue
+        logging.warning("[MES] previous cycle still running — skipped")
+        sys.exit(0)
     try:
         logging.info(f"[MES] {VERSION} starting cycle")
         main_cycle()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_scheduler.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Resident MES scheduler — replaces the mes_scalp_* / mes_swing_*
+#   oneshot timers with one long-running process per MODE.
+#   mes_scalp and mes_swing are imported ONCE, so pandas / numpy,
+#   the requests Sessions + Retry adapters and the HTF memo stay
+#   warm between cycles. Cycles fire MES_SCHED_DELAY_S seconds
+#   after the candle close they depend on (M1 for scalp, H1 for
+#   swing) instead of on the wall-clock minute.
+#
+# Design goals:
+#   • Same calendars as the timers (scalp every 15 min 13–21 UTC,
+#     swing per-MODE hours, Sun/Fri 22:00 warm-start / cutoff)
+#   • Same locks as the oneshot entry points (/tmp/mes_*.lock),
+#     so a manual `leo mes scalp demo` never overlaps a cycle; a
+#     cycle whose lock is held is skipped, not queued behind it
+#   • Candles shared across scalp + swing and reused until the next
+#     close of their granularity — identical to a fresh fetch
+#   • A failing cycle is logged, never kills the daemon
+#   • Swing LIVE safety gate still applies (import aborts → scalp only)
+#
+# Usage:
+#   mes_scheduler.py              # run forever
+#   mes_scheduler.py --plan 10    # print the next 10 scheduled cycles
+# ============================================================
+
+import argparse
+import fcntl
+import logging
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mes_htf_cache import bar_duration, next_close
+
+# ============================================================
+# CONFIG
+# ============================================================
+MODE = "LIVE" if "fxtrade" in os.getenv("OANDA_API_URL", "") else "DEMO"
+
+DELAY_S = float(os.getenv("MES_SCHED_DELAY_S", "3"))
+SCALP_EVERY_MIN = int(os.getenv("MES_SCALP_EVERY_MIN", "15"))
+SCALP_HOURS = range(13, 22)
+
+# mes_swing_{demo,live}.timer
+SWING_HOURS_DEFAULT = {"DEMO": "14,16,18,20", "LIVE": "13,17,21"}
+SWING_HOURS = [int(h) for h in
+               os.getenv("MES_SWING_HOURS", SWING_HOURS_DEFAULT[MODE]).split(",")]
+
+SUN, FRI = 6, 4
+LOCKS = {"scalp": "/tmp/mes_scalp.lock", "swing": "/tmp/mes_swing.lock"}
+
+
+# ============================================================
+# CALENDARS (candle CLOSE times, UTC)
+# ============================================================
+def _session_edge(t: datetime) -> bool:
+    """Sun 22:00 warm-start and Fri 22:00 cutoff (both timers)."""
+    return t.weekday() in (SUN, FRI) and t.hour == 22 and t.minute == 0
+
+
+def scalp_due(t: datetime) -> bool:
+    if _session_edge(t):
+        return True
+    return (t.weekday() < 5 and t.hour in SCALP_HOURS
+            and t.minute % SCALP_EVERY_MIN == 0)
+
+
+def swing_due(t: datetime, hours: List[int] = SWING_HOURS) -> bool:
+    if _session_edge(t):
+        return True
+    return t.weekday() < 5 and t.hour in hours and t.minute == 0
+
+
+JOBS: Dict[str, Tuple[str, Callable[[datetime], bool]]] = {
+    "scalp": ("M1", scalp_due),
+    "swing": ("H1", swing_due),
+}
+
+
+def next_due(name: str, after: datetime) -> datetime:
+    """First candle close strictly after `after` on which job is due."""
+    tf, due = JOBS[name]
+    return next_due_on(tf, due, after, name)
+
+
+def next_due_on(tf: str, due: Callable[[datetime], bool], after: datetime,
+                name: str = "job") -> datetime:
+    step = bar_duration(tf)
+    t = datetime.fromtimestamp(
+        (int(after.timestamp()) // int(step.total_seconds()) + 1) * step.total_seconds(),
+        timezone.utc,
+    )
+    for _ in range(8 * 24 * 60):
+        if due(t):
+            return t
+        t += step
+    raise RuntimeError(f"{name}: nothing scheduled within 8 days")
+
+
+def plan(after: datetime, names: List[str], count: int) -> List[Tuple[datetime, List[str]]]:
+    out: List[Tuple[datetime, List[str]]] = []
+    t = after
+    while len(out) < count:
+        nxt = {n: next_due(n, t) for n in names}
+        at = min(nxt.values())
+        out.append((at, [n for n in names if nxt[n] == at]))
+        t = at
+    return out
+
+
+# ============================================================
+# WARM CANDLES (shared by scalp + swing)
+# ============================================================
+class WarmCandles:
+    """
+    oanda_get_candles() stand-in that reuses the last frame per
+    (instrument, granularity) until its next candle can have closed.
+    A cached frame at least `count` bars deep serves any shorter
+    request (mes_planner lookbacks differ per strategy) with its
+    tail — exactly what a fetch of `count` complete candles returns.
+    """
+
+    def __init__(self, fetch: Callable):
+        self.fetch = fetch
+        self.frames: Dict[Tuple[str, str], object] = {}
+        self.hits = 0
+        self.fetches = 0
+
+    def __call__(self, inst: str, tf: str, count: Optional[int] = None):
+        key = (inst, tf)
+        df = self.frames.get(key)
+        if (df is not None and (count is None or len(df) >= count)
+                and datetime.now(timezone.utc) < next_close(tf, df.index[-1].to_pydatetime())):
+            self.hits += 1
+            return df if count is None else df.tail(count)
+        df = self.fetch(inst, tf) if count is None else self.fetch(inst, tf, count)
+        self.fetches += 1
+        self.frames[key] = df
+        return df
+
+
+# ============================================================
+# DAEMON
+# ============================================================
+class Scheduler:
+    def __init__(self):
+        self.stop = False
+        self.modules: Dict[str, object] = {}
+        self.run_fn: Dict[str, Callable[[], None]] = {}
+
+    def load(self):
+        import mes_scalp
+        self.modules["scalp"] = mes_scalp
+        self.run_fn["scalp"] = mes_scalp.main_cycle
+        candles = WarmCandles(mes_scalp.oanda_get_candles)
+        mes_scalp.oanda_get_candles = candles
+        self.candles = candles
+
+        try:
+            import mes_swing
+        except SystemExit:
+            # swing safety gate (LIVE without MES_SWING_ARMED=YES)
+            logging.error("[SCHED] mes_swing refused to load — scheduling scalp only")
+        else:
+            self.modules["swing"] = mes_swing
+            self.run_fn["swing"] = mes_swing.main
+            mes_swing.oanda_get_candles = candles
+
+    def run_job(self, name: str):
+        t0 = time.monotonic()
+        with open(LOCKS[name], "w") as lock_fd:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # an overrunning cycle (oneshot / runner) — skip, never queue
+                logging.warning(f"[SCHED] {name} previous cycle still running — skipped")
+                return
+            try:
+                mod = self.modules[name]
+                logging.info(f"[SCHED] {mod.VERSION} cycle")
+                cache = getattr(mod, "htf_cache", None)
+                if cache is not None:
+                    cache.hits = cache.misses = 0
+                self.run_fn[name]()
+            except Exception as e:
+                logging.exception(f"[SCHED] {name} cycle failed: {e}")
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        logging.info(
+            f"[SCHED] {name} done in {time.monotonic() - t0:.2f}s "
+            f"(candles: {self.candles.hits} reused / {self.candles.fetches} fetched)"
+        )
+
+    def sleep_until(self, t: datetime):
+        while not self.stop:
+            left = (t - datetime.now(timezone.utc)).total_seconds()
+            if left <= 0:
+                return
+            time.sleep(min(left, 5.0))
+
+    def forever(self):
+        names = list(self.run_fn)
+        logging.info(f"[SCHED] {MODE} scheduler: {', '.join(names)} "
+                     f"(+{DELAY_S:.0f}s after close)")
+        after = datetime.now(timezone.utc)
+        while not self.stop:
+            at, due = plan(after, names, 1)[0]
+            logging.info(f"[SCHED] next: {', '.join(due)} at {at:%a %H:%M} UTC")
+            self.sleep_until(at + timedelta(seconds=DELAY_S))
+            if self.stop:
+                break
+            for name in due:
+                self.run_job(name)
+            # cycles that overran a later close are skipped, not queued
+            after = max(at, datetime.now(timezone.utc) - timedelta(seconds=DELAY_S))
+        logging.info("[SCHED] stopped")
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Resident MES scheduler")
+    ap.add_argument("--plan", type=int, metavar="N", help="print the next N cycles and exit")
+    args = ap.parse_args()
+
+    if args.plan:
+        for at, due in plan(datetime.now(timezone.utc), list(JOBS), args.plan):
+            print(f"{at + timedelta(seconds=DELAY_S):%a %Y-%m-%d %H:%M:%S} UTC  {', '.join(due)}")
+        sys.exit(0)
+
+    daemon_lock = open(f"/tmp/mes_scheduler_{MODE.lower()}.lock", "w")
+    try:
+        fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print(f"mes_scheduler {MODE} already running")
+        sys.exit(1)
+
+    sched = Scheduler()
+
+    def _stop(*_):
+        sched.stop = True
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    sched.load()
+    sched.forever()
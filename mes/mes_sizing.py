@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_sizing.py
+# Version: v1.0.0
+#
+# Purpose:
+#   Vectorized risk sizing for every candidate of a cycle in one
+#   NumPy pass:
+#     risk units  = NAV × risk_pct / (SL distance × quote→home)
+#     margin/unit = price × quote→home × marginRate
+#     cap units   = NAV × max_margin_frac / margin/unit
+#     units       = min(risk, cap, maximumOrderUnits), floored to
+#                   tradeUnitsPrecision, 0 below minimumTradeSize
+#   Metadata and conversions come from mes_instruments — sizing adds
+#   no network round-trip at decision time.
+#
+# Design goals:
+#   • Same formula for scalp diagnostics and swing orders
+#   • Per-row reason instead of exceptions (missing conversion, size)
+# ============================================================
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class Sizing:
+    instruments: List[str]
+    risk_units: np.ndarray
+    units: np.ndarray                # unsigned, after caps and rounding
+    margin_used: np.ndarray          # home currency
+    capped: np.ndarray               # margin cap was binding
+    reasons: List[Optional[str]]     # None when units > 0
+
+    def row(self, inst: str) -> Dict[str, object]:
+        i = self.instruments.index(inst)
+        return {
+            "risk_units": int(self.risk_units[i]) if np.isfinite(self.risk_units[i]) else 0,
+            "units": int(self.units[i]),
+            "margin_used": float(self.margin_used[i]),
+            "was_margin_capped": bool(self.capped[i]),
+            "reason": self.reasons[i],
+        }
+
+    @property
+    def total_margin(self) -> float:
+        return float(self.margin_used.sum())
+
+
+def size_batch(cache, instruments: Sequence[str], entry: Sequence[float],
+               sl_distance: Sequence[float], nav: float, risk_pct: float,
+               max_margin_frac: float) -> Sizing:
+    insts = list(instruments)
+    n = len(insts)
+    meta = [cache.meta(i) for i in insts]
+    price = np.asarray(entry, dtype=float)
+    sl = np.asarray(sl_distance, dtype=float)
+    quote_home = np.array([cache.to_home(i.split("_")[1]) for i in insts], dtype=float)
+    rate = np.array([m["marginRate"] for m in meta], dtype=float)
+    min_size = np.array([m["minimumTradeSize"] for m in meta], dtype=float)
+    max_units = np.array([m["maximumOrderUnits"] for m in meta], dtype=float)
+    scale = np.array([10.0 ** m["tradeUnitsPrecision"] for m in meta], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk = nav * risk_pct / (sl * quote_home)
+        per_unit = price * quote_home * rate
+        cap = nav * max_margin_frac / per_unit
+        units = np.minimum(np.minimum(risk, cap), max_units)    # nan propagates → invalid
+        units = np.floor(units * scale) / scale
+    valid = np.isfinite(units) & (units >= min_size) & (sl > 0)
+    units = np.where(valid, units, 0.0)
+    capped = valid & (cap < risk)
+    margin = np.where(valid, units * per_unit, 0.0)
+
+    reasons: List[Optional[str]] = []
+    for i in range(n):
+        if valid[i]:
+            reasons.append(None)
+        elif math.isnan(quote_home[i]):
+            reasons.append(f"no {insts[i].split('_')[1]} conversion")
+        elif not sl[i] > 0:
+            reasons.append("no stop distance")
+        else:
+            reasons.append(f"size below minimum (NAV {nav:.2f})")
+    return Sizing(insts, risk, units, margin, capped, reasons)
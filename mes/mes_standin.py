@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_standin.py
+# Version: v1.3.0
+#
+# Purpose:
+#   Local stand-in for the OANDA v20 REST API so mes_scalp.py /
+#   mes_swing.py can run unmodified without credentials:
+#     • GET  accounts/{id}, /summary, /openPositions, /pricing
+#            (incl. includeHomeConversions),
+#            /instruments, /changes?sinceTransactionID,
+#            /transactions/sinceid?id (1000 per answer)
+#     • GET  instruments/{inst}/candles  (price=M, count, from)
+#     • POST accounts/{id}/orders        (MARKET, filled at bid/ask)
+#     • PUT  accounts/{id}/positions/{inst}/close
+#   Candles are recorded (mes_replay CandleStore CSVs, shifted to the
+#   present by whole days) or synthetic (deterministic per instrument,
+#   granularity and bar time). Latency, jitter, random 429s, random
+#   503s, lost order answers (order executed, 503 returned) and a
+#   requests-per-second limit can be injected. Responses are gzip
+#   encoded when the client accepts it (as OANDA does); /__stats
+#   reports the bytes sent.
+#
+# Design goals:
+#   • Standard library + NumPy; threaded server with HTTP/1.1
+#     keep-alive, so Session connection reuse behaves as in production
+#   • Any URL prefix before /v3/ is accepted (…/fxpractice → DEMO)
+#   • Same candle asked twice → same answer (no hidden randomness)
+#   • GET /__stats, POST /__reset for load harnesses (mes_load.py)
+#
+# Usage:
+#   mes_standin.py --port 8765 --instruments 70 --latency-ms 40 --p429 0.01
+#   mes_standin.py --p-lost 0.5       # order answers lost (mes_orders reconcile)
+#   OANDA_API_URL=http://127.0.0.1:8765/fxpractice OANDA_API_TOKEN=x \
+#   OANDA_ACCOUNT_ID=standin python mes_scalp.py
+# ============================================================
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from mes_metrics import request_key
+
+GZIP_MIN_BYTES = 1024          # smaller answers are sent as they are
+
+GRANULARITY_SECONDS = {"S5": 5, "M1": 60, "M5": 300, "M15": 900, "M30": 1800,
+                       "H1": 3600, "H4": 14400, "D": 86400}
+
+# ------------------------------------------------------------
+# UNIVERSE
+# ------------------------------------------------------------
+# the MES lists first, then crosses / exotics by liquidity
+MES_MAJORS = ["EUR_USD", "GBP_USD", "AUD_USD", "NZD_USD",
+              "USD_CAD", "USD_CHF", "EUR_GBP", "USD_JPY"]
+
+USD_VALUE = {
+    "EUR": 1.08, "USD": 1.0, "JPY": 0.0067, "GBP": 1.27, "AUD": 0.66, "CAD": 0.73,
+    "CHF": 1.13, "NZD": 0.60, "SEK": 0.095, "NOK": 0.093, "DKK": 0.145, "SGD": 0.74,
+    "HKD": 0.128, "PLN": 0.25, "MXN": 0.055, "ZAR": 0.054, "TRY": 0.03, "CZK": 0.043,
+    "HUF": 0.0027, "CNH": 0.138, "THB": 0.028,
+}
+LIQUIDITY = list(USD_VALUE)                     # most liquid first
+BASE_ORDER = ["EUR", "GBP", "AUD", "NZD", "USD", "CAD", "CHF"]   # OANDA base precedence
+TWO_DECIMAL_QUOTES = {"JPY", "HUF", "THB"}
+
+
+def _pair(a: str, b: str) -> str:
+    rank = lambda c: BASE_ORDER.index(c) if c in BASE_ORDER else len(BASE_ORDER) + (c == "JPY")
+    return f"{a}_{b}" if rank(a) <= rank(b) else f"{b}_{a}"
+
+
+def universe(n: Optional[int] = None) -> List[str]:
+    """MES majors, then every other pair of LIQUIDITY ordered by its rarer leg."""
+    rest = sorted((_pair(a, b) for a, b in combinations(LIQUIDITY, 2)),
+                  key=lambda p: (max(LIQUIDITY.index(c) for c in p.split("_")),
+                                 sum(LIQUIDITY.index(c) for c in p.split("_"))))
+    out = MES_MAJORS + [p for p in rest if p not in MES_MAJORS]
+    return out[:n] if n else out
+
+
+def pip_size(inst: str) -> float:
+    return 0.01 if inst.split("_")[1] in TWO_DECIMAL_QUOTES else 0.0001
+
+
+def display_precision(inst: str) -> int:
+    return 3 if pip_size(inst) == 0.01 else 5
+
+
+def typical_spread_pips(inst: str) -> float:
+    worst = max(LIQUIDITY.index(c) for c in inst.split("_"))
+    if worst < 8:
+        return 0.8 + 0.3 * worst
+    return 8.0 + 4.0 * (worst - 8)
+
+
+# ------------------------------------------------------------
+# SYNTHETIC PRICES
+# ------------------------------------------------------------
+def _seed(text: str) -> int:
+    h = 1469598103934665603
+    for ch in text.encode():
+        h = ((h ^ ch) * 1099511628211) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+
+def _noise(t: np.ndarray, seed: int) -> np.ndarray:
+    """Deterministic uniform [-1, 1) per (seed, integer time)."""
+    x = t.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(seed)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 52) - 1.0
+
+
+class Synthetic:
+    """Smooth multi-scale path + hashed noise; price(t) is a pure function."""
+
+    def __init__(self, inst: str):
+        base, quote = inst.split("_")
+        self.inst = inst
+        self.level = USD_VALUE[base] / USD_VALUE[quote]
+        self.seed = _seed(inst)
+        rnd = random.Random(self.seed)
+        self.phase = [rnd.uniform(0, 2 * np.pi) for _ in range(3)]
+
+    def price(self, t: np.ndarray) -> np.ndarray:
+        t = np.asarray(t, dtype=np.float64)
+        wave = (0.010 * np.sin(2 * np.pi * t / (3.1 * 86400) + self.phase[0])
+                + 0.003 * np.sin(2 * np.pi * t / (5.3 * 3600) + self.phase[1])
+                + 0.0008 * np.sin(2 * np.pi * t / (17 * 60) + self.phase[2]))
+        return self.level * np.exp(wave + 0.00012 * _noise(t, self.seed))
+
+    def candles(self, step: int, starts: np.ndarray) -> np.ndarray:
+        """(n, 5) open/high/low/close/volume for bars starting at `starts`."""
+        o = self.price(starts)
+        c = self.price(starts + step)
+        mid = self.price(starts + step // 2)
+        wick = 1 + 0.00015 * np.sqrt(step / 60) * np.abs(_noise(starts + 1, self.seed))
+        h = np.maximum(np.maximum(o, c), mid) * wick
+        lo = np.minimum(np.minimum(o, c), mid) / wick
+        v = 20 + (np.abs(_noise(starts + 2, self.seed)) * 200 * np.sqrt(step / 60)).astype(int)
+        return np.column_stack([o, h, lo, c, v])
+
+
+# ------------------------------------------------------------
+# MARKET DATA (recorded or synthetic)
+# ------------------------------------------------------------
+class Market:
+    def __init__(self, instruments: List[str], data: Optional[Path] = None):
+        self.instruments = list(instruments)
+        self.synthetic = {i: Synthetic(i) for i in self.instruments}
+        self.store = None
+        self.shift_s = 0
+        if data:
+            from mes_replay import CandleStore
+            self.store = CandleStore(Path(data))
+            recorded = set(self.store.instruments("H1"))
+            self.recorded = [i for i in self.instruments if i in recorded]
+            if self.recorded:
+                last = max(self.store.load(i, "H1").close_time[-1] for i in self.recorded) // 10**9
+                day = 86400
+                self.shift_s = (int(time.time()) // day - int(last) // day) * day
+        else:
+            self.recorded = []
+
+    def candles(self, inst: str, tf: str, count: int, now: float,
+                since: Optional[float] = None) -> List[dict]:
+        """Last `count` complete bars, or the first `count` from `since`."""
+        step = GRANULARITY_SECONDS[tf]
+        if inst in self.recorded:
+            try:
+                s = self.store.load(inst, tf)
+            except FileNotFoundError:
+                s = None
+            if s is not None:
+                hi = s.available(int((now - self.shift_s) * 1e9))
+                if since is None:
+                    lo = max(0, hi - count)
+                else:
+                    lo = int(np.searchsorted(s.start, int((since - self.shift_s) * 1e9)))
+                    hi = min(hi, lo + count)
+                starts = s.start[lo:hi] // 10**9 + self.shift_s
+                return self._rows(inst, starts, s.values[lo:hi], complete=True)
+        last = int(now) // step * step - step          # last complete bar
+        if since is None:
+            starts = last - step * np.arange(count - 1, -1, -1, dtype=np.int64)
+        else:
+            first = -(-int(since) // step) * step
+            starts = np.arange(first, min(last, first + step * (count - 1)) + 1, step, dtype=np.int64)
+        return self._rows(inst, starts, self.synthetic[inst].candles(step, starts), complete=True)
+
+    def _rows(self, inst: str, starts, values, complete: bool) -> List[dict]:
+        p = display_precision(inst)
+        return [{
+            "complete": complete,
+            "volume": int(v[4]),
+            "time": datetime.fromtimestamp(int(t), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"),
+            "mid": {"o": f"{v[0]:.{p}f}", "h": f"{v[1]:.{p}f}", "l": f"{v[2]:.{p}f}", "c": f"{v[3]:.{p}f}"},
+        } for t, v in zip(starts, values)]
+
+    def mid(self, inst: str, now: float) -> float:
+        if inst in self.recorded:
+            bars = self.candles(inst, "M1", 1, now)
+            if bars:
+                return float(bars[-1]["mid"]["c"])
+        return float(self.synthetic[inst].price(np.array([now]))[0])
+
+    def quote(self, inst: str, now: float) -> Tuple[float, float]:
+        m = self.mid(inst, now)
+        half = typical_spread_pips(inst) * pip_size(inst) / 2
+        return m - half, m + half
+
+
+# ------------------------------------------------------------
+# ACCOUNT
+# ------------------------------------------------------------
+class Account:
+    def __init__(self, account_id: str, nav: float, margin_rate: float = 0.0333):
+        self.id = account_id
+        self.balance = nav
+        self.margin_rate = margin_rate
+        self.positions: Dict[str, Tuple[float, float]] = {}     # inst → (units, avg price)
+        self.last_txn = 1
+        self.transactions: List[dict] = []
+        self.trades: Dict[str, List[Tuple[str, float, float]]] = {}   # inst → (id, units, price)
+        self.lock = threading.Lock()
+
+    def next_id(self) -> str:
+        self.last_txn += 1
+        return str(self.last_txn)
+
+    def record(self, *txns: dict):
+        self.transactions.extend(txns)
+
+
+# ------------------------------------------------------------
+# FAULTS
+# ------------------------------------------------------------
+class Faults:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 p429: float = 0.0, rps: float = 0.0, retry_after: Optional[float] = None,
+                 p503: float = 0.0, p_lost: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.p429 = p429
+        self.p503 = p503                # 503 before the request is handled
+        self.p_lost = p_lost            # POST / PUT executed, then 503 answered
+        self.rps = rps
+        self.retry_after = retry_after
+        self.rnd = random.Random(seed)
+        self.tokens = rps
+        self.refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            ms = self.rnd.gauss(self.latency_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def throttled(self) -> bool:
+        with self.lock:
+            if self.p429 and self.rnd.random() < self.p429:
+                return True
+            if self.rps <= 0:
+                return False
+            now = time.monotonic()
+            self.tokens = min(self.rps, self.tokens + (now - self.refill) * self.rps)
+            self.refill = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+            return False
+
+    def _chance(self, p: float) -> bool:
+        if not p:
+            return False
+        with self.lock:
+            return self.rnd.random() < p
+
+    def unavailable(self) -> bool:
+        return self._chance(self.p503)
+
+    def lost(self) -> bool:
+        return self._chance(self.p_lost)
+
+
+# ------------------------------------------------------------
+# STATS
+# ------------------------------------------------------------
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.served: Dict[str, int] = {}
+            self.throttled = 0
+            self.bytes = 0
+            self.inflight = 0
+            self.max_inflight = 0
+            self.started = time.time()
+
+    def enter(self, key: str):
+        with self.lock:
+            self.served[key] = self.served.get(key, 0) + 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"requests": sum(self.served.values()), "throttled": self.throttled,
+                    "bytes": self.bytes,
+                    "max_inflight": self.max_inflight, "by_key": dict(self.served),
+                    "seconds": round(time.time() - self.started, 3)}
+
+
+# ------------------------------------------------------------
+# v20 HANDLER
+# ------------------------------------------------------------
+_CANDLES = re.compile(r"/v3/instruments/([A-Z0-9_]+)/candles$")
+_ACCOUNT = re.compile(r"/v3/accounts/([^/]+)(?:/(summary|openPositions|pricing|instruments|changes|orders|transactions/sinceid))?$")
+_CLOSE = re.compile(r"/v3/accounts/([^/]+)/positions/([A-Z0-9_]+)/close$")
+
+
+class StandIn:
+    def __init__(self, market: Market, account: Account, faults: Faults):
+        self.market = market
+        self.account = account
+        self.faults = faults
+        self.stats = Stats()
+        self.known = set(market.instruments)
+
+    # ---------------- endpoints ----------------
+    def summary(self, now: float) -> dict:
+        a = self.account
+        with a.lock:
+            upl = sum(u * (self.market.mid(i, now) - p) * self.usd_per_quote(i, now)
+                      for i, (u, p) in a.positions.items())
+            margin = sum(abs(u) * self.market.mid(i, now) * self.usd_per_quote(i, now) * a.margin_rate
+                         for i, (u, p) in a.positions.items())
+            nav = a.balance + upl
+            return {"account": {
+                "id": a.id, "currency": "USD", "alias": "stand-in",
+                "balance": f"{a.balance:.4f}", "NAV": f"{nav:.4f}",
+                "unrealizedPL": f"{upl:.4f}", "marginRate": f"{a.margin_rate}",
+                "marginUsed": f"{margin:.4f}", "marginAvailable": f"{nav - margin:.4f}",
+                "openPositionCount": len(a.positions), "openTradeCount": len(a.positions),
+                "lastTransactionID": str(a.last_txn),
+            }, "lastTransactionID": str(a.last_txn)}
+
+    def _position(self, inst: str) -> dict:
+        u, p = self.account.positions.get(inst, (0.0, 0.0))
+        long_u, short_u = (u, 0.0) if u > 0 else (0.0, u)
+        return {
+            "instrument": inst,
+            "long": {"units": f"{long_u:g}", "averagePrice": f"{p}" if u > 0 else None},
+            "short": {"units": f"{short_u:g}", "averagePrice": f"{p}" if u < 0 else None},
+        }
+
+    def open_positions(self) -> dict:
+        a = self.account
+        with a.lock:
+            rows = [self._position(i) for i in a.positions]
+            return {"positions": rows, "lastTransactionID": str(a.last_txn)}
+
+    def full_account(self, now: float) -> dict:
+        body = self.summary(now)
+        a = self.account
+        with a.lock:
+            traded = {t["instrument"] for t in a.transactions if "instrument" in t} | set(a.positions)
+            body["account"]["positions"] = [self._position(i) for i in sorted(traded)]
+        return body
+
+    def changes(self, since: str, now: float) -> Tuple[int, dict]:
+        try:
+            since_id = int(since)
+        except ValueError:
+            return 400, {"errorMessage": "Invalid value specified for 'sinceTransactionID'"}
+        a = self.account
+        if since_id > a.last_txn:
+            return 416, {"errorMessage": "sinceTransactionID is beyond lastTransactionID"}
+        summary = self.summary(now)["account"]
+        with a.lock:
+            txns = [t for t in a.transactions if int(t["id"]) > since_id]
+            touched = sorted({t["instrument"] for t in txns if "instrument" in t})
+            fills = [t for t in txns if t["type"] == "ORDER_FILL"]
+            return 200, {
+                "changes": {
+                    "ordersFilled": [t for t in txns if t["type"] == "MARKET_ORDER"],
+                    "tradesOpened": [t["tradeOpened"] for t in fills if t.get("tradeOpened")],
+                    "positions": [self._position(i) for i in touched],
+                    "transactions": txns,
+                },
+                "state": {k: summary[k] for k in ("NAV", "unrealizedPL", "marginUsed", "marginAvailable")},
+                "lastTransactionID": str(a.last_txn),
+            }
+
+    def transactions_since(self, since: str, limit: int = 1000) -> Tuple[int, dict]:
+        try:
+            since_id = int(since)
+        except ValueError:
+            return 400, {"errorMessage": "Invalid value specified for 'id'"}
+        a = self.account
+        with a.lock:
+            txns = [t for t in a.transactions if int(t["id"]) > since_id][:limit]
+            return 200, {"transactions": txns, "lastTransactionID": str(a.last_txn)}
+
+    def pricing(self, insts: List[str], now: float,
+                home_conversions: bool = False) -> Tuple[int, dict]:
+        bad = [i for i in insts if i not in self.known]
+        if bad or not insts:
+            return 400, {"errorMessage": f"Invalid value specified for 'instruments': {','.join(bad)}"}
+        stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+        prices = []
+        for inst in insts:
+            bid, ask = self.market.quote(inst, now)
+            p = display_precision(inst)
+            prices.append({
+                "type": "PRICE", "instrument": inst, "time": stamp, "tradeable": True,
+                "bids": [{"price": f"{bid:.{p}f}", "liquidity": 1000000}],
+                "asks": [{"price": f"{ask:.{p}f}", "liquidity": 1000000}],
+                "closeoutBid": f"{bid:.{p}f}", "closeoutAsk": f"{ask:.{p}f}",
+            })
+        out = {"prices": prices, "time": stamp}
+        if home_conversions:
+            currencies = sorted({c for inst in insts for c in inst.split("_")})
+            out["homeConversions"] = [
+                {"currency": c, "accountGain": f"{USD_VALUE[c]:.8f}",
+                 "accountLoss": f"{USD_VALUE[c]:.8f}", "positionValue": f"{USD_VALUE[c]:.8f}"}
+                for c in currencies
+            ]
+        return 200, out
+
+    def instruments(self) -> dict:
+        rows = []
+        for inst in self.market.instruments:
+            p = display_precision(inst)
+            rows.append({
+                "name": inst, "type": "CURRENCY", "displayName": inst.replace("_", "/"),
+                "pipLocation": -2 if pip_size(inst) == 0.01 else -4,
+                "displayPrecision": p, "tradeUnitsPrecision": 0,
+                "minimumTradeSize": "1", "maximumOrderUnits": "100000000",
+                "marginRate": f"{self.account.margin_rate if inst in MES_MAJORS else 0.05}",
+            })
+        return {"instruments": rows, "lastTransactionID": str(self.account.last_txn)}
+
+    def usd_per_quote(self, inst: str, now: float) -> float:
+        return USD_VALUE[inst.split("_")[1]]
+
+    def order(self, body: dict, now: float) -> Tuple[int, dict]:
+        o = body.get("order") or {}
+        inst = o.get("instrument", "")
+        if inst not in self.known or o.get("type") != "MARKET":
+            return 400, {"errorMessage": "Invalid order", "errorCode": "INVALID_ORDER"}
+        units = float(o.get("units", 0))
+        if units == 0:
+            return 400, {"errorMessage": "Units must be non-zero", "errorCode": "UNITS_INVALID"}
+        bid, ask = self.market.quote(inst, now)
+        price = ask if units > 0 else bid
+        a = self.account
+        with a.lock:
+            create_id = a.next_id()
+            fill_id = a.next_id()
+            u0, p0 = a.positions.get(inst, (0.0, 0.0))
+            u1 = u0 + units
+            p1 = price if u0 == 0 or (u0 > 0) != (u1 > 0) else (u0 * p0 + units * price) / u1
+            if u1 == 0:
+                a.positions.pop(inst, None)
+            else:
+                a.positions[inst] = (u1, p1)
+            a.trades.setdefault(inst, []).append((fill_id, units, price))
+            stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            create = {**o, "id": create_id, "type": "MARKET_ORDER", "time": stamp}
+            fill = {
+                "id": fill_id, "orderID": create_id, "type": "ORDER_FILL", "time": stamp,
+                "instrument": inst, "units": f"{units:g}", "price": f"{price}", "pl": "0.0000",
+                "tradeOpened": {"tradeID": fill_id, "units": f"{units:g}",
+                                "clientExtensions": o.get("tradeClientExtensions")},
+                "clientExtensions": o.get("clientExtensions"),
+            }
+            a.record(create, fill)
+            return 201, {
+                "orderCreateTransaction": create,
+                "orderFillTransaction": fill,
+                "relatedTransactionIDs": [create_id, fill_id],
+                "lastTransactionID": fill_id,
+            }
+
+    def close(self, inst: str, body: dict, now: float) -> Tuple[int, dict]:
+        a = self.account
+        bid, ask = self.market.quote(inst, now)
+        with a.lock:
+            u, p = a.positions.get(inst, (0.0, 0.0))
+            side = "long" if u > 0 else "short"
+            if u == 0 or body.get(f"{side}Units") != "ALL":
+                return 400, {"errorMessage": "The Position requested does not exist",
+                             "errorCode": "CLOSEOUT_POSITION_DOESNT_EXIST"}
+            price = bid if u > 0 else ask
+            conv = self.usd_per_quote(inst, now)
+            closed = [{"tradeID": tid, "units": f"{-tu:g}", "financing": "0.0000",
+                       "realizedPL": f"{tu * (price - tp) * conv:.4f}"}
+                      for tid, tu, tp in a.trades.pop(inst, [])]
+            pl = u * (price - p) * conv
+            a.balance += pl
+            a.positions.pop(inst)
+            create_id = a.next_id()
+            fill_id = a.next_id()
+            stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            ext = body.get(f"{side}ClientExtensions")
+            create = {"id": create_id, "type": "MARKET_ORDER", "time": stamp, "instrument": inst,
+                      "units": f"{-u:g}", "reason": "POSITION_CLOSEOUT",
+                      **({"clientExtensions": ext} if ext else {})}
+            fill = {"id": fill_id, "orderID": create_id, "type": "ORDER_FILL", "time": stamp,
+                    "instrument": inst, "units": f"{-u:g}", "price": f"{price}", "pl": f"{pl:.4f}",
+                    "tradesClosed": closed}
+            a.record(create, fill)
+            return 200, {
+                f"{side}OrderCreateTransaction": create,
+                f"{side}OrderFillTransaction": fill,
+                "relatedTransactionIDs": [create_id, fill_id],
+                "lastTransactionID": fill_id,
+            }
+
+    # ---------------- dispatch ----------------
+    def handle(self, method: str, raw_path: str, body: dict) -> Tuple[int, dict]:
+        url = urlparse(raw_path)
+        path = url.path[url.path.find("/v3/"):] if "/v3/" in url.path else url.path
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        now = time.time()
+
+        m = _CANDLES.search(path)
+        if m and method == "GET":
+            inst, tf = m.group(1), q.get("granularity", "S5")
+            if inst not in self.known:
+                return 400, {"errorMessage": "Invalid value specified for 'instrument'"}
+            if tf not in GRANULARITY_SECONDS:
+                return 400, {"errorMessage": "Invalid value specified for 'granularity'"}
+            count = min(int(q.get("count", 500)), 5000)
+            since = (datetime.fromisoformat(q["from"].replace("Z", "+00:00")).timestamp()
+                     if "from" in q else None)
+            return 200, {"instrument": inst, "granularity": tf,
+                         "candles": self.market.candles(inst, tf, count, now, since)}
+
+        m = _CLOSE.search(path)
+        if m and method == "PUT":
+            return self.close(m.group(2), body, now)
+
+        m = _ACCOUNT.search(path)
+        if m:
+            if m.group(1) != self.account.id:
+                return 400, {"errorMessage": "Invalid value specified for 'accountID'"}
+            what = m.group(2)
+            if what is None and method == "GET":
+                return 200, self.full_account(now)
+            if what == "changes" and method == "GET":
+                return self.changes(q.get("sinceTransactionID", ""), now)
+            if what == "transactions/sinceid" and method == "GET":
+                return self.transactions_since(q.get("id", ""))
+            if what == "summary" and method == "GET":
+                return 200, self.summary(now)
+            if what == "openPositions" and method == "GET":
+                return 200, self.open_positions()
+            if what == "instruments" and method == "GET":
+                return 200, self.instruments()
+            if what == "pricing" and method == "GET":
+                return self.pricing([i for i in q.get("instruments", "").split(",") if i], now,
+                                    q.get("includeHomeConversions") == "true")
+            if what == "orders" and method == "POST":
+                return self.order(body, now)
+        return 404, {"errorMessage": f"stand-in: no route for {method} {path}"}
+
+
+def make_handler(app: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict, headers: Optional[dict] = None,
+                   counted: bool = True):
+            data = json.dumps(payload).encode()
+            gz = len(data) > GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+            if gz:
+                data = gzip.compress(data, compresslevel=6)
+            if counted:
+                with app.stats.lock:
+                    app.stats.bytes += len(data)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            if gz:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _serve(self, method: str):
+            n = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(n) if n else b""
+            if self.path.startswith("/__stats"):
+                return self._reply(200, app.stats.snapshot(), counted=False)
+            if self.path.startswith("/__reset"):
+                app.stats.reset()
+                return self._reply(200, {"ok": True}, counted=False)
+
+            key = request_key(method, self.path, {k: v[-1] for k, v in
+                                                  parse_qs(urlparse(self.path).query).items()})
+            app.stats.enter(key)
+            try:
+                app.faults.delay()
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    return self._reply(401, {"errorMessage": "Insufficient authorization to perform request."})
+                if app.faults.throttled():
+                    with app.stats.lock:
+                        app.stats.throttled += 1
+                    extra = ({"Retry-After": f"{app.faults.retry_after:g}"}
+                             if app.faults.retry_after is not None else None)
+                    return self._reply(429, {"errorMessage": "Requests are being rate limited"}, extra)
+                if app.faults.unavailable():
+                    return self._reply(503, {"errorMessage": "Service unavailable"})
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    return self._reply(400, {"errorMessage": "Invalid JSON body"})
+                status, payload = app.handle(method, self.path, body)
+                if method != "GET" and app.faults.lost():
+                    return self._reply(503, {"errorMessage": "Service unavailable"})
+                self._reply(status, payload)
+            finally:
+                app.stats.leave()
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+        def do_PUT(self):
+            self._serve("PUT")
+
+    return Handler
+
+
+def start(app: StandIn, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve in a daemon thread; returns (server, base URL ending in /fxpractice)."""
+    server = ThreadingHTTPServer((host, port), make_handler(app))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/fxpractice"
+
+
+def build(instruments: int = 70, data: Optional[Path] = None, nav: float = 10_000.0,
+          account_id: str = "standin", **faults) -> StandIn:
+    return StandIn(Market(universe(instruments), data), Account(account_id, nav), Faults(**faults))
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local OANDA v20 stand-in for MES")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--instruments", type=int, default=70, help="universe size served")
+    ap.add_argument("--data", type=Path, help="CandleStore dir (recorded candles win)")
+    ap.add_argument("--account", default="standin")
+    ap.add_argument("--nav", type=float, default=10_000.0)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--p429", type=float, default=0.0, help="probability of a random 429")
+    ap.add_argument("--rps", type=float, default=0.0, help="token bucket limit (0 = off)")
+    ap.add_argument("--retry-after", type=float, help="Retry-After seconds on 429")
+    ap.add_argument("--p503", type=float, default=0.0, help="probability of a random 503")
+    ap.add_argument("--p-lost", type=float, default=0.0,
+                    help="probability an order is executed but answered 503")
+    args = ap.parse_args()
+
+    app = build(args.instruments, args.data, args.nav, args.account,
+                latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, p429=args.p429,
+                rps=args.rps, retry_after=args.retry_after, p503=args.p503, p_lost=args.p_lost)
+    server, url = start(app, args.host, args.port)
+    print(f"OANDA v20 stand-in: {url}  account={args.account}  "
+          f"{len(app.market.instruments)} instruments"
+          + (f" ({len(app.market.recorded)} recorded)" if app.market.recorded else ""))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# ============================================================
+# File: mes_stream.py
+# Version: v1.0.1
+#
+# Purpose:
+#   Event-driven M1 continuation check for MES scalp.
+#   Consumes the OANDA v20 pricing stream for the scalp
+#   instruments, builds M1 (and M5) mid bars locally in ring
+#   buffers and runs mes_scalp.check_continuation() the moment
+#   an M1 bar closes — instead of up to 15 minutes later on the
+#   next timer cycle.
+#
+# Design goals:
+#   • Bars closed by the first tick OR heartbeat past the boundary
+#     (heartbeats arrive every 5s → second-level close latency)
+#   • Ring buffers seeded from REST candles so ATR is valid at once
+#   • Stream URL configurable (OANDA_STREAM_URL) — any local
+#     stand-in works; `--standin` serves synthetic ticks
+#   • Reconnect with backoff, never crash on a dropped stream
+#   • Each M1 close is one tracer cycle (component "stream"): spans
+#     saved to metrics_<mode>.json and reset, so the resident process
+#     keeps no growing span list
+# ============================================================
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# ============================================================
+# CONFIG
+# ============================================================
+RING_SIZE = 300                       # matches scalp CANDLE_COUNT
+BAR_SECONDS = {"M1": 60, "M5": 300}
+RECONNECT_MAX_S = 60.0
+
+# (open_epoch, open, high, low, close, ticks)
+Bar = Tuple[float, float, float, float, float, int]
+
+
+# ============================================================
+# LOCAL BAR BUILDER
+# ============================================================
+class BarBuilder:
+    """
+    Aggregates mid ticks into fixed-width bars aligned to UTC
+    (same boundaries as OANDA M1/M5 candles). Closed bars go to
+    a ring buffer; the forming bar is kept separately.
+    """
+
+    def __init__(self, granularity: str, maxlen: int = RING_SIZE):
+        self.granularity = granularity
+        self.seconds = BAR_SECONDS[granularity]
+        self.bars: Deque[Bar] = deque(maxlen=maxlen)
+        self.current: Optional[List[float]] = None
+
+    def _bucket(self, ts: float) -> float:
+        return math.floor(ts / self.seconds) * self.seconds
+
+    def seed(self, df: pd.DataFrame):
+        """Fill the ring from a REST candle frame (complete candles only)."""
+        for t, row in df.iterrows():
+            self.bars.append((
+                t.timestamp(), float(row["open"]), float(row["high"]),
+                float(row["low"]), float(row["close"]), int(row["volume"]),
+            ))
+
+    def advance(self, ts: float) -> Optional[Bar]:
+        """Close the forming bar if ts is past its boundary."""
+        if self.current is None or ts < self.current[0] + self.seconds:
+            return None
+        bar = tuple(self.current)
+        self.bars.append(bar)
+        self.current = None
+        return bar
+
+    def tick(self, ts: float, mid: float) -> Optional[Bar]:
+        """Apply one price; returns the bar this tick closed, if any."""
+        if self.bars and ts < self.bars[-1][0] + self.seconds:
+            return None          # late tick for an already closed bar
+        closed = self.advance(ts)
+        if self.current is None:
+            self.current = [self._bucket(ts), mid, mid, mid, mid, 0]
+        c = self.current
+        c[2] = max(c[2], mid)
+        c[3] = min(c[3], mid)
+        c[4] = mid
+        c[5] += 1
+        return closed
+
+    def frame(self) -> pd.DataFrame:
+        """Closed bars in the oanda_get_candles() schema."""
+        df = pd.DataFrame(
+            list(self.bars),
+            columns=["time", "open", "high", "low", "close", "volume"],
+        )
+        df["time"] = pd.to_datetime(df["time"], unit="s", utc=True)
+        return df.set_index("time")
+
+
+# ============================================================
+# STREAM MESSAGE HANDLING
+# ============================================================
+def parse_message(line: bytes | str) -> Optional[dict]:
+    """
+    Normalize one stream line to {"type", "time", [instrument, mid]}.
+    Expects Accept-Datetime-Format: UNIX (time is epoch seconds).
+    """
+    try:
+        msg = json.loads(line)
+    except Exception:
+        return None
+    kind = msg.get("type")
+    if kind == "HEARTBEAT":
+        return {"type": kind, "time": float(msg["time"])}
+    if kind == "PRICE" and msg.get("bids") and msg.get("asks"):
+        bid = float(msg["bids"][0]["price"])
+        ask = float(msg["asks"][0]["price"])
+        return {
+            "type": kind,
+            "time": float(msg["time"]),
+            "instrument": msg["instrument"],
+            "mid": (bid + ask) / 2,
+        }
+    return None
+
+
+class StreamBars:
+    """
+    Per-instrument M1/M5 builders plus the bar-closed event.
+    on_close(inst, granularity, bar, builder) is called once per
+    closed bar, in time order.
+    """
+
+    def __init__(self, instruments: Iterable[str],
+                 on_close: Callable[[str, str, Bar, BarBuilder], None],
+                 granularities: Iterable[str] = ("M1", "M5")):
+        self.builders: Dict[str, Dict[str, BarBuilder]] = {
+            inst: {g: BarBuilder(g) for g in granularities}
+            for inst in instruments
+        }
+        self.on_close = on_close
+
+    def handle(self, msg: dict):
+        ts = msg["time"]
+        if msg["type"] == "HEARTBEAT":
+            for inst, per_g in self.builders.items():
+                for g, b in per_g.items():
+                    bar = b.advance(ts)
+                    if bar:
+                        self.on_close(inst, g, bar, b)
+            return
+        per_g = self.builders.get(msg["instrument"])
+        if not per_g:
+            return
+        for g, b in per_g.items():
+            bar = b.tick(ts, msg["mid"])
+            if bar:
+                self.on_close(msg["instrument"], g, bar, b)
+
+
+def stream_url_from_rest(rest_url: str) -> str:
+    return os.getenv("OANDA_STREAM_URL", rest_url.replace("//api-", "//stream-")).rstrip("/")
+
+
+def consume(session, stream_url: str, account_id: str,
+            instruments: List[str], bars: StreamBars,
+            stop: Callable[[], bool] = lambda: False):
+    """Read the pricing stream forever, reconnecting with backoff."""
+    backoff = 1.0
+    while not stop():
+        try:
+            with session.get(
+                f"{stream_url}/v3/accounts/{account_id}/pricing/stream",
+                params={"instruments": ",".join(instruments)},
+                headers={"Accept-Datetime-Format": "UNIX"},
+                stream=True,
+                timeout=(10, 30),
+            ) as r:
+                r.raise_for_status()
+                logging.info(f"[STREAM] connected ({len(instruments)} instruments)")
+                backoff = 1.0
+                for line in r.iter_lines():
+                    if stop():
+                        return
+                    msg = parse_message(line) if line else None
+                    if msg:
+                        bars.handle(msg)
+        except Exception as e:
+            logging.warning(f"[STREAM] disconnected: {e} — retry in {backoff:.0f}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_S)
+
+
+# ============================================================
+# SCALP WIRING
+# ============================================================
+def run_scalp_stream():
+    import mes_scalp as scalp
+
+    tracer = scalp.tracer
+    tracer.component = "stream"         # closes kept apart from the timer cycles
+
+    def on_close(inst: str, g: str, bar: Bar, builder: BarBuilder):
+        if g != "M1":
+            return
+        closed_at = bar[0] + builder.seconds
+        tracer.begin_cycle()
+        try:
+            with tracer.span("cycle"):
+                align = scalp.check_continuation(inst, builder.frame())
+            scalp.htf_cache.save()
+        except Exception as e:
+            logging.error(f"[STREAM] {inst} check failed: {e}")
+            return
+        finally:
+            tracer.save()
+        lag = time.time() - closed_at
+        logging.info(
+            f"[STREAM] {inst} M1 close → {align or 'no signal'} ({lag:.2f}s after close)"
+        )
+
+    bars = StreamBars(scalp.INSTRUMENTS, on_close)
+    for inst in scalp.INSTRUMENTS:
+        bars.builders[inst]["M1"].seed(scalp.oanda_get_candles(inst, "M1"))
+        bars.builders[inst]["M5"].seed(scalp.oanda_get_candles(inst, "M5"))
+
+    logging.info(f"[STREAM] {scalp.VERSION} bar builder starting")
+    consume(
+        scalp.oanda,
+        stream_url_from_rest(scalp.OANDA_REST_URL),
+        scalp.OANDA_ACCOUNT_ID,
+        scalp.INSTRUMENTS,
+        bars,
+    )
+
+
+# ============================================================
+# LOCAL STAND-IN STREAM (synthetic random walk)
+# ============================================================
+def synthetic_ticks(instruments: List[str], seed: int = 7,
+                    heartbeat_s: float = 5.0, rate_hz: float = 4.0):
+    """Yield v20-shaped PRICE / HEARTBEAT dicts in real time."""
+    rng = random.Random(seed)
+    mids = {i: (150.0 if i.endswith("JPY") else 1.10) for i in instruments}
+    last_hb = 0.0
+    while True:
+        now = time.time()
+        if now - last_hb >= heartbeat_s:
+            last_hb = now
+            yield {"type": "HEARTBEAT", "time": f"{now:.6f}"}
+        inst = rng.choice(instruments)
+        step = 0.01 if inst.endswith("JPY") else 0.0001
+        mids[inst] += rng.gauss(0, step)
+        half = step * 0.6
+        yield {
+            "type": "PRICE",
+            "instrument": inst,
+            "time": f"{now:.6f}",
+            "bids": [{"price": f"{mids[inst] - half:.5f}", "liquidity": 1000000}],
+            "asks": [{"price": f"{mids[inst] + half:.5f}", "liquidity": 1000000}],
+            "tradeable": True,
+        }
+        time.sleep(1.0 / rate_hz)
+
+
+def serve_standin(port: int):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith("/pricing/stream"):
+                self.send_error(404)
+                return
+            insts = parse_qs(url.query).get("instruments", ["EUR_USD"])[0].split(",")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            try:
+                for msg in synthetic_ticks(insts):
+                    self.wfile.write(json.dumps(msg).encode() + b"\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    logging.info(f"[STREAM] stand-in pricing stream on http://127.0.0.1:{port}")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MES local M1/M5 bar builder")
+    ap.add_argument("--standin", type=int, metavar="PORT",
+                    help="serve a synthetic pricing stream instead of consuming one")
+    args = ap.parse_args()
+
+    if args.standin:
+        logging.basicConfig(level=logging.INFO,
+                            format="[%(asctime)s] %(levelname)s: %(message)s")
+        serve_standin(args.standin)
+    else:
+        run_scalp_stream()
@@ -2,33 +2,160 @@
 # -*- coding: utf-8 -*-
 """
 MES Swing Trader
-Version: v3.4.14 — Single Candle Structure Check
+Version: v3.7.1 — Order Execution
 
-CHANGES IN 3.4.14
+CHANGES IN 3.7.1
 ---------------------------------------------------------
-• Switched structure logic to single candle:
-    - Bullish = Close > Open
-    - Bearish = Close < Open
-• Still requires H4 + H1 alignment for entry
+• leo_telegram imported through PYTHONPATH from the units instead of
+  a ~/leo-services path appended at import
+
+CHANGES IN 3.7.0
+---------------------------------------------------------
+• TP sent as a distance from the fill (takeProfitOnFill.distance)
+  like the SL, instead of an absolute price off the last H1 close:
+  the R:R decided (SL_ATR_MULT : TP_ATR_MULT) holds at the fill, and
+  drift past the TP no longer gets the FOK entry rejected
+
+CHANGES IN 3.6.9
+---------------------------------------------------------
+• Entry SL / TP priced at the instrument's displayPrecision from the
+  mes_instruments cache (3 / 5 decimals only without metadata):
+  metals, indices and CFDs picked by the prefilter are no longer
+  rejected with PRICE_PRECISION_EXCEEDED
+
+CHANGES IN 3.6.8
+---------------------------------------------------------
+• Telegram (cycle reports + LIVE safety abort) queued to the
+  leo_telegram outbox: no network wait in the cycle, a cycle's
+  reports leave as one batched message under the chat rate limit
+
+CHANGES IN 3.6.7
+---------------------------------------------------------
+• Closes carry the TAG + version comment as clientExtensions like
+  entries; every cycle folds new transactions into the per-strategy
+  realized PnL ledger (mes_ledger, MES_LEDGER=OFF disables)
+
+CHANGES IN 3.6.6
+---------------------------------------------------------
+• OANDA session from mes_http: shared connection pool, gzip,
+  identical GETs coalesced (the H1 frame entry_levels reads after
+  htf_structure is no longer fetched twice)
+• Telegram (cycle reports + LIVE safety abort) through a pooled
+  session instead of bare requests.post
+
+CHANGES IN 3.6.5
+---------------------------------------------------------
+• Hard decision budget per cycle and phase (mes_deadline,
+  MES_SWING_DEADLINE_S): GET timeouts / retries cut to the budget
+  left; decisions of a late cycle are reported as "deadline
+  exceeded" and never sent (orders themselves are not cut short)
+• An overlapping run is skipped instead of waiting on the lock
+
+CHANGES IN 3.6.4
+---------------------------------------------------------
+• mes_runner plugin (PLUGIN): evaluated on the runner's per-close
+  MarketSnapshot together with scalp; candle parsing shared via
+  mes_market. No decision changes
+
+CHANGES IN 3.6.3
+---------------------------------------------------------
+• Optional local candles (MES_RESAMPLE=ON, mes_resample): H1/H4
+  resampled from a stored M1 base kept current with one
+  incremental request per pair; OANDA fetch when not covered
+
+CHANGES IN 3.6.2
+---------------------------------------------------------
+• Candle lookbacks from mes_planner: H1 14 bars (structure + ATR),
+  H4 1 bar (structure) instead of 300 per request
+• NAV deferred until an entry needs sizing — cycles without a
+  TAKE read positions only
+
+CHANGES IN 3.6.1
+---------------------------------------------------------
+• Per-account state key MES_ACCOUNT_NAME (default MODE) for
+  account / instruments / prefilter / metrics files, so mes_runner
+  can evaluate several accounts in one process
+
+CHANGES IN 3.6.0
+---------------------------------------------------------
+• Sizing through mes_sizing: all entries of a cycle in one
+  vectorized pass, per-instrument marginRate / trade size limits
+  from the daily /instruments cache (mes_instruments) instead of
+  the fixed 5% rate; quote → home conversion from cached home
+  conversions + this cycle's prices (no candle fetch for crosses)
+• "margin capped" added to the entry reasons when the cap binds
+
+CHANGES IN 3.5.3
+---------------------------------------------------------
+• NAV + open positions kept incrementally via /changes
+  (mes_account, shared with scalp) — one small request per cycle
+
+CHANGES IN 3.5.2
+---------------------------------------------------------
+• Optional pricing prefilter over the account's FX universe
+  (MES_SWING_PREFILTER=ON, mes_prefilter); held pairs always
+  evaluated. Off by default — INSTRUMENTS unchanged
+
+CHANGES IN 3.5.1
+---------------------------------------------------------
+• Quote → USD conversion for crosses whose USD pair is quoted
+  USD_XXX (EUR_JPY, GBP_CAD, ...) — found by mes_load.py
+
+CHANGES IN 3.5.0
+---------------------------------------------------------
+• TAKE decisions are executed in the same cycle (mes_orders):
+  MARKET FOK entry with SL 1.5×ATR(H1) and TP 3.0×ATR(H1)
+  attached on fill (1:2 risk-reward)
+• Units sized from RISK_PCT × NAV over the SL distance, capped
+  by MAX_MARGIN_FRAC; NAV fetched each cycle (was 0.0)
+• Closes and entries of one cycle sent concurrently, every
+  response parsed; decision-to-fill latency per order in
+  metrics_<mode>.json (order/entry, order/close)
+• MAX_OPEN_POSITIONS counts held swing positions, not only
+  entries of the current cycle
+• MES_SWING_EXECUTE=NO keeps decisions but sends no orders
+
+CHANGES IN 3.4.16
+---------------------------------------------------------
+• Cycle phases + every OANDA request timed (mes_metrics),
+  histograms in metrics_<mode>.json, summary in mes.log
+• No decision changes
+
+CHANGES IN 3.4.15
+---------------------------------------------------------
+• H1/H4 structure memoized until the next candle close
+  (shared mes_htf_cache file, same per-MODE memo as scalp)
+• Single candle structure + H4/H1 alignment unchanged
 • Early exit on alignment break unchanged
 
 All other behavior intentionally unchanged:
-• NAV + margin cap logic
 • OANDA API + retries
 • Telegram cycle reporting
 • Diagnostics + decision logs
-• Position sizing + risk model
+• Entry / early-exit signal logic
 """
 
 import os, sys, json, csv, math, fcntl, logging
 from pathlib import Path
 from datetime import datetime, timezone
 from dataclasses import dataclass
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
-import requests
-from requests.adapters import HTTPAdapter, Retry
+
+from mes_account import open_account
+from mes_deadline import Deadline, DeadlineExceeded
+from mes_htf_cache import open_cache
+from mes_http import open_client, open_session
+from mes_instruments import open_instruments
+from mes_ledger import open_ledger
+from mes_market import parse_candles
+from mes_sizing import size_batch
+from mes_metrics import open_tracer
+from mes_planner import Lazy, Plan, summary as plan_summary
+from mes_prefilter import open_prefilter
+from mes_resample import open_bars
+from mes_orders import Fill, OrderExecutor, OrderSpec, market_entry, position_close
 
 # ============================================================
 # CONFIG & AUTH
@@ -52,23 +179,29 @@ OANDA_REST_URL  = os.getenv("OANDA_API_URL", "").rstrip("/")
 FOREX_TOKEN = os.getenv("FOREX_TOKEN", config.get("FOREX_TOKEN", ""))
 TELEGRAM_ID = os.getenv("TELEGRAM_ID", config.get("TELEGRAM_ID", ""))
 
-HEADERS = {"Authorization": f"Bearer {OANDA_API_TOKEN}", "Content-Type": "application/json"}
-
 # ============================================================
-# SINGLE SESSION WITH RETRY
+# SESSIONS (pooled, gzip, coalesced GETs — mes_http)
 # ============================================================
-retry_strategy = Retry(
-    total=5,
-    backoff_factor=0.5,
-    status_forcelist=[429,500,502,503,504],
-    allowed_methods=None,
-    raise_on_status=False,
-)
-
-session = requests.Session()
-session.headers.update(HEADERS)
-session.mount("http://", HTTPAdapter(max_retries=retry_strategy))
-session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
+session = open_client(OANDA_API_TOKEN)
+tg_session = open_session()
+
+# Telegram queued to the leo_telegram outbox (delivered by
+# leo_telegram.service); leo_telegram comes from PYTHONPATH set by the
+# unit, tg_session only if it is not importable
+try:
+    from leo_telegram import send as tg_outbox
+except Exception:
+    tg_outbox = None
+
+def tg_post(text: str, parse_mode: Optional[str] = None):
+    if tg_outbox is not None:
+        tg_outbox(FOREX_TOKEN, TELEGRAM_ID, text, parse_mode=parse_mode)
+        return
+    payload = {"chat_id": TELEGRAM_ID, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    tg_session.post(f"https://api.telegram.org/bot{FOREX_TOKEN}/sendMessage",
+                    json=payload, timeout=10)
 
 # ============================================================
 # MODE / SAFETY
@@ -76,6 +209,7 @@ session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
 IS_LIVE = "fxtrade" in OANDA_REST_URL
 IS_DEMO = "fxpractice" in OANDA_REST_URL
 MODE = "LIVE" if IS_LIVE else "DEMO" if IS_DEMO else "UNKNOWN"
+ACCOUNT_NAME = os.getenv("MES_ACCOUNT_NAME", MODE)     # per-account state key (mes_runner)
 
 LIVE_ALLOWED = os.getenv("MES_SWING_ARMED","NO") == "YES"
 
@@ -83,27 +217,43 @@ if IS_LIVE and not LIVE_ALLOWED:
     msg = "LIVE detected but MES_SWING_ARMED=YES missing — aborting"
     logging.error(msg)
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{FOREX_TOKEN}/sendMessage",
-            json={"chat_id": TELEGRAM_ID, "text": f"SWING SAFETY ABORT: {msg}"},
-            timeout=10,
-        )
+        tg_post(f"SWING SAFETY ABORT: {msg}")
     except Exception:
         pass
     sys.exit(1)
 
 TAG = "MES_SWING_LIVE_v3" if IS_LIVE else "MES_SWING_DEMO_v3"
-VERSION = f"MES Swing v3.4.14 {MODE} [{TAG}]"
+VERSION = f"MES Swing v3.7.1 {MODE} [{TAG}]"
 
 RISK_PCT = float(os.getenv("SWING_RISK_PCT_LIVE","0.0025")) if IS_LIVE else float(os.getenv("SWING_RISK_PCT_DEMO","0.02"))
 MAX_MARGIN_FRAC = float(os.getenv("SWING_MAX_MARGIN_FRAC_LIVE","0.10")) if IS_LIVE else float(os.getenv("SWING_MAX_MARGIN_FRAC_DEMO","0.20"))
 MAX_OPEN_POSITIONS = int(os.getenv("SWING_MAX_OPEN_POSITIONS","2"))
+EXECUTE = os.getenv("MES_SWING_EXECUTE","YES") == "YES"
+
+ATR_PERIOD = 14
+SL_ATR_MULT = 1.5
+TP_ATR_MULT = 3.0                  # 1:2 risk-reward
 
 INSTRUMENTS = [
     "EUR_USD","GBP_USD","AUD_USD","NZD_USD",
     "USD_CAD","USD_CHF","EUR_GBP","USD_JPY",
 ]
 
+# ON → scan the account's whole FX universe via /pricing instead of INSTRUMENTS
+PREFILTER = os.getenv("MES_SWING_PREFILTER","OFF").upper() == "ON"
+PREFILTER_MAX_SPREAD_PIPS = 5.0
+
+# ON → H1/H4 resampled from a stored M1 base (mes_resample)
+RESAMPLE = os.getenv("MES_RESAMPLE","OFF").upper() == "ON"
+
+# ON → fold new account transactions into the PnL ledger each cycle (mes_ledger)
+LEDGER = os.getenv("MES_LEDGER","ON").upper() == "ON"
+
+# hard decision budget per cycle / phase (MES_DEADLINE=OFF disables)
+DEADLINE_S = float(os.getenv("MES_SWING_DEADLINE_S","60"))
+DEADLINE_PHASES = {"positions": 10.0, "prefilter": 10.0, "instruments": 15.0,
+                   "bars": 20.0, "evaluate": 40.0}
+
 logging.info(f"[SWING] Starting {VERSION}")
 
 # ============================================================
@@ -113,49 +263,38 @@ def telegram(msg: str):
     if not FOREX_TOKEN or not TELEGRAM_ID:
         return
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{FOREX_TOKEN}/sendMessage",
-            json={"chat_id": TELEGRAM_ID, "text": msg, "parse_mode": "HTML"},
-            timeout=10,
-        )
+        tg_post(msg, parse_mode="HTML")
     except Exception as e:
         logging.error(f"TG send failed: {e}")
 
-def oanda_get_candles(pair: str, tf: str) -> pd.DataFrame:
+def oanda_get_candles(pair: str, tf: str, count: int = 300) -> pd.DataFrame:
+    """Last `count` complete candles (one extra requested for the forming bar)."""
     r = session.get(
         f"{OANDA_REST_URL}/v3/instruments/{pair}/candles",
-        params={"granularity": tf, "count": 300, "price":"M"},
+        params={"granularity": tf, "count": count + 1, "price":"M"},
         timeout=15,
     )
     r.raise_for_status()
-    rows=[]
-    for c in r.json().get("candles",[]):
-        if c.get("complete"):
-            m=c["mid"]
-            rows.append({
-                "time": pd.to_datetime(c["time"]),
-                "open": float(m["o"]),
-                "high": float(m["h"]),
-                "low":  float(m["l"]),
-                "close":float(m["c"]),
-                "volume": int(c.get("volume",0)),
-            })
-    df=pd.DataFrame(rows).set_index("time")
-    if df.empty:
-        raise RuntimeError("No candles returned")
-    return df
+    return parse_candles(r.json(), count)
+
+def market_candles(pair: str, tf: str, count: int) -> pd.DataFrame:
+    """Local bars when the M1 store covers the lookback, OANDA otherwise."""
+    if bars.covers(pair, tf, count):
+        return bars.candles(pair, tf, count)
+    return oanda_get_candles(pair, tf, count)
+
+account = open_account(session, OANDA_REST_URL, OANDA_ACCOUNT_ID, ACCOUNT_NAME)
+
+def oanda_get_account_nav() -> float:
+    return account.current_nav()
 
 def oanda_open_positions() -> Dict[str,float]:
-    r = session.get(f"{OANDA_REST_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/openPositions", timeout=10)
-    r.raise_for_status()
-    return {
-        p["instrument"]: float(p["long"]["units"]) + float(p["short"]["units"])
-        for p in r.json().get("positions",[])
-    }
+    return account.open_positions()
+
+executor = OrderExecutor(session, OANDA_REST_URL, OANDA_ACCOUNT_ID)
 
-def oanda_close_position(pair: str):
-    session.put(f"{OANDA_REST_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/positions/{pair}/close",
-                json={"longUnits":"ALL","shortUnits":"ALL"}, timeout=10)
+def execute_orders(orders: List[OrderSpec]) -> List[Fill]:
+    return executor.execute(orders)
 
 # ============================================================
 # STRUCTURE-BASED TREND HELPERS
@@ -168,13 +307,95 @@ def is_bearish_structure(df: pd.DataFrame) -> bool:
     last = df.iloc[-1]
     return last["close"] < last["open"]
 
-def compute_alignment(df4h, df1h) -> str | None:
-    if is_bullish_structure(df4h) and is_bullish_structure(df1h):
+def structure_of(df: pd.DataFrame) -> str:
+    if is_bullish_structure(df):
         return "bullish"
-    if is_bearish_structure(df4h) and is_bearish_structure(df1h):
+    if is_bearish_structure(df):
         return "bearish"
+    return "flat"
+
+def alignment_of(s4h: str, s1h: str) -> str | None:
+    return s1h if s4h == s1h and s1h != "flat" else None
+
+def compute_alignment(df4h, df1h) -> str | None:
+    return alignment_of(structure_of(df4h), structure_of(df1h))
+
+# ============================================================
+# PLUGIN (mes_runner: candle that triggers a cycle, entry point,
+# calendar from mes_scheduler)
+# ============================================================
+PLUGIN = {"tf": "H1", "entry": "main", "calendar": "swing"}
+
+# ============================================================
+# DATA PLAN (minimum complete bars per granularity)
+# ============================================================
+PLAN = (Plan()
+        .need("H1", "structure").need("H1", "atr", ATR_PERIOD)
+        .need("H4", "structure"))
+
+# ============================================================
+# HTF STRUCTURE MEMO (valid until the next H1/H4 close)
+# ============================================================
+htf_cache = open_cache(MODE)
+tracer = open_tracer("swing", ACCOUNT_NAME)
+tracer.instrument(session)
+executor.observe = tracer.observe
+instruments = open_instruments(session, OANDA_REST_URL, OANDA_ACCOUNT_ID, ACCOUNT_NAME)
+prefilter = open_prefilter(session, OANDA_REST_URL, OANDA_ACCOUNT_ID, "swing", ACCOUNT_NAME,
+                           PREFILTER_MAX_SPREAD_PIPS, PREFILTER, instruments=instruments)
+bars = open_bars(session, OANDA_REST_URL, MODE, RESAMPLE)
+ledger = open_ledger(session, OANDA_REST_URL, OANDA_ACCOUNT_ID, ACCOUNT_NAME)
+
+def htf_structure(pair: str, tf: str) -> str:
+    cached = htf_cache.get(pair, tf)
+    if cached is not None:
+        return cached
+    df = market_candles(pair, tf, PLAN.count(tf))
+    s = structure_of(df)
+    htf_cache.put(pair, tf, df.index[-1].to_pydatetime(), s)
+    instruments.observe({pair: float(df["close"].iloc[-1])})
+    return s
+
+# ============================================================
+# SIZING (ATR stop, NAV risk, margin cap — mes_sizing)
+# ============================================================
+def refresh_instruments():
+    """Daily /instruments + home conversions refresh (cached file otherwise)."""
+    instruments.refresh()
+
+def entry_levels(dec: "SwingDecision") -> str | None:
+    """Entry reference, SL and TP from the H1 ATR; returns a skip reason or None."""
+    df = market_candles(dec.pair,"H1", PLAN.count("H1"))
+    atr = float((df["high"] - df["low"]).tail(ATR_PERIOD).mean())
+    entry = float(df["close"].iloc[-1])
+    instruments.observe({dec.pair: entry})
+    if not atr > 0:
+        return "ATR unavailable"
+    sign = 1 if dec.direction == "BUY" else -1
+    dec.entry = entry
+    dec.sl = entry - sign * SL_ATR_MULT * atr
+    dec.tp = entry + sign * TP_ATR_MULT * atr
     return None
 
+def size_entries(decs: List["SwingDecision"], nav: "float | Lazy[float]"):
+    """One vectorized sizing pass over every TAKE candidate (no network)."""
+    takes = [d for d in decs if d and d.action == "TAKE"]
+    if not takes:
+        return
+    if callable(nav):           # deferred read from run_cycle
+        nav = nav()
+    sized = size_batch(instruments, [d.pair for d in takes], [d.entry for d in takes],
+                       [abs(d.entry - d.sl) for d in takes], nav, RISK_PCT, MAX_MARGIN_FRAC)
+    for d in takes:
+        row = sized.row(d.pair)
+        if row["reason"]:
+            d.action = "SKIP"
+            d.reasons = [row["reason"]]
+            continue
+        d.units_final = row["units"] if d.direction == "BUY" else -row["units"]
+        if row["was_margin_capped"]:
+            d.reasons.append("margin capped")
+
 # ============================================================
 # EVALUATION (early-exit + entry logic)
 # ============================================================
@@ -189,12 +410,12 @@ class SwingDecision:
     tp: float = 0.0
     units_final: int = 0
 
-def evaluate_swing(pair: str, nav: float, open_pos: Dict[str,float]) -> SwingDecision | None:
+def signal_swing(pair: str, open_pos: Dict[str,float]) -> SwingDecision | None:
     dec = SwingDecision(pair, "SKIP", "NONE", ["init"])
 
-    df1h = oanda_get_candles(pair,"H1")
-    df4h = oanda_get_candles(pair,"H4")
-    align = compute_alignment(df4h, df1h)
+    s1h = htf_structure(pair,"H1")
+    s4h = htf_structure(pair,"H4")
+    align = alignment_of(s4h, s1h)
 
     pos_units = open_pos.get(pair,0)
 
@@ -202,7 +423,6 @@ def evaluate_swing(pair: str, nav: float, open_pos: Dict[str,float]) -> SwingDec
     if pos_units != 0:
         pos_dir = "bullish" if pos_units > 0 else "bearish"
         if align != pos_dir:
-            oanda_close_position(pair)
             dec.action="CLOSE"
             dec.direction=pos_dir
             dec.reasons=["Alignment break — early exit"]
@@ -215,13 +435,25 @@ def evaluate_swing(pair: str, nav: float, open_pos: Dict[str,float]) -> SwingDec
         dec.reasons=["H4 + H1 misaligned"]
         return None
 
-    # (Existing Swing entry mechanics stay as-is: ATR sizing, MARKET entry, etc.)
-    # Stub entry preserved intentionally — no behavioral redesign here
-    dec.action="TAKE"
     dec.direction="BUY" if align=="bullish" else "SELL"
+    skip = entry_levels(dec)
+    if skip:
+        dec.reasons=[skip]
+        return dec
+    dec.action="TAKE"
     dec.reasons=[f"HTF structure aligned ({align})"]
     return dec
 
+def evaluate_swing(pair: str, nav: float, open_pos: Dict[str,float]) -> SwingDecision | None:
+    return evaluate_all([pair], nav, open_pos)[0]
+
+def evaluate_all(pairs: List[str], nav: "float | Lazy[float]",
+                 open_pos: Dict[str,float]) -> List[SwingDecision | None]:
+    """Signals per pair, then one sizing pass for all entries."""
+    decs = [signal_swing(pair, open_pos) for pair in pairs]
+    size_entries(decs, nav)
+    return decs
+
 # ============================================================
 # MAIN CYCLE
 # ============================================================
@@ -229,30 +461,119 @@ def main():
     logging.info(f"[SWING] {VERSION} cycle start")
     telegram(f"<b>{VERSION}</b> cycle started")
 
-    open_pos = oanda_open_positions()
-    trades = 0
-
-    for pair in INSTRUMENTS:
-        if trades >= MAX_OPEN_POSITIONS:
-            break
-
-        dec = evaluate_swing(pair, 0.0, open_pos)
-        if not dec:
-            continue
-
-        if dec.action == "CLOSE":
-            telegram(f"{pair} early-exit — {', '.join(dec.reasons)}")
-            continue
-
-        if dec.action == "TAKE":
-            telegram(f"{pair} entry — {', '.join(dec.reasons)}")
-            trades += 1
+    tracer.begin_cycle()
+    with tracer.span("cycle"):
+        trades = run_cycle()
+    tracer.save()
+    logging.info(f"[SWING] {tracer.cycle_summary()}")
 
     telegram(f"<b>{VERSION}</b> cycle complete — {trades} trades")
 
+def order_for(dec: SwingDecision, open_pos: Dict[str,float]) -> OrderSpec:
+    """Payload built right after the decision; sending it is one request."""
+    if dec.action == "CLOSE":
+        return position_close(dec.pair, open_pos[dec.pair], TAG, f"{VERSION} {', '.join(dec.reasons)}")
+    return market_entry(dec.pair, dec.units_final, abs(dec.entry - dec.sl), abs(dec.tp - dec.entry),
+                        TAG, f"{VERSION} {', '.join(dec.reasons)}", instruments.meta(dec.pair))
+
+def report(dec: SwingDecision, fill: Fill | None):
+    why = ', '.join(dec.reasons)
+    if dec.action == "CLOSE":
+        if fill is None:
+            telegram(f"{dec.pair} early-exit — {why} (not executed)")
+        elif fill.ok:
+            telegram(f"{dec.pair} early-exit — {why} — closed {fill.units:g} @ {fill.price:g}, "
+                     f"P/L {fill.pl:.2f} ({fill.latency_ms:.0f}ms)")
+        else:
+            telegram(f"{dec.pair} early-exit FAILED — {fill.reason}")
+        return
+    if fill is None:
+        telegram(f"{dec.pair} entry {dec.direction} {dec.units_final} — {why} (not executed)")
+    elif fill.ok:
+        telegram(f"{dec.pair} entry {dec.direction} {fill.units:g} @ {fill.price:g} "
+                 f"SL {abs(dec.entry - dec.sl):g} TP {abs(dec.tp - dec.entry):g} — {why} ({fill.latency_ms:.0f}ms)")
+    else:
+        telegram(f"{dec.pair} entry {dec.direction} FAILED — {fill.reason}")
+
+def drop_late(decs: List[SwingDecision], exc: DeadlineExceeded):
+    """Decisions of a cycle past its budget are reported, never sent."""
+    logging.warning(f"[SWING] {exc} — {len(decs)} decisions dropped")
+    tracer.observe(f"deadline/{exc.phase}", exc.overrun_s * 1000)
+    telegram(f"<b>{VERSION}</b> {exc} — {len(decs)} decisions dropped")
+    for dec in decs:
+        dec.reasons.append("deadline exceeded")
+        report(dec, None)
+
+def run_cycle() -> int:
+    nav = Lazy("nav", oanda_get_account_nav, tracer.span)     # only sizing reads it
+    deadline = Deadline(DEADLINE_S, DEADLINE_PHASES)
+
+    closes: List[SwingDecision] = []
+    takes: List[SwingDecision] = []
+    prebuilt: Dict[str, OrderSpec] = {}
+    try:
+        with deadline.active():
+            with tracer.span("positions"), deadline.phase("positions"):
+                open_pos = oanda_open_positions()
+
+            pairs = INSTRUMENTS
+            if prefilter.enabled:
+                with tracer.span("prefilter"), deadline.phase("prefilter"):
+                    pairs = prefilter.scan(INSTRUMENTS, keep=[p for p, u in open_pos.items() if u])
+
+            with tracer.span("instruments"), deadline.phase("instruments"):
+                refresh_instruments()
+            if bars.enabled:
+                with tracer.span("bars"), deadline.phase("bars"):
+                    bars.sync(pairs)
+            with tracer.span("evaluate"), deadline.phase("evaluate"):
+                for dec in evaluate_all(pairs, nav, open_pos):
+                    if dec and dec.action in ("CLOSE","TAKE"):
+                        (closes if dec.action == "CLOSE" else takes).append(dec)
+                        prebuilt[dec.pair] = order_for(dec, open_pos)
+            deadline.check("orders")        # a late decision is not sent
+    except DeadlineExceeded as e:
+        drop_late(closes + takes, e)
+        with tracer.span("memo_save"):
+            htf_cache.save()
+        return 0
+
+    held = sum(1 for p in pairs if open_pos.get(p,0)) - len(closes)
+    slots = max(0, MAX_OPEN_POSITIONS - held)
+    for dec in takes[slots:]:
+        logging.info(f"[SWING] {dec.pair} TAKE dropped — {MAX_OPEN_POSITIONS} positions max")
+    selected = closes + takes[:slots]
+    orders = [prebuilt[d.pair] for d in selected]
+
+    fills: List[Fill | None] = [None] * len(selected)
+    if EXECUTE and orders:
+        with tracer.span("orders"):
+            fills = execute_orders(orders)
+
+    for dec, fill in zip(selected, fills):
+        report(dec, fill)
+
+    if LEDGER:
+        # this cycle's fills + SL / TP closes since the last cycle
+        with tracer.span("ledger"):
+            try:
+                ledger.sync()
+            except Exception as e:
+                logging.warning(f"[SWING] ledger sync failed: {e}")
+
+    with tracer.span("memo_save"):
+        htf_cache.save()
+    logging.info(f"[SWING] deferred reads — {plan_summary(nav)}")
+    return sum(1 for d, f in zip(selected, fills) if d.action == "TAKE" and f and f.ok)
+
 if __name__ == "__main__":
     lock_fd = open("/tmp/mes_swing.lock","w")
-    fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX)
+    try:
+        fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        # a cycle still running past its deadline — skip, never queue
+        logging.warning("[SWING] previous cycle still running — skipped")
+        sys.exit(0)
     try:
         main()
     finally:
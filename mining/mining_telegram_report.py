@@ -1,22 +1,25 @@
 #!/usr/bin/env python3
 # Project: Leo Services
 # File: mining_telegram_report.py
-# Version: v3.5.5 — 2025-12-29
-# Change: Report now explicitly identifies pool mode as "MINI-P2POOL"
-#         (header labeling in Telegram report). Huge Pages API-first logic retained.
+# Version: v3.5.8 — 2026-10-18
+# Change: leo_telegram / leo_journal imported through PYTHONPATH set by
+#         mining_telegram_report.service instead of a ~/leo-services path
+#         appended at import.
 # Note: Bump Version + Change when modifying runtime behavior
 
 """
-Leo Mining Telegram Report – v3.5.5
+Leo Mining Telegram Report – v3.5.8
 Aligned to P2Pool filesystem API (/home/ubu/.p2pool/api/stats_mod)
 Matches dashboard P2Pool fields
 """
 
 import os
 import re
+import sys
 import json
 import requests
 import subprocess
+from pathlib import Path
 from datetime import datetime, UTC
 
 # ─────────────────────────────────────────────────────────
@@ -38,9 +41,21 @@ P2POOL_STATS = "/home/ubu/.p2pool/api/stats_mod"
 # ─────────────────────────────────────────────────────────
 # Telegram
 # ─────────────────────────────────────────────────────────
+# queued to the leo_telegram outbox (leo_telegram.service delivers it);
+# leo_telegram comes from PYTHONPATH (the unit), direct send if it is
+# not importable or the gateway is not running
+try:
+    from leo_telegram import send as tg_outbox
+except Exception:
+    tg_outbox = None
+
+
 def tg(msg: str):
     if not (MINING_TOKEN and TELEGRAM_ID):
         return
+    if tg_outbox is not None:
+        tg_outbox(MINING_TOKEN, TELEGRAM_ID, msg, parse_mode="HTML")
+        return
     try:
         requests.post(
             f"https://api.telegram.org/bot{MINING_TOKEN}/sendMessage",
@@ -128,12 +143,25 @@ def parse_hugepages_from_api(miner):
     return 0, 0, 0.0
 
 
+try:
+    from leo_journal import open_reader      # PYTHONPATH, see tg_outbox
+except Exception:
+    open_reader = None
+
+
 def parse_hugepages_from_journal():
     try:
-        out = subprocess.check_output(
-            ["journalctl", "-u", "xmrig.service", "-n", "120"],
-            text=True
-        )
+        if open_reader is not None:
+            # only xmrig's huge pages lines are indexed, so the last one
+            # survives however much xmrig logged since
+            journal = open_reader("mining-report", units=["xmrig.service"],
+                                  match=r"(?i)huge pages", initial=120)
+            out = "\n".join(e.message for e in journal.tail("xmrig.service", 5))
+        else:
+            out = subprocess.check_output(
+                ["journalctl", "-u", "xmrig.service", "-n", "120"],
+                text=True
+            )
         m = re.findall(r"huge pages\s+\d+%\s+(\d+)/(\d+)", out, re.IGNORECASE)
         if m:
             used = int(m[-1][0]); total = int(m[-1][1])
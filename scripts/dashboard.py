@@ -12,9 +12,19 @@ import subprocess
 from datetime import datetime, timedelta
 from urllib import request
 import re
+import sys
+from pathlib import Path
 
 from flask import Flask, render_template_string
 
+# journal reader shared with mes-run and the reports (leo_journal.py):
+# per-consumer cursor + in-memory index, no journalctl per refresh
+try:
+    sys.path.insert(0, str(Path.home() / "leo-services" / "leo"))
+    from leo_journal import open_reader
+except Exception:
+    open_reader = None
+
 app = Flask(__name__)
 
 # ─────────────────────────────────────────────────────────
@@ -75,8 +85,15 @@ def rpc_call(url, method, params=None, timeout=3):
         return None
 
 
+ERRORS_KEEP_H = 4      # widest window asked for (/1/errors)
+
+
 def get_recent_errors(hours=2):
-    since = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+    since = datetime.now() - timedelta(hours=hours)
+    if open_reader is not None:
+        errors = open_reader("dashboard-errors", priority=3, keep_s=ERRORS_KEEP_H * 3600)
+        return "\n".join(e.line() for e in errors.query(since=since.timestamp()))
+    since = since.strftime("%Y-%m-%d %H:%M:%S")
     return safe_run(["journalctl", "-p", "err", "--since", since, "--no-pager", "-o", "short-iso"])
 
 
@@ -147,20 +164,26 @@ def get_xmr_price_usd():
 
 def get_mes_summary():
     """Parse last MES Auto Trader run from systemd logs."""
-    logs = safe_run([
-        "journalctl", "-u", "mes_auto.service",
-        "-n", "40", "--no-pager", "-o", "cat"
-    ])
+    if open_reader is not None:
+        journal = open_reader("dashboard-mes", units=["mes_auto.service"], initial=40)
+        entries = journal.tail("mes_auto.service", 40)
+        logs = "\n".join(e.message for e in entries)
+        # Determine last run timestamp
+        last_run = (datetime.fromtimestamp(entries[-1].ts).strftime("%b %d %H:%M:%S")
+                    if entries else "unknown")
+    else:
+        logs = safe_run([
+            "journalctl", "-u", "mes_auto.service",
+            "-n", "40", "--no-pager", "-o", "cat"
+        ])
+        ts_match = re.search(r"(\w{3} \d{1,2} \d{2}:\d{2}:\d{2})", logs)
+        last_run = ts_match.group(1) if ts_match else "unknown"
 
     if not logs:
         return {"ok": False, "status": "No logs", "last_run": None}
 
     lines = logs.splitlines()
 
-    # Determine last run timestamp
-    ts_match = re.search(r"(\w{3} \d{1,2} \d{2}:\d{2}:\d{2})", logs)
-    last_run = ts_match.group(1) if ts_match else "unknown"
-
     # Determine last exit status
     if "Deactivated successfully" in logs:
         status = "success"
@@ -447,6 +470,15 @@ from pathlib import Path
 from flask import render_template_string
 
 MES_DIAG_PATH = Path("/mnt/mes/latest_diag.json")
+MES_DIR = Path("/mnt/mes")
+
+# decision history reader lives next to the MES scripts (mes_decisions.py)
+try:
+    import sys
+    sys.path.insert(0, str(MES_DIR))
+    from mes_decisions import open_store as open_mes_history
+except Exception:
+    open_mes_history = None
 
 
 def _format_mes_block(diag: dict) -> str:
@@ -520,7 +552,7 @@ def _format_mes_block(diag: dict) -> str:
         for r in reasons:
             lines.append(f" - {r}")
         lines.append("")
-    final_icon = "✅" if decision in ("BUY", "SELL") else "⚠"
+    final_icon = "✅" if decision in ("BUY", "SELL", "SIGNAL") else "⚠"
     lines.append(f"FINAL: {final_icon} {decision} ({direction})")
     lines.append("----------------------------------------------------")
     return "\n".join(lines)
@@ -558,6 +590,7 @@ MES_DIAG_TEMPLATE = r"""
     {% else %}
       No diagnostics file found (expected {{ path }}).
     {% endif %}
+    &nbsp;|&nbsp; <a href="/4/history">History</a>
     &nbsp;|&nbsp; <a href="/1/">Back to main dashboard</a>
   </div>
 
@@ -600,3 +633,86 @@ def mes_diag():
         blocks=blocks,
         path=str(MES_DIAG_PATH),
     )
+
+
+MES_HISTORY_TEMPLATE = r"""
+<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>MES Auto – Decision History</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <style>
+    body { background:#05060a; color:#eee; font-family:system-ui; margin:0; padding:16px; }
+    h1 { margin:0 0 6px; font-size:1.3rem; }
+    .meta { font-size:.85rem; color:#a0a0b8; margin-bottom:10px; }
+    pre {
+      background:#000; border-radius:10px;
+      padding:10px 12px;
+      font-family:ui-monospace, Menlo, Monaco, Consolas, "SF Mono", monospace;
+      font-size:.8rem; line-height:1.35;
+      white-space:pre; overflow-x:auto;
+    }
+    a { color:#7dc7ff; text-decoration:none; }
+    a:hover { text-decoration:underline; }
+  </style>
+</head>
+<body>
+  <h1>MES AUTO – Decision History ({{ mode }})</h1>
+  <div class="meta">
+    {{ pair or "all pairs" }}, last {{ hours }}h{% if signals %}, signals only{% endif %}
+    &nbsp;|&nbsp; <a href="/4">Latest</a>
+    &nbsp;|&nbsp; <a href="/1/">Back to main dashboard</a>
+  </div>
+  {% if error %}
+    <p><em>{{ error }}</em></p>
+  {% elif rows %}
+    <pre>{% for r in rows %}{{ r }}
+{% endfor %}</pre>
+  {% else %}
+    <p><em>No decisions in this window.</em></p>
+  {% endif %}
+</body>
+</html>
+"""
+
+
+@app.route("/4/history")
+def mes_history():
+    """Past MES decisions from the append-only history (?pair=&hours=&mode=&signals=1)."""
+    from flask import request as flask_request
+    from datetime import timezone
+
+    pair = flask_request.args.get("pair") or None
+    mode = flask_request.args.get("mode", "demo").lower()
+    signals = flask_request.args.get("signals") == "1"
+    try:
+        hours = max(1, min(int(flask_request.args.get("hours", "24")), 24 * 90))
+    except ValueError:
+        hours = 24
+
+    rows, error = [], None
+    if open_mes_history is None:
+        error = f"mes_decisions.py not found under {MES_DIR}"
+    else:
+        try:
+            store = open_mes_history(mode, MES_DIR)
+            start = datetime.now(timezone.utc) - timedelta(hours=hours)
+            for t, p, d in store.query(pair, start):
+                decision = d.get("decision", "SKIPPED")
+                if signals and decision == "SKIPPED":
+                    continue
+                rows.append(
+                    f"{t:%Y-%m-%d %H:%M}  {p:<8} {decision:<8} "
+                    f"{d.get('direction') or '':<5} units={d.get('exec_units', 0):<6} "
+                    f"{', '.join(d.get('reasons') or [])}"
+                )
+            rows.reverse()
+        except Exception as e:
+            error = f"Failed to read decision history: {e}"
+
+    return render_template_string(
+        MES_HISTORY_TEMPLATE,
+        rows=rows, error=error, pair=pair, mode=mode.upper(),
+        hours=hours, signals=signals,
+    )